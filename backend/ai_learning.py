@@ -2,11 +2,26 @@ import json
 import os
 from datetime import datetime
 from collections import defaultdict
+from intent_classifier import command_intents
+from state_snapshot import SnapshotBackedDict
 
 class LuaAILearning:
-    def __init__(self, db_path='lua_assistant.db'):
+    INTENT_NAMES = {
+        'open': 'open_app',
+        'call': 'make_call',
+        'message': 'send_message',
+        'reminder': 'set_reminder',
+        'music': 'control_music',
+        'camera': 'control_camera',
+        'weather': 'get_weather'
+    }
+    
+    def __init__(self, db_path='lua_assistant.db', snapshot=None):
         self.db_path = db_path
-        self.user_models = {}
+        # Histories survive restarts through the snapshot and are decoded per user on first use
+        self.user_models = SnapshotBackedDict(snapshot.section('ai_user_models') if snapshot else None)
+        if snapshot is not None:
+            snapshot.register('ai_user_models', self.user_models.snapshot_items)
         self.command_patterns = {}
         self.context_memory = defaultdict(list)
         
@@ -15,27 +30,10 @@ class LuaAILearning:
         try:
             command_lower = command_text.lower()
             
-            # Simple intent classification
-            if any(word in command_lower for word in ['open', 'launch', 'start']):
-                intent = 'open_app'
-                confidence = 0.8
-            elif any(word in command_lower for word in ['call', 'phone', 'dial']):
-                intent = 'make_call'
-                confidence = 0.8
-            elif any(word in command_lower for word in ['message', 'sms', 'text']):
-                intent = 'send_message'
-                confidence = 0.8
-            elif any(word in command_lower for word in ['remind', 'reminder', 'alert']):
-                intent = 'set_reminder'
-                confidence = 0.8
-            elif any(word in command_lower for word in ['music', 'play', 'song']):
-                intent = 'control_music'
-                confidence = 0.8
-            elif any(word in command_lower for word in ['camera', 'photo', 'selfie']):
-                intent = 'control_camera'
-                confidence = 0.8
-            elif any(word in command_lower for word in ['weather', 'temperature']):
-                intent = 'get_weather'
+            # Shared intent table, mapped onto this module's intent names
+            match = command_intents.classify(command_lower, intents=self.INTENT_NAMES)
+            if match.intent:
+                intent = self.INTENT_NAMES[match.intent]
                 confidence = 0.8
             else:
                 intent = 'unknown'
@@ -1,42 +1,79 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Request, Response, request, jsonify
 from flask_cors import CORS
 import speech_recognition as sr
-import pyttsx3
 import json
-import sqlite3
 from datetime import datetime
 import threading
 import os
+import sys
 import re
+import signal
+import time
+import atexit
 import requests
 import io
 import wave
 import base64
-from werkzeug.utils import secure_filename
+import numpy as np
+from concurrent.futures import TimeoutError as FuturesTimeout
+from werkzeug.exceptions import RequestEntityTooLarge
 import libturso_client
 from dotenv import load_dotenv
-import nltk
-from nltk.tokenize import word_tokenize
-from nltk.corpus import stopwords
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-import numpy as np
+import text_index
+from text_index import AppNameIndex
+from intent_classifier import command_intents
+from batch_items import parse_batch_item
+from pattern_cache import PATTERN_SECTION, LearnedPatternCache
+from write_behind import WriteBehindQueue
+from audio_input import MAX_AUDIO_BYTES, AudioTooLarge, read_limited, decode_audio
+from recognition import RecognitionScheduler, GoogleSpeechEngine, SphinxEngine
+from sphinx_pool import SphinxDecoderPool
+from command_grammar import CommandGrammar
+from device_integration import DeviceIntegration
+from tts_worker import TTSWorker, TTSBusy
+from speech_cache import default_speech_cache
+from state_snapshot import SnapshotManager
+from emotional_intelligence import EmotionalIntelligence
+from emotion_batch import EmotionBatchProcessor
+from emotion_endpoints import register_emotion_routes
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from database.lua_db import LuaDatabase
 
 load_dotenv()
 
+class InMemoryRequest(Request):
+    """Keep uploaded files in memory instead of spooling large ones to disk"""
+    # Endpoints allowed a larger body than MAX_CONTENT_LENGTH, e.g. batch uploads
+    endpoint_limits = {}
+
+    @property
+    def max_content_length(self):
+        return self.endpoint_limits.get(self.endpoint, super().max_content_length)
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return io.BytesIO()
+
 app = Flask(__name__)
+app.request_class = InMemoryRequest
+# Enforced by werkzeug while the body streams in, not after it is stored
+app.config['MAX_CONTENT_LENGTH'] = MAX_AUDIO_BYTES + 64 * 1024
 CORS(app)
 
 # Initialize speech recognition and TTS
 recognizer = sr.Recognizer()
-tts_engine = pyttsx3.init()
-
-# Download NLTK data
-try:
-    nltk.download('punkt', quiet=True)
-    nltk.download('stopwords', quiet=True)
-except:
-    pass
+# LUA_SPHINX_SEARCH=grammar tries the command grammar before the language model; catalogs are added below
+devices = DeviceIntegration()
+command_grammar = CommandGrammar([lambda: devices.android_packages])
+sphinx_pool = SphinxDecoderPool(grammar=command_grammar)
+recognition_scheduler = RecognitionScheduler([
+    GoogleSpeechEngine(recognizer=recognizer),
+    SphinxEngine(recognizer, pool=sphinx_pool)
+])
+# The worker thread owns the pyttsx3 engine; requests only queue text,
+# and replies rendered before are read back from the speech cache
+tts_worker = TTSWorker(cache=default_speech_cache())
+TTS_TIMEOUT = float(os.getenv('LUA_TTS_TIMEOUT', 30))
 
 # Turso Database Connection
 TURSO_URL = os.getenv('TURSO_URL', 'file:lua_assistant.db')
@@ -48,7 +85,8 @@ else:
     db_client = None
 
 class LuaAssistant:
-    def __init__(self):
+    def __init__(self, db, snapshot=None):
+        self.db = db
         self.commands = {
             'open': self.open_app,
             'call': self.make_call,
@@ -88,36 +126,28 @@ class LuaAssistant:
             'phone': 'phone'
         }
         
-        self.vectorizer = TfidfVectorizer(stop_words='english')
-        self.user_patterns = {}
-        self.load_user_patterns()
-        
-    def load_user_patterns(self):
-        """Load learned patterns from database"""
+        self.app_index = AppNameIndex(self.app_packages)
+        # Users in the last snapshot are restored from it on first use when
+        # their rows in the table haven't changed since it was written
+        self.user_patterns = LearnedPatternCache(
+            self.load_user_patterns,
+            snapshot=snapshot.section(PATTERN_SECTION) if snapshot else None,
+            version=self.db.get_learning_pattern_version
+        )
+        
+    def load_user_patterns(self, user_id):
+        """Load one user's learned patterns from database"""
         try:
-            conn = sqlite3.connect('lua_assistant.db')
-            cursor = conn.cursor()
-            cursor.execute('''
-                SELECT user_id, pattern, action, confidence 
-                FROM learning_patterns 
-                WHERE confidence > 0.5
-            ''')
-            patterns = cursor.fetchall()
-            
-            for user_id, pattern, action, confidence in patterns:
-                if user_id not in self.user_patterns:
-                    self.user_patterns[user_id] = []
-                self.user_patterns[user_id].append({
-                    'pattern': pattern,
-                    'action': action,
-                    'confidence': confidence
-                })
-            conn.close()
+            return self.db.get_learning_patterns(user_id, min_confidence=0.5)
         except:
-            pass
+            return []
 
-    def process_command(self, text, user_id="default"):
-        """Process voice command using AI and return action"""
+    def process_command(self, text, user_id="default", context=None):
+        """Process voice command using AI and return action
+        
+        context is the client's {timestamp, app_state, ...} object, as main.py
+        takes it; no handler here reads it yet.
+        """
         text = text.lower().strip()
         
         # Check for learned patterns first
@@ -125,6 +155,43 @@ class LuaAssistant:
         if learned_action:
             return learned_action
         
+        return self.process_new_command(text, user_id, context)
+
+    def process_batch(self, items):
+        """Process many {user_id, text, context} items, returning results in input order"""
+        results = [None] * len(items)
+        by_user = {}
+        
+        for position, item in enumerate(items):
+            try:
+                user_id, text, context = parse_batch_item(item)
+            except ValueError as e:
+                results[position] = {"error": str(e)}
+                continue
+            by_user.setdefault(user_id, []).append((position, text.lower().strip(), context))
+        
+        for user_id, entries in by_user.items():
+            # One sparse product scores every utterance of this user at once
+            try:
+                learned = self.user_patterns.get(user_id).best_matches(
+                    [text for _, text, _ in entries], threshold=0.8, actions=self.commands
+                )
+            except Exception:
+                learned = [None] * len(entries)
+            
+            for (position, text, context), pattern_data in zip(entries, learned):
+                try:
+                    if pattern_data:
+                        results[position] = self.commands[pattern_data['action']](text)
+                    else:
+                        results[position] = self.process_new_command(text, user_id, context)
+                except Exception as e:
+                    results[position] = {"error": str(e)}
+        
+        return results
+
+    def process_new_command(self, text, user_id, context=None):
+        """Process a command that matched no learned pattern"""
         # Intent recognition using keywords
         intent = self.extract_intent(text)
         
@@ -149,101 +216,49 @@ class LuaAssistant:
         }
 
     def extract_intent(self, text):
-        """Extract intent from text using keyword matching"""
-        intent_keywords = {
-            'open': ['open', 'launch', 'start', 'run'],
-            'call': ['call', 'phone', 'dial', 'ring'],
-            'message': ['message', 'text', 'sms', 'send'],
-            'reminder': ['remind', 'reminder', 'alert', 'notify'],
-            'weather': ['weather', 'temperature', 'forecast'],
-            'music': ['play', 'music', 'song', 'pause', 'stop', 'next', 'previous'],
-            'camera': ['camera', 'photo', 'picture', 'selfie'],
-            'gallery': ['gallery', 'photos', 'images'],
-            'settings': ['settings', 'preferences', 'config'],
-            'calculator': ['calculator', 'calculate', 'math']
-        }
-        
-        for intent, keywords in intent_keywords.items():
-            if any(keyword in text for keyword in keywords):
-                return intent
-        
-        return None
+        """Extract intent from text using the shared intent table"""
+        return command_intents.classify(text, intents=self.commands).intent
 
     def check_learned_patterns(self, text, user_id):
         """Check if text matches any learned patterns"""
-        if user_id not in self.user_patterns:
-            return None
-        
-        for pattern_data in self.user_patterns[user_id]:
-            similarity = self.calculate_similarity(text, pattern_data['pattern'])
-            if similarity > 0.8:  # High similarity threshold
-                return self.commands[pattern_data['action']](text)
+        # Score against every learned pattern in one sparse product
+        pattern_data = self.user_patterns.get(user_id).best_match(
+            text, threshold=0.8, actions=self.commands
+        )
+        if pattern_data:
+            return self.commands[pattern_data['action']](text)
         
         return None
 
-    def calculate_similarity(self, text1, text2):
-        """Calculate similarity between two texts"""
-        try:
-            vectors = self.vectorizer.fit_transform([text1, text2])
-            similarity = cosine_similarity(vectors[0:1], vectors[1:2])[0][0]
-            return similarity
-        except:
-            return 0
-
     def learn_pattern(self, user_id, text, intent, result):
         """Learn new pattern from user interaction"""
         try:
-            conn = sqlite3.connect('lua_assistant.db')
-            cursor = conn.cursor()
-            
-            # Check if pattern exists
-            cursor.execute('''
-                SELECT id, confidence FROM learning_patterns
-                WHERE user_id = ? AND pattern = ? AND action = ?
-            ''', (user_id, text, intent))
-            
-            existing = cursor.fetchone()
+            new_confidence = self.db.update_learning_pattern(user_id, text, intent)
             
-            if existing:
-                # Update confidence
-                new_confidence = min(existing[1] + 0.1, 1.0)
-                cursor.execute('''
-                    UPDATE learning_patterns 
-                    SET confidence = ?, last_used = CURRENT_TIMESTAMP
-                    WHERE id = ?
-                ''', (new_confidence, existing[0]))
-            else:
-                # Create new pattern
-                cursor.execute('''
-                    INSERT INTO learning_patterns (user_id, pattern, action, confidence)
-                    VALUES (?, ?, ?, ?)
-                ''', (user_id, text, intent, 0.6))
-            
-            conn.commit()
-            conn.close()
+            # Keep the in-memory index in step with the database
+            self.user_patterns.record(user_id, text, intent, new_confidence)
         except:
             pass
 
     def fuzzy_app_match(self, text):
         """Find best matching app using fuzzy matching"""
-        best_match = None
-        best_score = 0
-        
         for app_name in self.app_packages.keys():
             if app_name in text:
                 return self.open_app(f"open {app_name}")
-            
-            # Calculate similarity
-            similarity = self.calculate_similarity(text, app_name)
-            if similarity > best_score and similarity > 0.6:
-                best_score = similarity
-                best_match = app_name
         
+        # Character n-gram lookup tolerates typos and split words
+        best_match = self.app_index.best_match(text, threshold=0.6)
         if best_match:
             return self.open_app(f"open {best_match}")
         
         return None
 
+    def register_app(self, app_name, package):
+        """Add or update an app at runtime without rebuilding the index"""
+        app_name = app_name.lower().strip()
+        self.app_packages[app_name] = package
+        self.app_index.add(app_name, package)
+
     def get_suggestions(self, text):
         """Get command suggestions based on input"""
         suggestions = []
@@ -307,16 +322,7 @@ class LuaAssistant:
 
     def find_best_app_match(self, app_name):
         """Find best matching app name"""
-        best_match = None
-        best_score = 0
-        
-        for available_app in self.app_packages.keys():
-            similarity = self.calculate_similarity(app_name, available_app)
-            if similarity > best_score and similarity > 0.5:
-                best_score = similarity
-                best_match = available_app
-        
-        return best_match
+        return self.app_index.best_match(app_name, threshold=0.5)
 
     def make_call(self, text):
         """Handle call commands with contact/number extraction"""
@@ -516,8 +522,44 @@ class LuaAssistant:
         """Handle calculator commands"""
         return {"action": "open_calculator", "response": "Opening calculator"}
 
-# Initialize assistant
-lua = LuaAssistant()
+# Initialize database and assistant
+db = LuaDatabase()
+snapshot = SnapshotManager(default_path='lua_app.snap')
+lua = LuaAssistant(db, snapshot)
+snapshot.register(PATTERN_SECTION, lua.user_patterns.snapshot_items)
+emotional_ai = EmotionalIntelligence(snapshot)
+snapshot.start()
+
+# Batch emotion features run in worker processes, started by warm-up or the first batch
+emotion_batch = EmotionBatchProcessor(emotional_ai)
+atexit.register(emotion_batch.close)
+InMemoryRequest.endpoint_limits.update(register_emotion_routes(app, emotional_ai, emotion_batch))
+command_grammar.add_catalog(lambda: lua.app_packages)
+
+def warm_up():
+    """Load everything startup defers, so the first real request doesn't pay for it"""
+    started = time.monotonic()
+    try:
+        text_index.preload()
+        lua.app_index.best_match('warm up')
+        default_speech_cache().load()
+        tts_worker.start()
+        sphinx_pool.warm()
+        emotion_batch.warm()
+        print(f"Warm-up finished in {time.monotonic() - started:.2f}s")
+    except Exception as e:
+        print(f"Warm-up error: {e}")
+
+# Off by default: a sleeping instance woken by /ping answers before anything heavy loads
+if os.getenv('LUA_WARMUP') == '1':
+    threading.Thread(target=warm_up, name='warm-up', daemon=True).start()
+elif os.getenv('LUA_SPHINX_PRELOAD') == '1':
+    threading.Thread(target=sphinx_pool.warm, daemon=True).start()
+
+# Command logs are written in batches off the request path
+command_log = WriteBehindQueue(db.log_commands, name='command-log')
+
+MAX_BATCH_ITEMS = int(os.getenv('LUA_BATCH_MAX_ITEMS', 1000))
 
 @app.route('/api/process_voice', methods=['POST'])
 def process_voice():
@@ -526,11 +568,12 @@ def process_voice():
         data = request.get_json()
         text = data.get('text', '')
         user_id = data.get('user_id', 'default')
+        context = data.get('context', {})
         
         if not text:
             return jsonify({"error": "No text provided"}), 400
         
-        result = lua.process_command(text, user_id)
+        result = lua.process_command(text, user_id, context)
         
         # Log command for learning
         log_command(user_id, text, result)
@@ -540,74 +583,96 @@ def process_voice():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/process_voice_batch', methods=['POST'])
+def process_voice_batch():
+    """Process a list of {user_id, text, context} items in one call"""
+    try:
+        data = request.get_json()
+        items = data.get('items', [])
+        
+        if not isinstance(items, list) or not items:
+            return jsonify({"error": "No items provided"}), 400
+        if len(items) > MAX_BATCH_ITEMS:
+            return jsonify({"error": f"Batch limited to {MAX_BATCH_ITEMS} items"}), 400
+        
+        results = lua.process_batch(items)
+        
+        # Logged off the request path, in the same batches as single commands
+        rows = [
+            (
+                item.get('user_id', 'default'),
+                item['text'],
+                result.get('action', 'unknown'),
+                result.get('response', ''),
+                result.get('action') != 'unknown'
+            )
+            for item, result in zip(items, results)
+            if 'error' not in result
+        ]
+        command_log.put_many(rows)
+        
+        return jsonify({"results": results})
+    
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 @app.route('/api/speech_to_text', methods=['POST'])
 def speech_to_text():
     """Convert speech to text using real speech recognition"""
     try:
-        if 'audio' not in request.files:
+        if request.mimetype and request.mimetype.startswith('audio/'):
+            # Raw body upload, read straight from the request stream
+            buffer = read_limited(request.stream, MAX_AUDIO_BYTES, request.content_length)
+            audio = decode_audio(buffer, request.mimetype, request.mimetype_params)
+        elif 'audio' in request.files:
+            audio_file = request.files['audio']
+            stream = audio_file.stream
+            if isinstance(stream, io.BytesIO):
+                buffer = stream.getbuffer()
+                if len(buffer) > MAX_AUDIO_BYTES:
+                    raise AudioTooLarge(f"Audio larger than {MAX_AUDIO_BYTES} bytes")
+            else:
+                buffer = read_limited(stream, MAX_AUDIO_BYTES)
+            params = dict(audio_file.mimetype_params, **request.form.to_dict())
+            audio = decode_audio(buffer, audio_file.mimetype, params)
+        else:
             return jsonify({"error": "No audio file provided"}), 400
-        
-        audio_file = request.files['audio']
-        
-        # Save temporary file
-        temp_filename = secure_filename(audio_file.filename)
-        temp_path = f"/tmp/{temp_filename}"
-        audio_file.save(temp_path)
-        
-        # Process with speech recognition
-        with sr.AudioFile(temp_path) as source:
-            audio = recognizer.record(source)
             
-        try:
-            # Try Google Speech Recognition first
-            text = recognizer.recognize_google(audio)
-            confidence = 0.9
-        except sr.UnknownValueError:
-            try:
-                # Fallback to Sphinx (offline)
-                text = recognizer.recognize_sphinx(audio)
-                confidence = 0.7
-            except:
-                text = ""
-                confidence = 0.0
-        
-        # Clean up temp file
-        os.remove(temp_path)
+        # Google and Sphinx race, hedged and bounded by the recognition deadline
+        result = recognition_scheduler.recognize(audio)
+        text = result['text']
+        confidence = result['confidence']
         
         return jsonify({
             "text": text,
             "confidence": confidence
         })
     
+    except (AudioTooLarge, RequestEntityTooLarge) as e:
+        return jsonify({"error": str(e)}), 413
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @app.route('/api/text_to_speech', methods=['POST'])
 def text_to_speech():
-    """Convert text to speech"""
+    """Render text to WAV audio and return it"""
     try:
         data = request.get_json()
         text = data.get('text', '')
         
-        if text:
-            # Configure TTS
-            tts_engine.setProperty('rate', 150)
-            tts_engine.setProperty('volume', 0.8)
-            
-            # Set voice (try to use female voice)
-            voices = tts_engine.getProperty('voices')
-            if voices:
-                for voice in voices:
-                    if 'female' in voice.name.lower() or 'woman' in voice.name.lower():
-                        tts_engine.setProperty('voice', voice.id)
-                        break
-            
-            # Generate speech
-            tts_engine.say(text)
-            tts_engine.runAndWait()
+        if not text:
+            return jsonify({"error": "No text provided"}), 400
         
-        return jsonify({"status": "success"})
+        # pyttsx3 only renders whole files, so the reply waits for the full WAV
+        audio = tts_worker.synthesize(text, timeout=TTS_TIMEOUT)
+        return Response(audio, mimetype='audio/wav')
     
+    except TTSBusy as e:
+        return jsonify({"error": str(e)}), 503
+    except FuturesTimeout:
+        return jsonify({"error": "Speech synthesis timed out"}), 504
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -629,68 +694,65 @@ def learn_pattern():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/register_apps', methods=['POST'])
+def register_apps():
+    """Register device-reported apps for name resolution"""
+    try:
+        data = request.get_json()
+        apps = data.get('apps', [])
+        
+        registered = 0
+        for entry in apps:
+            app_name = entry.get('app_name', '')
+            package = entry.get('package', '')
+            if app_name and package:
+                lua.register_app(app_name, package)
+                registered += 1
+        
+        if registered:
+            # New app names become speakable on the next offline decode
+            command_grammar.invalidate()
+        
+        return jsonify({"status": "registered", "count": registered})
+    
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 @app.route('/api/user_stats', methods=['GET'])
 def get_user_stats():
     """Get user statistics"""
     try:
         user_id = request.args.get('user_id', 'default')
         
-        conn = sqlite3.connect('lua_assistant.db')
-        cursor = conn.cursor()
-        
-        # Total commands
-        cursor.execute("SELECT COUNT(*) FROM commands WHERE user_id = ?", (user_id,))
-        total_commands = cursor.fetchone()[0]
-        
-        # Recent commands
-        cursor.execute('''
-            SELECT command_text, response, timestamp 
-            FROM commands 
-            WHERE user_id = ? 
-            ORDER BY timestamp DESC 
-            LIMIT 10
-        ''', (user_id,))
-        recent_commands = cursor.fetchall()
-        
-        conn.close()
+        stats = db.get_user_stats(user_id)
+        stats["recent_commands"] = db.get_recent_commands(user_id, limit=10)
         
-        return jsonify({
-            "total_commands": total_commands,
-            "recent_commands": [
-                {
-                    "command": cmd[0],
-                    "response": cmd[1],
-                    "timestamp": cmd[2]
-                }
-                for cmd in recent_commands
-            ]
-        })
+        return jsonify(stats)
     
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 def log_command(user_id, command, result):
-    """Log commands for analytics"""
+    """Queue a command log row for analytics"""
     try:
-        conn = sqlite3.connect('lua_assistant.db')
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT INTO commands (user_id, command_text, intent, response, success)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (
+        command_log.put((
             user_id,
             command,
             result.get('action', 'unknown'),
             result.get('response', ''),
             result.get('action') != 'unknown'
         ))
-        
-        conn.commit()
-        conn.close()
     except:
         pass
 
+@app.route('/ping', methods=['GET', 'POST'])
+def ping():
+    """Simple ping endpoint to keep service awake"""
+    return jsonify({
+        "status": "pong",
+        "timestamp": datetime.now().isoformat()
+    })
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
@@ -703,7 +765,13 @@ def health_check():
             "AI Learning",
             "App Control",
             "Smart Commands"
-        ]
+        ],
+        "pattern_cache": lua.user_patterns.stats(),
+        "command_log": command_log.stats(),
+        "sphinx_pool": sphinx_pool.stats(),
+        "tts": tts_worker.stats(),
+        "snapshot": snapshot.stats(),
+        "emotion_batch": emotion_batch.stats()
     })
 
 @app.route('/', methods=['GET'])
@@ -714,18 +782,23 @@ def home():
         "version": "1.0.0",
         "endpoints": [
             "/api/process_voice",
+            "/api/process_voice_batch",
             "/api/speech_to_text",
             "/api/text_to_speech",
             "/api/learn",
+            "/api/register_apps",
             "/api/user_stats",
+            "/api/analyze_emotion",
+            "/api/analyze_emotion_batch",
+            "/api/emotion_history",
+            "/ping",
             "/health"
         ]
     })
 
 if __name__ == '__main__':
-    # Initialize database
-    from database.lua_db import LuaDatabase
-    db = LuaDatabase()
+    # Exit through atexit on SIGTERM so queued logs are drained
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
     
     port = int(os.environ.get('PORT', 5000))
     app.run(debug=False, host='0.0.0.0', port=port)
\ No newline at end of file
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+LUA Assistant - Audio Features
+The 28-dim emotion feature vector from one shared STFT, in float32
+
+Layout (unchanged from the original extractor):
+
+    [0:13]   MFCC means
+    [13]     spectral centroid mean
+    [14]     zero crossing rate mean
+    [15]     tempo (BPM)
+    [16:28]  chroma means
+
+Tiers:
+
+    full  everything, matching the separate librosa calls it replaces
+    fast  no tempo (0.0) and chroma at standard tuning, skipping the
+          onset/autocorrelation and pitch-tracking passes
+"""
+
+import functools
+import os
+
+import numpy as np
+
+FEATURE_DIM = 28
+N_MFCC = 13
+N_CHROMA = 12
+N_FFT = 2048
+HOP_LENGTH = 512
+TEMPO_INDEX = 15
+TIERS = ('fast', 'full')
+
+
+def default_tier():
+    return os.getenv('LUA_AUDIO_FEATURE_TIER', 'full')
+
+
+@functools.lru_cache(maxsize=8)
+def _mel_basis(sample_rate, n_fft):
+    import librosa
+    return librosa.filters.mel(sr=sample_rate, n_fft=n_fft, dtype=np.float32)
+
+
+@functools.lru_cache(maxsize=8)
+def _frequencies(sample_rate, n_fft):
+    return np.fft.rfftfreq(n_fft, 1.0 / sample_rate).astype(np.float32)
+
+
+@functools.lru_cache(maxsize=64)
+def _chroma_basis(sample_rate, n_fft, tuning):
+    import librosa
+    return librosa.filters.chroma(sr=sample_rate, n_fft=n_fft, tuning=tuning, n_chroma=N_CHROMA)
+
+
+def _zero_crossing_rate(y):
+    """librosa.feature.zero_crossing_rate with its defaults, averaged over frames"""
+    from numpy.lib.stride_tricks import sliding_window_view
+
+    padded = np.pad(y, N_FFT // 2, mode='edge')
+    frames = sliding_window_view(padded, N_FFT)[::HOP_LENGTH]
+    # Samples within 1e-10 of zero count as positive, as in librosa
+    signs = np.signbit(np.where(np.abs(frames) <= 1e-10, 0, frames))
+    crossings = signs[:, 1:] != signs[:, :-1]
+    return np.float32(crossings.sum(axis=1).mean() / N_FFT)
+
+
+def extract_features(y, sample_rate=22050, tier='full'):
+    """Return the float32 feature vector of a mono clip"""
+    import librosa
+    import scipy.fft
+
+    if tier not in TIERS:
+        raise ValueError(f"Unknown feature tier: {tier}")
+
+    y = np.ascontiguousarray(y, dtype=np.float32)
+
+    # The only STFT; every spectral feature below is derived from it
+    magnitude = np.abs(librosa.stft(y, n_fft=N_FFT, hop_length=HOP_LENGTH))
+    power = magnitude ** 2
+
+    mel_db = librosa.power_to_db(_mel_basis(sample_rate, N_FFT) @ power)
+    mfcc = scipy.fft.dct(mel_db, axis=0, type=2, norm='ortho')[:N_MFCC]
+
+    totals = magnitude.sum(axis=0)
+    weights = np.where(totals > np.finfo(np.float32).tiny, totals, 1.0)
+    centroid = (_frequencies(sample_rate, N_FFT) @ magnitude) / weights
+
+    tempo = 0.0
+    tuning = 0.0
+    if tier == 'full':
+        onset_envelope = librosa.onset.onset_strength(S=mel_db, sr=sample_rate, aggregate=np.median)
+        if onset_envelope.any():
+            tempo = float(librosa.feature.tempo(onset_envelope=onset_envelope, sr=sample_rate,
+                                                hop_length=HOP_LENGTH)[0])
+        tuning = float(librosa.estimate_tuning(S=power, sr=sample_rate, bins_per_octave=N_CHROMA))
+
+    chroma = librosa.util.normalize(_chroma_basis(sample_rate, N_FFT, tuning) @ power, norm=np.inf, axis=0)
+
+    features = np.empty(FEATURE_DIM, dtype=np.float32)
+    features[:N_MFCC] = mfcc.mean(axis=1)
+    features[13] = centroid.mean()
+    features[14] = _zero_crossing_rate(y)
+    features[TEMPO_INDEX] = tempo
+    features[16:] = chroma.mean(axis=1)
+    return features
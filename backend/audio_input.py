@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+LUA Assistant - Audio Input
+Decode uploaded audio in memory, without temporary files
+"""
+
+import io
+import os
+import struct
+
+import numpy as np
+import speech_recognition as sr
+
+MAX_AUDIO_BYTES = int(os.getenv('LUA_MAX_AUDIO_BYTES', 10 * 1024 * 1024))
+READ_CHUNK_SIZE = 64 * 1024
+
+# Raw PCM uploads: audio/pcm is little-endian (Android AudioRecord), audio/L16 is big-endian
+PCM_MIMETYPES = ('audio/pcm', 'audio/x-pcm', 'audio/l16')
+DEFAULT_PCM_RATE = 16000
+
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+class AudioTooLarge(ValueError):
+    """Upload exceeded MAX_AUDIO_BYTES"""
+
+
+def read_limited(stream, limit=MAX_AUDIO_BYTES, content_length=None):
+    """Read a stream into one buffer, failing as soon as limit is passed"""
+    if content_length is not None and content_length > limit:
+        raise AudioTooLarge(f"Audio larger than {limit} bytes")
+
+    buffer = bytearray()
+    while True:
+        chunk = stream.read(READ_CHUNK_SIZE)
+        if not chunk:
+            break
+        if len(buffer) + len(chunk) > limit:
+            raise AudioTooLarge(f"Audio larger than {limit} bytes")
+        buffer += chunk
+
+    return buffer
+
+
+def pcm_samples(frames, sample_width):
+    """Little-endian signed PCM of 2, 3 or 4 bytes per sample as an int32 array"""
+    frames = memoryview(frames)[:len(frames) - len(frames) % sample_width]
+    if sample_width == 3:
+        # Widen to int32 with the sample in the top three bytes, then shift back down
+        wide = np.zeros((len(frames) // 3, 4), dtype=np.uint8)
+        wide[:, 1:] = np.frombuffer(frames, dtype=np.uint8).reshape(-1, 3)
+        return wide.view('<i4').reshape(-1) >> 8
+    return np.frombuffer(frames, dtype=f'<i{sample_width}').astype(np.int32)
+
+
+def pcm_frames(samples, sample_width):
+    """int32 samples back to little-endian PCM bytes"""
+    if sample_width == 3:
+        return samples.astype('<i4').view(np.uint8).reshape(-1, 4)[:, :3].tobytes()
+    return samples.astype(f'<i{sample_width}').tobytes()
+
+
+def pcm_rms(frames, sample_width=2):
+    """Root mean square of little-endian signed PCM, in sample units"""
+    samples = pcm_samples(frames, sample_width)
+    if not len(samples):
+        return 0
+    return int(np.sqrt(np.mean(np.square(samples, dtype=np.float64))))
+
+
+def is_pcm_mimetype(mimetype):
+    return (mimetype or '').lower() in PCM_MIMETYPES
+
+
+def pcm_to_audio_data(buffer, mimetype, params=None):
+    """Wrap raw 16-bit mono PCM without any container parsing"""
+    params = params or {}
+    sample_rate = int(params.get('rate') or params.get('sample_rate') or DEFAULT_PCM_RATE)
+    frames = bytes(buffer)
+
+    if mimetype.lower() == 'audio/l16':
+        frames = np.frombuffer(frames, dtype='>i2', count=len(frames) // 2).astype('<i2').tobytes()
+
+    return sr.AudioData(frames, sample_rate, 2)
+
+
+def _wav_data_view(view):
+    """Return (fmt, data view) for a PCM WAV, or None if it needs the slow path"""
+    if len(view) < 12 or view[0:4] != b'RIFF' or view[8:12] != b'WAVE':
+        return None
+
+    fmt = None
+    position = 12
+    while position + 8 <= len(view):
+        chunk_id = bytes(view[position:position + 4])
+        size = struct.unpack_from('<I', view, position + 4)[0]
+        body = position + 8
+
+        if chunk_id == b'fmt ' and size >= 16:
+            fmt = struct.unpack_from('<HHIIHH', view, body)
+        elif chunk_id == b'data':
+            if fmt is None:
+                return None
+            # Streaming encoders leave the size at 0 or 0xFFFFFFFF
+            end = len(view) if size in (0, 0xFFFFFFFF) else min(body + size, len(view))
+            return fmt, view[body:end]
+
+        position = body + size + (size & 1)
+
+    return None
+
+
+def wav_to_audio_data(buffer):
+    """Parse a WAV held in memory, copying the PCM frames exactly once"""
+    view = memoryview(buffer)
+    parsed = _wav_data_view(view)
+
+    if parsed is not None:
+        (audio_format, channels, sample_rate, _, _, bits), data = parsed
+        sample_width = bits // 8
+        if audio_format in (WAVE_FORMAT_PCM, WAVE_FORMAT_EXTENSIBLE) and sample_width > 1 and channels in (1, 2):
+            frames = bytes(data[:len(data) - len(data) % (sample_width * channels)])
+            if channels == 2:
+                # Average left and right, rounding down as audioop.tomono did
+                stereo = pcm_samples(frames, sample_width).reshape(-1, 2).astype(np.int64)
+                frames = pcm_frames(stereo.sum(axis=1) >> 1, sample_width)
+            return sr.AudioData(frames, sample_rate, sample_width)
+
+    # AIFF, FLAC, 8-bit or otherwise unusual files go through speech_recognition
+    recognizer = sr.Recognizer()
+    with sr.AudioFile(io.BytesIO(view)) as source:
+        return recognizer.record(source)
+
+
+def decode_audio(buffer, mimetype=None, params=None):
+    """Turn an in-memory upload into sr.AudioData"""
+    if not len(buffer):
+        raise ValueError("Empty audio upload")
+
+    if is_pcm_mimetype(mimetype):
+        return pcm_to_audio_data(buffer, mimetype, params)
+
+    return wav_to_audio_data(buffer)
@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+"""
+LUA Assistant - Batch Items
+Validation of the {user_id, text, context} items in a batch, shared by app and main
+"""
+
+
+def parse_batch_item(item):
+    """Return (user_id, text, context) for one batch item; ValueError describes a bad one
+
+    Each item is checked on its own, so one bad item gets an error entry
+    instead of failing the whole batch.
+    """
+    if not isinstance(item, dict):
+        raise ValueError("Item must be an object")
+    text = item.get('text')
+    if text is not None and not isinstance(text, str):
+        raise ValueError("text must be a string")
+    if not text or not text.strip():
+        raise ValueError("No command text provided")
+    user_id = item.get('user_id', 'default')
+    if not isinstance(user_id, str) or not user_id:
+        raise ValueError("user_id must be a non-empty string")
+    context = item.get('context')
+    if context is None:
+        context = {}
+    elif not isinstance(context, dict):
+        raise ValueError("context must be an object")
+    return user_id, text, context
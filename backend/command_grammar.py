@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+LUA Assistant - Command Grammar
+JSGF grammar for offline decoding, generated from the intent table and app catalogs
+"""
+
+import logging
+import re
+import threading
+from collections import namedtuple
+
+from intent_classifier import INTENT_TABLE, TOKEN_PATTERN
+
+logger = logging.getLogger(__name__)
+
+CompiledGrammar = namedtuple('CompiledGrammar', ['version', 'jsgf', 'pronunciations', 'skipped'])
+
+DIGIT_WORDS = {
+    'zero': '0', 'oh': '0', 'one': '1', 'two': '2', 'three': '3', 'four': '4',
+    'five': '5', 'six': '6', 'seven': '7', 'eight': '8', 'nine': '9'
+}
+
+NUMBER_WORDS = {
+    'ten': 10, 'eleven': 11, 'twelve': 12, 'thirteen': 13, 'fourteen': 14,
+    'fifteen': 15, 'sixteen': 16, 'seventeen': 17, 'eighteen': 18, 'nineteen': 19,
+    'twenty': 20, 'thirty': 30, 'forty': 40, 'fifty': 50
+}
+
+# The phrasings make_call and set_reminder extract numbers and times from
+TIME_UNITS = ('minute', 'minutes', 'hour', 'hours')
+DAY_WORDS = ('today', 'tomorrow', 'tonight')
+MERIDIEM_WORDS = ('am', 'pm')
+
+# Short everyday words for the free slots: contacts, reminder titles, message bodies.
+# Kept small on purpose - an open word loop makes the grammar slower than the full LM.
+SLOT_WORDS = (
+    'mom', 'dad', 'home', 'work', 'office', 'meeting', 'doctor', 'milk', 'bills',
+    'medicine', 'water', 'lunch', 'dinner', 'hello', 'yes', 'no', 'coming', 'late'
+)
+
+# Intents whose slots take arbitrary words: contact names, message bodies, song
+# titles. SLOT_WORDS covers only a few, so their hypotheses are decoded again
+# against the language model
+FREE_TEXT_INTENTS = ('call', 'message', 'reminder', 'music')
+
+JSGF_SAFE = re.compile(r"^[a-z][a-z0-9]*$")
+
+
+class PronunciationDictionary:
+    """Word lookups against a CMU-format dictionary, loaded once per path"""
+
+    _loaded = {}
+    _lock = threading.Lock()
+
+    def __init__(self, entries):
+        self.entries = entries
+
+    @classmethod
+    def load(cls, path):
+        with cls._lock:
+            dictionary = cls._loaded.get(path)
+            if dictionary is None:
+                entries = {}
+                with open(path, encoding='utf-8', errors='ignore') as f:
+                    for line in f:
+                        word, _, phones = line.strip().partition(' ')
+                        # Alternate pronunciations are listed as word(2); the first one is enough
+                        if word and '(' not in word:
+                            entries.setdefault(word, phones.strip())
+                dictionary = cls._loaded[path] = cls(entries)
+            return dictionary
+
+    def __contains__(self, word):
+        return word in self.entries
+
+    def compound(self, word, max_cost=4):
+        """Spell an unknown word as known pieces, e.g. gmail -> g + mail
+
+        Returns the joined phones, or None when no cheap split exists. Single
+        letters cost double so whole words are preferred over spelling.
+        """
+        best = [(0, [])] + [None] * len(word)
+        for end in range(1, len(word) + 1):
+            for start in range(end):
+                if best[start] is None:
+                    continue
+                piece = word[start:end]
+                if piece not in self.entries:
+                    continue
+                cost = best[start][0] + (2 if len(piece) == 1 else 1)
+                if best[end] is None or cost < best[end][0]:
+                    best[end] = (cost, best[start][1] + [piece])
+
+        if best[-1] is None or best[-1][0] > max_cost or len(best[-1][1]) < 2:
+            return None
+        return ' '.join(self.entries[piece] for piece in best[-1][1])
+
+
+class CommandGrammar:
+    """Builds one JSGF grammar covering every command the backend understands
+
+    Catalogs are callables returning app names; they are read again on every
+    rebuild, so registering an app only has to call invalidate().
+    """
+
+    def __init__(self, catalogs=(), table=INTENT_TABLE, name='commands'):
+        self.catalogs = list(catalogs)
+        self.table = table
+        self.name = name
+        self.version = 1
+        self._compiled = {}
+        self._lock = threading.Lock()
+
+        # trigger word -> intent, for the intents with free-text slots
+        self._free_text = {}
+        for intent, _, keywords in table:
+            if intent in FREE_TEXT_INTENTS:
+                for keyword in keywords:
+                    for word in TOKEN_PATTERN.findall(keyword.lower()):
+                        self._free_text.setdefault(word, intent)
+
+    def add_catalog(self, catalog):
+        self.catalogs.append(catalog)
+        self.invalidate()
+
+    def invalidate(self):
+        """Mark the grammar stale; decoders pick up the new one on their next lease"""
+        with self._lock:
+            self.version += 1
+
+    def app_names(self):
+        names = set()
+        for catalog in self.catalogs:
+            try:
+                names.update(name.lower() for name in catalog())
+            except Exception as e:
+                logger.warning(f"Grammar catalog error: {e}")
+        return sorted(names)
+
+    def compile(self, dictionary_path):
+        """Return the CompiledGrammar for the current version, building it once"""
+        with self._lock:
+            version = self.version
+            compiled = self._compiled.get(dictionary_path)
+            if compiled is not None and compiled.version == version:
+                return compiled
+
+        dictionary = PronunciationDictionary.load(dictionary_path)
+        pronunciations = {}
+        skipped = set()
+
+        def speakable(words):
+            kept = []
+            for word in words:
+                if not JSGF_SAFE.match(word):
+                    skipped.add(word)
+                elif word in dictionary or word in pronunciations:
+                    kept.append(word)
+                else:
+                    phones = dictionary.compound(word)
+                    if phones:
+                        pronunciations[word] = phones
+                        kept.append(word)
+                    else:
+                        skipped.add(word)
+            return kept
+
+        def phrases(texts):
+            """Alternatives for multi-word phrases; phrases with an unspeakable word are dropped"""
+            result = []
+            for text in texts:
+                tokens = TOKEN_PATTERN.findall(text.lower())
+                if tokens and len(speakable(tokens)) == len(tokens):
+                    result.append(' '.join(tokens))
+            return sorted(set(result))
+
+        apps = phrases(self.app_names())
+        digits = speakable(DIGIT_WORDS)
+        numbers = speakable(NUMBER_WORDS)
+        rules = {}
+        for intent, _, keywords in self.table:
+            triggers = phrases(keywords)
+            if triggers:
+                rules[intent] = triggers
+
+        def alternatives(words):
+            # <VOID> keeps the rule valid if a dictionary lacks every word
+            return ' | '.join(words) if words else '<VOID>'
+
+        counts = [word for word in digits if DIGIT_WORDS[word] != '0'] + numbers
+        lines = [
+            '#JSGF V1.0;',
+            f'grammar {self.name};',
+            'public <command> = [<polite>] (' + ' | '.join(f'<{intent}>' for intent in rules) + ') [please];',
+            '<polite> = ' + alternatives(speakable(('hey', 'okay'))) + ';',
+            '<digit> = ' + alternatives(digits) + ';',
+            '<count> = ' + alternatives(counts) + ';',
+            '<time> = (at <count> [' + alternatives(speakable(MERIDIEM_WORDS)) + '])'
+            + ' | (in <count> (' + alternatives(speakable(TIME_UNITS)) + '))'
+            + ' | ' + alternatives(speakable(DAY_WORDS)) + ';',
+            '<slot> = ' + alternatives(speakable(SLOT_WORDS)) + ';',
+            '<lead> = show [me] | take a | check [the] | what is the;',
+            '<app> = ' + alternatives(apps) + ';',
+        ]
+
+        # Every slot is bounded; only the phone number loops, over ten words
+        slots = {
+            'open': '[the] <app> [app]',
+            'call': '[to] (<digit>+ | <slot>)',
+            'reminder': '[me] [to] [<slot> [<slot>]] [<time>]',
+            'message': '[to] <slot> [<slot>]',
+        }
+        for intent, triggers in rules.items():
+            choice = '(' + ' | '.join(triggers) + ')'
+            # Simple intents: "weather", "show me photos", "play next song"
+            rule = slots.get(intent, f'[{choice}]')
+            lead = '' if intent in slots else '[<lead>] '
+            lines.append(f'<{intent}> = {lead}{choice} {rule};')
+
+        compiled = CompiledGrammar(version, '\n'.join(lines) + '\n', pronunciations, sorted(skipped))
+        if compiled.skipped:
+            logger.info(f"Grammar v{version} skipped unpronounceable words: {', '.join(compiled.skipped)}")
+
+        with self._lock:
+            self._compiled[dictionary_path] = compiled
+        return compiled
+
+    def needs_language_model(self, text):
+        """True when a grammar hypothesis cannot be trusted for its free-text slots
+
+        An empty hypothesis means the utterance was outside the grammar; one
+        for a free-text intent may have forced "play <any song>" onto the
+        nearest in-grammar words. A call to a spoken number is fully covered.
+        """
+        if not text:
+            return True
+        words = text.split()
+        intents = {self._free_text[word] for word in words if word in self._free_text}
+        if intents == {'call'} and any(word.isdigit() for word in words):
+            return False
+        return bool(intents)
+
+    def normalize(self, text):
+        """Rewrite spoken numbers the way the command handlers expect them
+
+        Runs of digit words become a number ("nine eight seven ..." -> "987...")
+        so make_call sees a phone number, and counts after at/in become digits
+        so set_reminder's time patterns match.
+        """
+        words = text.split()
+        output = []
+        position = 0
+        while position < len(words):
+            end = position
+            while end < len(words) and words[end] in DIGIT_WORDS:
+                end += 1
+            if end - position >= 3:
+                output.append(''.join(DIGIT_WORDS[word] for word in words[position:end]))
+                position = end
+                continue
+
+            word = words[position]
+            if output and output[-1] in ('at', 'in') and (word in DIGIT_WORDS or word in NUMBER_WORDS):
+                value = NUMBER_WORDS.get(word) or int(DIGIT_WORDS[word])
+                # "forty five", "twenty one"
+                if value >= 20 and position + 1 < len(words) and words[position + 1] in DIGIT_WORDS:
+                    value += int(DIGIT_WORDS[words[position + 1]])
+                    position += 1
+                output.append(str(value))
+            else:
+                output.append(word)
+            position += 1
+
+        return ' '.join(output)
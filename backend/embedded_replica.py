@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+"""
+LUA Assistant - Embedded Replica
+Local SQLite copy of the Turso tables that serves reads, synced incrementally from the primary
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from write_behind import WriteBehindQueue
+
+logger = logging.getLogger(__name__)
+
+# (table, watermark column); rows at or past the watermark are pulled again and upserted
+SYNC_TABLES = (
+    ('users', 'last_active'),
+    ('commands', 'id'),
+    ('user_stats_rollup', 'updated_at'),
+)
+
+
+class ResultSet:
+    """The parts of a libsql_client result set the backend reads"""
+
+    def __init__(self, columns, rows):
+        self.columns = columns
+        self.rows = rows
+
+
+class LocalClient:
+    """libsql_client-compatible client over a SQLite file
+
+    Holds the replica, and also stands in for Turso in tests and benchmarks;
+    latency adds a fixed delay per call to mimic a network round trip.
+    """
+
+    def __init__(self, path, latency=0.0):
+        self.path = path
+        self.latency = latency
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._lock = threading.Lock()
+
+    def _run(self, cursor, sql, args):
+        cursor.execute(sql, args or [])
+        columns = tuple(d[0] for d in cursor.description) if cursor.description else ()
+        return ResultSet(columns, cursor.fetchall())
+
+    def execute(self, sql, args=None):
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            return self._run(self._conn.cursor(), sql, args)
+
+    def batch(self, statements):
+        """Run (sql, args) statements in one transaction"""
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            cursor = self._conn.cursor()
+            cursor.execute("BEGIN")
+            try:
+                results = [self._run(cursor, sql, args) for sql, args in statements]
+                cursor.execute("COMMIT")
+            except BaseException:
+                cursor.execute("ROLLBACK")
+                raise
+            return results
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def is_read(sql):
+    return sql.lstrip().split(None, 1)[0].upper() in ('SELECT', 'WITH')
+
+
+class EmbeddedReplica:
+    """Reads from a local replica, writes to the primary
+
+    The replica is refreshed every LUA_REPLICA_SYNC_INTERVAL seconds and soon
+    after each write reaches the primary. Only rows whose watermark column
+    moved are pulled, in a single batch round trip per sync.
+    Deletes are not replicated; the backend never deletes rows.
+
+    Reads fall through to the primary when the last sync is older than
+    LUA_REPLICA_MAX_STALENESS, when fresh=True, or when read_your_writes names
+    a key with writes the replica has not seen yet and they cannot be synced
+    within the wait timeout.
+    """
+
+    def __init__(self, primary, path=None, sync_interval=None, max_staleness=None,
+                 tables=SYNC_TABLES, wait_timeout=2.0):
+        self.primary = primary
+        self.path = path or os.getenv('LUA_REPLICA_PATH', 'lua_replica.db')
+        self.sync_interval = sync_interval or float(os.getenv('LUA_REPLICA_SYNC_INTERVAL', 30))
+        self.max_staleness = max_staleness or float(os.getenv('LUA_REPLICA_MAX_STALENESS', 120))
+        self.tables = tables
+        self.wait_timeout = wait_timeout
+        self.local = LocalClient(self.path)
+        self.local.execute(
+            "CREATE TABLE IF NOT EXISTS _replica_state (name TEXT PRIMARY KEY, schema TEXT, watermark)"
+        )
+
+        # Write sequence numbers: issued, not yet answered by the primary, covered by a sync
+        self._seq = 0
+        self._pending = set()
+        self._synced_seq = 0
+        self._last_write = {}
+        self._cond = threading.Condition()
+
+        self.synced_at = None
+        self.syncs = 0
+        self.sync_errors = 0
+        self.rows_pulled = 0
+        # Tables the primary had at the last sync; only these are pulled
+        self._present = set()
+        self.local_reads = 0
+        self.primary_reads = 0
+
+        self._sync_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        self._writes = WriteBehindQueue(self._flush_writes, overflow='block', name='replica-writes')
+
+        try:
+            self.sync()
+        except Exception as e:
+            logger.error(f"Initial replica sync failed, reading from primary: {e}")
+
+        self._thread = threading.Thread(target=self._run, name='replica-sync', daemon=True)
+        self._thread.start()
+
+    # Sync
+
+    def _pull_statement(self, table, watermark_column, watermark):
+        if watermark is None:
+            return (f"SELECT * FROM {table}", [])
+        return (f"SELECT * FROM {table} WHERE {watermark_column} >= ?", [watermark])
+
+    def _rebuild(self, table, schema):
+        """Recreate the local table from the primary's current schema"""
+        logger.info(f"Rebuilding replica table {table}")
+        self.local.batch(
+            [(f"DROP TABLE IF EXISTS {table}", None)]
+            + [(sql, None) for sql in schema]
+            + [("INSERT OR REPLACE INTO _replica_state (name, schema, watermark) VALUES (?, ?, NULL)",
+                [table, ';\n'.join(schema)])]
+        )
+
+    def _apply(self, table, watermark_column, result):
+        if not result.rows:
+            return 0
+
+        columns = list(result.columns)
+        position = columns.index(watermark_column)
+        values = [row[position] for row in result.rows if row[position] is not None]
+        placeholders = ', '.join('?' for _ in columns)
+        statements = [
+            (f"INSERT OR REPLACE INTO {table} ({', '.join(columns)}) VALUES ({placeholders})", list(row))
+            for row in result.rows
+        ]
+        if values:
+            statements.append(
+                ("UPDATE _replica_state SET watermark = ? WHERE name = ?", [max(values), table])
+            )
+        self.local.batch(statements)
+        return len(result.rows)
+
+    def _pull(self):
+        """One round trip for the schema check and the changes of every table the primary has
+
+        A table missing on the primary would fail the whole batch, so only
+        tables seen by the previous schema check are pulled; one that has
+        just appeared is pulled by a second round trip.
+        """
+        state = {
+            row[0]: (row[1], row[2])
+            for row in self.local.execute("SELECT name, schema, watermark FROM _replica_state").rows
+        }
+        names = [table for table, _ in self.tables]
+        pulling = [(table, column) for table, column in self.tables if table in self._present]
+        # Triggers stay on the primary; the rows they write are pulled like any other
+        statements = [(
+            f"SELECT tbl_name, sql FROM sqlite_master WHERE tbl_name IN ({', '.join('?' for _ in names)}) "
+            "AND type IN ('table', 'index') AND sql IS NOT NULL ORDER BY type DESC, name",
+            names
+        )]
+        statements.extend(
+            self._pull_statement(table, column, state.get(table, (None, None))[1])
+            for table, column in pulling
+        )
+        try:
+            results = self.primary.batch(statements)
+        except Exception:
+            # A table may have been dropped; learn the schema again next time
+            self._present = set()
+            raise
+
+        schemas = {}
+        for table, sql in results[0].rows:
+            schemas.setdefault(table, []).append(sql)
+
+        pulled = 0
+        for (table, column), result in zip(pulling, results[1:]):
+            schema = schemas.get(table)
+            if not schema:
+                continue
+            stored_schema, watermark = state.get(table, (None, None))
+            if stored_schema != ';\n'.join(schema):
+                self._rebuild(table, schema)
+                if watermark is not None:
+                    # The incremental pull above no longer fits the rebuilt table
+                    result = self.primary.execute(*self._pull_statement(table, column, None))
+            pulled += self._apply(table, column, result)
+
+        added = set(schemas) - self._present
+        self._present = set(schemas)
+        if added:
+            pulled += self._pull()
+        return pulled
+
+    def sync(self):
+        """Pull changed rows from the primary"""
+        with self._sync_lock:
+            started = time.time()
+            with self._cond:
+                covered = self._settled()
+            try:
+                pulled = self._pull()
+            except Exception:
+                self.sync_errors += 1
+                raise
+            self.rows_pulled += pulled
+            self.syncs += 1
+            self.synced_at = started
+            with self._cond:
+                self._synced_seq = max(self._synced_seq, covered)
+                # Keys whose writes are all visible locally need no tracking
+                self._last_write = {
+                    key: seq for key, seq in self._last_write.items() if seq > self._synced_seq
+                }
+                self._cond.notify_all()
+
+    def _run(self):
+        while not self._closed:
+            self._wake.wait(self.sync_interval)
+            self._wake.clear()
+            if self._closed:
+                return
+            try:
+                self.sync()
+            except Exception as e:
+                logger.error(f"Replica sync failed: {e}")
+
+    # Writes
+
+    def _issue(self, keys):
+        with self._cond:
+            self._seq += 1
+            self._pending.add(self._seq)
+            for key in keys:
+                self._last_write[key] = self._seq
+            return self._seq
+
+    def _settled(self):
+        """Highest sequence number with no earlier write still in flight; caller holds the lock"""
+        return min(self._pending) - 1 if self._pending else self._seq
+
+    def _ack(self, seqs):
+        with self._cond:
+            self._pending.difference_update(seqs)
+            self._cond.notify_all()
+        self._wake.set()
+
+    def _flush_writes(self, rows):
+        try:
+            self.primary.batch([statement for _, statements in rows for statement in statements])
+        finally:
+            # Failed rows are lost either way; don't leave readers waiting on them
+            self._ack([seq for seq, _ in rows])
+
+    def write(self, statements, key=None):
+        """Queue (sql, args) statements for the primary; returns the write's sequence number"""
+        seq = self._issue([key] if key is not None else [])
+        if not self._writes.put((seq, list(statements))):
+            self._ack([seq])
+        return seq
+
+    def reserve(self, key=None):
+        """Sequence number for a write the caller queues and sends later with batch(seqs=...)
+
+        Issued when the write is accepted rather than when it reaches the
+        primary, so a read_your_writes read in between waits for it.
+        """
+        return self._issue([key] if key is not None else [])
+
+    def release(self, seqs):
+        """Give up reserved writes that will never be sent"""
+        self._ack(seqs)
+
+    def batch(self, statements, keys=(), seqs=()):
+        """Write statements to the primary now, in one transaction; seqs are the reserved writes it carries"""
+        seq = self._issue(keys)
+        try:
+            return self.primary.batch(statements)
+        finally:
+            self._ack([seq, *seqs])
+
+    # Reads
+
+    def _stale(self):
+        return self.synced_at is None or time.time() - self.synced_at > self.max_staleness
+
+    def _caught_up(self, key):
+        """Wait until the replica reflects every write made under key"""
+        with self._cond:
+            seq = self._last_write.get(key, 0)
+            if seq <= self._synced_seq:
+                return True
+            if not self._cond.wait_for(lambda: self._settled() >= seq, self.wait_timeout):
+                return False
+        try:
+            self.sync()
+        except Exception:
+            return False
+        with self._cond:
+            return seq <= self._synced_seq
+
+    def execute(self, sql, args=None, fresh=False, read_your_writes=None):
+        """Run a query on the replica, or on the primary when it cannot answer"""
+        if not is_read(sql):
+            return self.batch([(sql, args)])[0]
+
+        if fresh or self._stale() or (read_your_writes is not None and not self._caught_up(read_your_writes)):
+            self.primary_reads += 1
+            return self.primary.execute(sql, args or [])
+
+        self.local_reads += 1
+        return self.local.execute(sql, args)
+
+    def close(self):
+        self._closed = True
+        self._writes.close()
+        self._wake.set()
+
+    def stats(self):
+        with self._cond:
+            pending = len(self._pending)
+        return {
+            'path': self.path,
+            'lag_seconds': round(time.time() - self.synced_at, 1) if self.synced_at else None,
+            'syncs': self.syncs,
+            'sync_errors': self.sync_errors,
+            'rows_pulled': self.rows_pulled,
+            'local_reads': self.local_reads,
+            'primary_reads': self.primary_reads,
+            'pending_writes': pending
+        }
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+LUA Assistant - Emotion Batch
+Emotion analysis for many clips at once: features in worker processes, scoring as one matrix
+
+The PCM of a batch is packed into one shared memory block and the workers
+write their feature rows into a second one, so only offsets cross the
+process boundary. Feature extraction is CPU bound under the GIL; running it
+in separate processes keeps a backfill from starving the request threads.
+"""
+
+import logging
+import os
+import sys
+import threading
+import types
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from multiprocessing import get_all_start_methods, get_context, shared_memory
+
+import numpy as np
+
+import audio_features
+
+logger = logging.getLogger(__name__)
+
+
+def _attach(name):
+    # Pool workers share the parent's resource tracker, so the attach is
+    # tracked once and the parent's unlink clears it
+    return shared_memory.SharedMemory(name=name)
+
+
+def _warm_worker():
+    """Pay the librosa import once per worker instead of in the first chunk"""
+    import librosa  # noqa: F401
+
+
+def _ready():
+    """Lets warm() wait until a worker is up"""
+    return os.getpid()
+
+
+_main_lock = threading.Lock()
+
+
+@contextmanager
+def _without_main_script():
+    """Start pool workers without re-running the server script in them
+
+    spawn and forkserver workers re-run the parent's __main__ file to rebuild
+    its globals. For app.py that means the database, the snapshot writer and
+    the log queues, atexit hooks included, in every worker. The pool only
+    runs functions from this module, so workers started inside this block
+    are given an empty __main__ instead.
+    """
+    with _main_lock:
+        main = sys.modules['__main__']
+        sys.modules['__main__'] = types.ModuleType('__main__')
+        try:
+            yield
+        finally:
+            sys.modules['__main__'] = main
+
+
+def _extract_chunk(pcm_name, pcm_size, features_name, count, spans, tier):
+    """Fill the feature rows of spans [(index, offset, length, sample_rate)]; return failed (index, error)"""
+    pcm_segment = _attach(pcm_name)
+    features_segment = _attach(features_name)
+    failed = []
+    try:
+        pcm = np.ndarray((pcm_size,), dtype=np.float32, buffer=pcm_segment.buf)
+        features = np.ndarray((count, audio_features.FEATURE_DIM), dtype=np.float32, buffer=features_segment.buf)
+        for index, offset, length, sample_rate in spans:
+            try:
+                features[index] = audio_features.extract_features(pcm[offset:offset + length], sample_rate, tier)
+            except Exception as e:
+                features[index] = 0.0
+                failed.append((index, str(e)))
+        del pcm, features
+    finally:
+        pcm_segment.close()
+        features_segment.close()
+    return failed
+
+
+class EmotionBatchProcessor:
+    """Analyze lists of clips in input order using a lazily started process pool"""
+
+    def __init__(self, emotional_ai, workers=None, tier=None, chunks_per_worker=4):
+        self.emotional_ai = emotional_ai
+        self.workers = workers if workers is not None else int(
+            os.getenv('LUA_EMOTION_WORKERS', max(1, (os.cpu_count() or 2) - 1))
+        )
+        self.tier = tier or os.getenv('LUA_EMOTION_BATCH_TIER', emotional_ai.feature_tier)
+        self.chunks_per_worker = chunks_per_worker
+
+        self._pool = None
+        self._lock = threading.Lock()
+
+        self.batches = 0
+        self.clips = 0
+        self.failed = 0
+
+    def _executor(self):
+        with self._lock:
+            if self._pool is None:
+                # Forking the threaded server can copy locks held by its other
+                # threads into the child. forkserver forks workers from a small
+                # single-threaded server instead, with numpy and librosa loaded
+                if 'forkserver' in get_all_start_methods():
+                    context = get_context('forkserver')
+                    context.set_forkserver_preload(['emotion_batch', 'librosa'])
+                else:
+                    context = get_context('spawn')
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=context, initializer=_warm_worker
+                )
+            return self._pool
+
+    def _submit(self, function, *args):
+        # Workers are started by submit(); see _without_main_script
+        with _without_main_script():
+            return self._executor().submit(function, *args)
+
+    def warm(self):
+        """Start every worker now, so the first batch doesn't wait for them"""
+        if self.workers > 0:
+            for future in [self._submit(_ready) for _ in range(self.workers)]:
+                future.result()
+            logger.info(f"Emotion batch pool ready ({self.workers} workers)")
+
+    def _chunks(self, spans):
+        """Split spans into chunks of roughly equal sample counts"""
+        target = sum(span[2] for span in spans) / max(1, self.workers * self.chunks_per_worker)
+        chunk, size = [], 0
+        for span in spans:
+            chunk.append(span)
+            size += span[2]
+            if size >= target:
+                yield chunk
+                chunk, size = [], 0
+        if chunk:
+            yield chunk
+
+    def extract(self, clips, sample_rates=22050):
+        """Return (features, errors): a float32 (n, 28) matrix and {index: error} for clips that failed"""
+        if np.isscalar(sample_rates):
+            sample_rates = [sample_rates] * len(clips)
+        clips = [np.asarray(clip, dtype=np.float32).reshape(-1) for clip in clips]
+        count = len(clips)
+        if not count:
+            return np.zeros((0, audio_features.FEATURE_DIM), dtype=np.float32), {}
+
+        if self.workers <= 0:
+            errors = {}
+            features = np.zeros((count, audio_features.FEATURE_DIM), dtype=np.float32)
+            for index, (clip, sample_rate) in enumerate(zip(clips, sample_rates)):
+                try:
+                    features[index] = audio_features.extract_features(clip, sample_rate, self.tier)
+                except Exception as e:
+                    errors[index] = str(e)
+            return features, errors
+
+        spans = []
+        offset = 0
+        for index, (clip, sample_rate) in enumerate(zip(clips, sample_rates)):
+            spans.append((index, offset, len(clip), int(sample_rate)))
+            offset += len(clip)
+
+        pcm_segment = shared_memory.SharedMemory(create=True, size=max(1, offset) * 4)
+        features_segment = shared_memory.SharedMemory(create=True, size=count * audio_features.FEATURE_DIM * 4)
+        try:
+            pcm = np.ndarray((offset,), dtype=np.float32, buffer=pcm_segment.buf)
+            for (_, start, length, _), clip in zip(spans, clips):
+                pcm[start:start + length] = clip
+            del pcm
+
+            # Longest clips first so a long one doesn't finish the batch alone
+            spans.sort(key=lambda span: span[2], reverse=True)
+            futures = [
+                self._submit(_extract_chunk, pcm_segment.name, offset, features_segment.name, count, chunk, self.tier)
+                for chunk in self._chunks(spans)
+            ]
+            errors = {}
+            for future in futures:
+                errors.update(future.result())
+
+            shared = np.ndarray((count, audio_features.FEATURE_DIM), dtype=np.float32, buffer=features_segment.buf)
+            features = shared.copy()
+            del shared
+        finally:
+            pcm_segment.close()
+            pcm_segment.unlink()
+            features_segment.close()
+            features_segment.unlink()
+
+        return features, errors
+
+    def analyze(self, clips, sample_rates=22050, texts=None):
+        """Detect the emotion of every clip, returning one result dict per clip in input order"""
+        features, errors = self.extract(clips, sample_rates)
+        emotions = self.emotional_ai.classify_batch(features, texts)
+
+        self.batches += 1
+        self.clips += len(emotions)
+        self.failed += len(errors)
+        if errors:
+            logger.warning(f"Emotion features failed for {len(errors)} of {len(emotions)} clips")
+
+        return [
+            {
+                'index': index,
+                'emotion': emotion,
+                'features': features[index].tolist(),
+                'error': errors.get(index)
+            }
+            for index, emotion in enumerate(emotions)
+        ]
+
+    def close(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=True)
+                self._pool = None
+
+    def stats(self):
+        return {
+            'workers': self.workers,
+            'started': self._pool is not None,
+            'tier': self.tier,
+            'batches': self.batches,
+            'clips': self.clips,
+            'failed': self.failed
+        }
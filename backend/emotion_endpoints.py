@@ -1,54 +1,119 @@
-@app.route('/api/analyze_emotion', methods=['POST'])
-def analyze_emotion():
-    """Analyze emotion from voice command"""
-    try:
-        data = request.get_json()
-        user_id = data.get('user_id', 'default')
-        command_text = data.get('text', '')
-        confidence = data.get('confidence', 0.8)
-        
-        if not command_text:
-            return jsonify({'error': 'No text provided'}), 400
-        
-        # Detect emotion from text and voice patterns
-        emotion = emotional_ai.detect_emotion_from_voice_patterns(command_text, confidence)
-        
-        # Get emotional response
-        emotional_response = emotional_ai.get_emotional_response(emotion, user_id)
-        
-        # Adjust response style based on user patterns
-        adjusted_response = emotional_ai.adjust_response_style(
-            user_id, 
-            emotional_response['response']
-        )
-        
-        return jsonify({
-            'detected_emotion': emotion,
-            'empathy_level': emotional_response['empathy_level'],
-            'emotional_response': adjusted_response,
-            'suggestions': emotional_response['suggestions'],
-            'emotion_patterns': emotional_ai.get_emotion_patterns(user_id)
-        })
-        
-    except Exception as e:
-        logger.error(f"Emotion analysis error: {e}")
-        return jsonify({'error': str(e)}), 500
-
-@app.route('/api/emotion_history', methods=['GET'])
-def get_emotion_history():
-    """Get user's emotion history and patterns"""
-    try:
-        user_id = request.args.get('user_id', 'default')
-        patterns = emotional_ai.get_emotion_patterns(user_id)
-        
-        return jsonify({
-            'user_id': user_id,
-            'emotion_patterns': patterns,
-            'recommendations': emotional_ai.get_emotion_suggestions(
-                patterns.get('recent_trend', 'neutral')
+#!/usr/bin/env python3
+"""
+LUA Assistant - Emotion Endpoints
+Emotion analysis routes, registered on the Flask app by register_emotion_routes
+"""
+
+import logging
+import os
+
+import numpy as np
+from flask import request, jsonify
+from werkzeug.exceptions import RequestEntityTooLarge
+
+from audio_input import MAX_AUDIO_BYTES, AudioTooLarge, read_limited, decode_audio
+
+logger = logging.getLogger(__name__)
+
+MAX_BATCH_CLIPS = int(os.getenv('LUA_EMOTION_BATCH_MAX_CLIPS', 16))
+# A full batch of clips plus the multipart framing and text fields
+MAX_BATCH_BYTES = MAX_AUDIO_BYTES * MAX_BATCH_CLIPS + 64 * 1024
+
+
+def register_emotion_routes(app, emotional_ai, emotion_batch):
+    """Add the emotion routes to app; returns {endpoint: body limit} for routes above the default"""
+
+    @app.route('/api/analyze_emotion', methods=['POST'])
+    def analyze_emotion():
+        """Analyze emotion from voice command"""
+        try:
+            data = request.get_json()
+            user_id = data.get('user_id', 'default')
+            command_text = data.get('text', '')
+            confidence = data.get('confidence', 0.8)
+
+            if not command_text:
+                return jsonify({'error': 'No text provided'}), 400
+
+            # Detect emotion from text and voice patterns
+            emotion = emotional_ai.detect_emotion_from_voice_patterns(command_text, confidence)
+
+            # Get emotional response
+            emotional_response = emotional_ai.get_emotional_response(emotion, user_id)
+
+            # Adjust response style based on user patterns
+            patterns = emotional_ai.get_emotion_patterns(user_id)
+            adjusted_response = emotional_ai.adjust_response_style(
+                user_id,
+                emotional_response['response'],
+                patterns
             )
-        })
-        
-    except Exception as e:
-        logger.error(f"Emotion history error: {e}")
-        return jsonify({'error': str(e)}), 500
\ No newline at end of file
+
+            return jsonify({
+                'detected_emotion': emotion,
+                'empathy_level': emotional_response['empathy_level'],
+                'emotional_response': adjusted_response,
+                'suggestions': emotional_response['suggestions'],
+                'emotion_patterns': patterns
+            })
+
+        except Exception as e:
+            logger.error(f"Emotion analysis error: {e}")
+            return jsonify({'error': str(e)}), 500
+
+    @app.route('/api/analyze_emotion_batch', methods=['POST'])
+    def analyze_emotion_batch():
+        """Analyze emotion for many clips at once, results in upload order"""
+        try:
+            uploads = request.files.getlist('audio')
+            if not uploads:
+                return jsonify({'error': 'No audio files provided'}), 400
+            if len(uploads) > MAX_BATCH_CLIPS:
+                return jsonify({'error': f'Batch limited to {MAX_BATCH_CLIPS} clips'}), 400
+
+            texts = request.form.getlist('text')
+            if texts and len(texts) != len(uploads):
+                return jsonify({'error': 'Provide one text per audio file or none'}), 400
+
+            clips = []
+            sample_rates = []
+            for upload in uploads:
+                audio = decode_audio(read_limited(upload.stream, MAX_AUDIO_BYTES), upload.mimetype,
+                                     dict(upload.mimetype_params, **request.form.to_dict()))
+                pcm = np.frombuffer(audio.get_raw_data(convert_width=2), dtype=np.int16)
+                clips.append(pcm.astype(np.float32) / 32768.0)
+                sample_rates.append(audio.sample_rate)
+
+            # Feature extraction runs in the worker processes, not this thread
+            results = emotion_batch.analyze(clips, sample_rates, texts or None)
+
+            return jsonify({'results': results})
+
+        except (AudioTooLarge, RequestEntityTooLarge) as e:
+            return jsonify({'error': str(e)}), 413
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        except Exception as e:
+            logger.error(f"Batch emotion analysis error: {e}")
+            return jsonify({'error': str(e)}), 500
+
+    @app.route('/api/emotion_history', methods=['GET'])
+    def get_emotion_history():
+        """Get user's emotion history and patterns"""
+        try:
+            user_id = request.args.get('user_id', 'default')
+            patterns = emotional_ai.get_emotion_patterns(user_id)
+
+            return jsonify({
+                'user_id': user_id,
+                'emotion_patterns': patterns,
+                'recommendations': emotional_ai.get_emotion_suggestions(
+                    patterns.get('recent_trend', 'neutral')
+                )
+            })
+
+        except Exception as e:
+            logger.error(f"Emotion history error: {e}")
+            return jsonify({'error': str(e)}), 500
+
+    return {'analyze_emotion_batch': MAX_BATCH_BYTES}
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+LUA Assistant - Emotion History
+Per-user ring buffers of emotion codes with running counts, stored as a few hundred bytes per user
+
+Each user keeps the last `capacity` detections as uint8 emotion codes and
+uint32 epoch-second timestamps. Counts are adjusted as entries are added
+and evicted, so the pattern summary never rescans the history.
+"""
+
+import os
+import struct
+import threading
+import time
+from array import array
+from datetime import datetime
+
+from emotion_lexicon import EMOTIONS
+from state_snapshot import SnapshotBackedDict
+
+# version, capacity, entries; then the codes and the timestamps, oldest first
+RING_HEADER = struct.Struct('<BHH')
+RING_VERSION = 1
+
+
+class EmotionRing:
+    """The last `capacity` emotions of one user"""
+
+    __slots__ = ('codes', 'times', 'counts', 'last_seen', 'head', 'size', 'sequence')
+
+    def __init__(self, capacity, emotions=len(EMOTIONS)):
+        self.codes = bytearray(capacity)
+        self.times = array('I', bytes(4 * capacity))
+        self.counts = [0] * emotions
+        # Sequence number of each emotion's latest entry, for dominance ties
+        self.last_seen = [-1] * emotions
+        self.head = 0  # slot of the next write
+        self.size = 0
+        self.sequence = 0
+
+    @property
+    def capacity(self):
+        return len(self.codes)
+
+    def append(self, code, timestamp):
+        if self.size == self.capacity:
+            self.counts[self.codes[self.head]] -= 1
+        else:
+            self.size += 1
+        self.codes[self.head] = code
+        self.times[self.head] = timestamp
+        self.counts[code] += 1
+        self.last_seen[code] = self.sequence
+        self.sequence += 1
+        self.head = (self.head + 1) % self.capacity
+
+    def latest(self):
+        return self.codes[self.head - 1] if self.size else None
+
+    def dominant(self):
+        """Most frequent code; among equals the one seen most recently"""
+        return max(range(len(self.counts)), key=lambda code: (self.counts[code], self.last_seen[code]))
+
+    def entries(self):
+        """(code, timestamp) pairs, oldest first"""
+        start = (self.head - self.size) % self.capacity
+        return [(self.codes[(start + i) % self.capacity], self.times[(start + i) % self.capacity])
+                for i in range(self.size)]
+
+    def to_bytes(self):
+        entries = self.entries()
+        return (RING_HEADER.pack(RING_VERSION, self.capacity, len(entries))
+                + bytes(code for code, _ in entries)
+                + struct.pack(f'<{len(entries)}I', *(timestamp for _, timestamp in entries)))
+
+    @classmethod
+    def from_bytes(cls, data, capacity=None, emotions=len(EMOTIONS)):
+        data = bytes(data)
+        version, stored_capacity, size = RING_HEADER.unpack_from(data)
+        if version != RING_VERSION:
+            raise ValueError(f"Unknown emotion history version {version}")
+        codes = data[RING_HEADER.size:RING_HEADER.size + size]
+        times = struct.unpack_from(f'<{size}I', data, RING_HEADER.size + size)
+        ring = cls(capacity or stored_capacity, emotions)
+        for code, timestamp in zip(codes, times):
+            ring.append(code, timestamp)
+        return ring
+
+
+class EmotionHistory:
+    """Ring buffers per user, persisted through the state snapshot"""
+
+    def __init__(self, snapshot=None, capacity=None, emotions=EMOTIONS):
+        self.capacity = capacity or int(os.getenv('LUA_EMOTION_HISTORY_SIZE', 50))
+        self.emotions = tuple(emotions)
+        self.codes = {emotion: code for code, emotion in enumerate(self.emotions)}
+        self._lock = threading.Lock()
+
+        self._rings = SnapshotBackedDict(
+            snapshot.section('emotion_history') if snapshot else None,
+            decode=self._decode,
+            encode=EmotionRing.to_bytes
+        )
+        if snapshot is not None:
+            snapshot.register('emotion_history', self._rings.snapshot_items)
+
+    def _decode(self, data):
+        return EmotionRing.from_bytes(data, self.capacity, len(self.emotions))
+
+    def __contains__(self, user_id):
+        return user_id in self._rings
+
+    def __len__(self):
+        return len(self._rings)
+
+    def record(self, user_id, emotion, timestamp=None):
+        code = self.codes[emotion]
+        timestamp = int(time.time() if timestamp is None else timestamp)
+        with self._lock:
+            ring = self._rings.get(user_id)
+            if ring is None:
+                ring = self._rings[user_id] = EmotionRing(self.capacity, len(self.emotions))
+            ring.append(code, timestamp)
+
+    def patterns(self, user_id):
+        """Distribution, latest and dominant emotion, or {} for a user with no history"""
+        with self._lock:
+            ring = self._rings.get(user_id)
+            if ring is None or not ring.size:
+                return {}
+            counts = list(ring.counts)
+            total = ring.size
+            latest = ring.latest()
+            dominant = ring.dominant()
+
+        return {
+            'emotion_distribution': {
+                self.emotions[code]: (count / total) * 100
+                for code, count in enumerate(counts) if count
+            },
+            'recent_trend': self.emotions[latest],
+            'total_interactions': total,
+            'dominant_emotion': self.emotions[dominant]
+        }
+
+    def recent(self, user_id, limit=None):
+        """[{'emotion', 'timestamp'}] oldest first, as the list history stored it"""
+        with self._lock:
+            ring = self._rings.get(user_id)
+            entries = ring.entries() if ring is not None else []
+        if limit is not None:
+            entries = entries[-limit:] if limit else []
+        return [
+            {'emotion': self.emotions[code], 'timestamp': datetime.fromtimestamp(timestamp).isoformat()}
+            for code, timestamp in entries
+        ]
+
+    def stats(self):
+        with self._lock:
+            resident = len(self._rings)
+        return {
+            'users': resident,
+            'capacity': self.capacity,
+            'bytes_per_user': RING_HEADER.size + 5 * self.capacity
+        }
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+LUA Assistant - Emotion Lexicon
+Emotion keywords compiled into a token index, scored in one pass over the words
+"""
+
+import re
+
+import numpy as np
+
+from inflection import inflections
+
+# Column order of every score matrix; neutral is what no keyword hit means
+EMOTIONS = ('neutral', 'happy', 'sad', 'angry', 'fearful', 'disgusted', 'surprised', 'stressed')
+
+# (emotion, keywords) - on equal counts the earlier emotion wins
+EMOTION_LEXICON = [
+    ('happy', ['happy', 'great', 'awesome', 'wonderful', 'excellent', 'good', 'love', 'amazing']),
+    ('sad', ['sad', 'depressed', 'down', 'upset', 'crying', 'terrible', 'awful', 'bad']),
+    ('angry', ['angry', 'mad', 'furious', 'annoyed', 'frustrated', 'hate', 'stupid']),
+    ('stressed', ['stressed', 'worried', 'anxious', 'nervous', 'overwhelmed', 'pressure']),
+    ('fearful', ['scared', 'afraid', 'frightened', 'terrified', 'worried', 'nervous']),
+    ('surprised', ['wow', 'amazing', 'incredible', 'unbelievable', 'shocking', 'surprised']),
+]
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9']+")
+
+
+class EmotionLexicon:
+    """Counts the distinct keywords of every emotion found in a text"""
+
+    def __init__(self, lexicon=EMOTION_LEXICON, columns=EMOTIONS):
+        self.columns = tuple(columns)
+        self.keywords = {emotion: list(keywords) for emotion, keywords in lexicon}
+        column_of = {emotion: column for column, emotion in enumerate(self.columns)}
+
+        # token -> (keyword id, column) for each keyword it is a form of.
+        # Inflections ("loved", "badly", "happily") keep the recall substring
+        # matching had without matching "bad" in "badminton" or "good" in "goodbye"
+        self._index = {}
+        keyword_id = 0
+        for emotion, keywords in lexicon:
+            for keyword in keywords:
+                keyword = keyword.lower()
+                for form in {keyword} | inflections(keyword, derived=True):
+                    self._index.setdefault(form, []).append((keyword_id, column_of[emotion]))
+                keyword_id += 1
+
+        # argmax over columns in this order gives neutral, then lexicon order
+        self._priority = [column_of['neutral']] + [column_of[emotion] for emotion, _ in lexicon]
+        self._priority += [column for column in range(len(self.columns)) if column not in self._priority]
+        self._order = [self.columns[column] for column in self._priority]
+
+    def tokenize(self, text):
+        return TOKEN_PATTERN.findall((text or '').lower())
+
+    def _hits(self, text):
+        """Yield the column of every distinct keyword in the text"""
+        seen = set()
+        for token in set(self.tokenize(text)):
+            for keyword_id, column in self._index.get(token, ()):
+                # "love" and "loved" are one keyword, counted once
+                if keyword_id not in seen:
+                    seen.add(keyword_id)
+                    yield column
+
+    def score(self, text):
+        """Return {emotion: count} for emotions with at least one keyword"""
+        counts = {}
+        for column in self._hits(text):
+            emotion = self.columns[column]
+            counts[emotion] = counts.get(emotion, 0) + 1
+        return counts
+
+    def score_batch(self, texts):
+        """Return an int32 (len(texts), len(columns)) matrix of keyword counts"""
+        width = len(self.columns)
+        cells = [row * width + column for row, text in enumerate(texts) for column in self._hits(text)]
+        counts = np.bincount(np.asarray(cells, dtype=np.int64), minlength=len(texts) * width)
+        return counts.astype(np.int32).reshape(len(texts), width)
+
+    def best(self, scores):
+        """Emotion per row of a score matrix, breaking ties in lexicon order"""
+        scores = np.atleast_2d(scores)
+        positions = np.argmax(scores[:, self._priority], axis=1)
+        return [self.columns[self._priority[position]] for position in positions]
+
+    def detect(self, text):
+        """Return the emotion with the most keywords, or neutral"""
+        counts = self.score(text)
+        best, best_count = 'neutral', 0
+        for emotion in self._order:
+            if counts.get(emotion, 0) > best_count:
+                best, best_count = emotion, counts[emotion]
+        return best
+
+
+# Compiled once at import and shared by every EmotionalIntelligence
+emotion_lexicon = EmotionLexicon()
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+LUA Assistant - Emotion Model
+Softmax regression over the audio features and/or keyword counts, stored as plain NumPy arrays
+
+Training standardizes the inputs and folds the mean and scale into the
+weights, so inference is one float32 matrix product plus a bias. The .npz
+loads with numpy alone.
+
+Train from a directory with one subdirectory of WAV files per emotion
+(neutral/, happy/, ...), each clip optionally next to a same-named .txt
+transcript:
+
+    python backend/emotion_model.py --data clips/ --inputs audio+text --out backend/emotion_model.npz
+"""
+
+import logging
+import os
+
+import numpy as np
+
+import audio_features
+
+logger = logging.getLogger(__name__)
+
+INPUTS = ('audio', 'text', 'audio+text')
+DEFAULT_MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'emotion_model.npz')
+
+
+class EmotionModel:
+    """logits = [audio features, keyword counts] @ weights + bias"""
+
+    def __init__(self, weights, bias, labels, inputs='audio'):
+        if inputs not in INPUTS:
+            raise ValueError(f"Unknown model inputs: {inputs}")
+        self.weights = np.ascontiguousarray(weights, dtype=np.float32)
+        self.bias = np.asarray(bias, dtype=np.float32)
+        self.labels = [str(label) for label in labels]
+        self.inputs = inputs
+
+    @property
+    def needs_audio(self):
+        return 'audio' in self.inputs
+
+    @property
+    def needs_text(self):
+        return 'text' in self.inputs
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data['weights'], data['bias'], data['labels'], str(data['inputs']))
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            np.savez(f, weights=self.weights, bias=self.bias,
+                     labels=np.array(self.labels), inputs=np.array(self.inputs))
+
+    def design(self, audio=None, text=None):
+        """Stack the inputs this model was trained on into one float32 matrix"""
+        parts = []
+        if self.needs_audio:
+            if audio is None:
+                raise ValueError("Model needs audio features")
+            parts.append(np.atleast_2d(np.asarray(audio, dtype=np.float32)))
+        if self.needs_text:
+            if text is None:
+                raise ValueError("Model needs keyword counts")
+            parts.append(np.atleast_2d(np.asarray(text, dtype=np.float32)))
+        return parts[0] if len(parts) == 1 else np.hstack(parts)
+
+    def logits(self, audio=None, text=None):
+        return self.design(audio, text) @ self.weights + self.bias
+
+    def predict_proba(self, audio=None, text=None):
+        logits = self.logits(audio, text)
+        logits -= logits.max(axis=1, keepdims=True)
+        np.exp(logits, out=logits)
+        logits /= logits.sum(axis=1, keepdims=True)
+        return logits
+
+    def predict(self, audio=None, text=None):
+        """Return one label per row"""
+        return [self.labels[code] for code in np.argmax(self.logits(audio, text), axis=1)]
+
+
+def load_model(path=None):
+    """Load the serving model, or None when there isn't one"""
+    path = path or os.getenv('LUA_EMOTION_MODEL', DEFAULT_MODEL_PATH)
+    if not os.path.exists(path):
+        logger.info(f"No emotion model at {path}, using keyword rules")
+        return None
+    try:
+        model = EmotionModel.load(path)
+        logger.info(f"Emotion model loaded from {path} ({model.inputs}, {len(model.labels)} emotions)")
+        return model
+    except Exception as e:
+        logger.warning(f"Emotion model not loaded from {path}: {e}")
+        return None
+
+
+def fit(design, targets, labels, inputs='audio', epochs=2000, learning_rate=0.5, l2=1e-3):
+    """Train by full-batch gradient descent; targets are row indices into labels"""
+    design = np.asarray(design, dtype=np.float64)
+    targets = np.asarray(targets)
+    mean = design.mean(axis=0)
+    scale = design.std(axis=0)
+    scale[scale < 1e-8] = 1.0
+    standardized = (design - mean) / scale
+
+    count, classes = len(standardized), len(labels)
+    onehot = np.eye(classes)[targets]
+    weights = np.zeros((standardized.shape[1], classes))
+    bias = np.zeros(classes)
+    velocity_w, velocity_b = np.zeros_like(weights), np.zeros_like(bias)
+
+    for _ in range(epochs):
+        logits = standardized @ weights + bias
+        logits -= logits.max(axis=1, keepdims=True)
+        probabilities = np.exp(logits)
+        probabilities /= probabilities.sum(axis=1, keepdims=True)
+
+        error = (probabilities - onehot) / count
+        velocity_w = 0.9 * velocity_w - learning_rate * (standardized.T @ error + l2 * weights)
+        velocity_b = 0.9 * velocity_b - learning_rate * error.sum(axis=0)
+        weights += velocity_w
+        bias += velocity_b
+
+    # ((x - mean) / scale) @ W + b == x @ (W / scale) + (b - (mean / scale) @ W)
+    folded = weights / scale[:, None]
+    return EmotionModel(folded, bias - (mean / scale) @ weights, labels, inputs)
+
+
+def load_dataset(directory, labels, sample_rate=22050):
+    """Return (clips, texts, targets) from <directory>/<emotion>/*.wav"""
+    import librosa
+
+    clips, texts, targets = [], [], []
+    for target, label in enumerate(labels):
+        folder = os.path.join(directory, label)
+        if not os.path.isdir(folder):
+            continue
+        for name in sorted(os.listdir(folder)):
+            if not name.lower().endswith('.wav'):
+                continue
+            clip, _ = librosa.load(os.path.join(folder, name), sr=sample_rate, mono=True)
+            transcript = os.path.join(folder, os.path.splitext(name)[0] + '.txt')
+            text = ''
+            if os.path.exists(transcript):
+                with open(transcript) as f:
+                    text = f.read().strip()
+            clips.append(clip)
+            texts.append(text)
+            targets.append(target)
+    return clips, texts, np.array(targets, dtype=np.int64)
+
+
+def split(count, holdout, seed=0):
+    """Shuffled (train, test) row indices"""
+    order = np.random.default_rng(seed).permutation(count)
+    cut = int(round(count * (1 - holdout)))
+    return order[:cut], order[cut:]
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from emotion_batch import EmotionBatchProcessor
+    from emotional_intelligence import EmotionalIntelligence
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--data', required=True, help='directory of <emotion>/*.wav')
+    parser.add_argument('--inputs', choices=INPUTS, default='audio')
+    parser.add_argument('--out', default=DEFAULT_MODEL_PATH)
+    parser.add_argument('--epochs', type=int, default=2000)
+    parser.add_argument('--learning-rate', type=float, default=0.5)
+    parser.add_argument('--l2', type=float, default=1e-3)
+    parser.add_argument('--holdout', type=float, default=0.2, help='fraction kept back for the accuracy report')
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    emotional_ai = EmotionalIntelligence()
+    labels = [emotional_ai.emotions[code] for code in sorted(emotional_ai.emotions)]
+
+    clips, texts, targets = load_dataset(args.data, labels)
+    if not len(targets):
+        parser.error(f"No labelled clips under {args.data}")
+
+    processor = EmotionBatchProcessor(emotional_ai, workers=args.workers, tier='full')
+    audio, errors = processor.extract(clips)
+    processor.close()
+    if errors:
+        logger.warning(f"Feature extraction failed for {len(errors)} clips; they train as zeros")
+
+    parts = ([audio] if 'audio' in args.inputs else []) + \
+            ([emotional_ai.text_scores(texts)] if 'text' in args.inputs else [])
+    design = np.hstack(parts)
+
+    train, test = split(len(targets), args.holdout)
+    if len(test):
+        model = fit(design[train], targets[train], labels, args.inputs, args.epochs, args.learning_rate, args.l2)
+        predicted = np.argmax(design[test].astype(np.float32) @ model.weights + model.bias, axis=1)
+        print(f"holdout accuracy: {np.mean(predicted == targets[test]):.3f} ({len(test)} clips)")
+
+    model = fit(design, targets, labels, args.inputs, args.epochs, args.learning_rate, args.l2)
+    model.save(args.out)
+    print(f"saved {args.inputs} model trained on {len(targets)} clips to {args.out}")
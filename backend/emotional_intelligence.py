@@ -1,24 +1,15 @@
 import numpy as np
-import librosa
-import tensorflow as tf
-from sklearn.preprocessing import StandardScaler
-import pickle
 import os
-from datetime import datetime
 import json
+from emotion_history import EmotionHistory
+import audio_features
+import emotion_model
+from emotion_lexicon import EMOTIONS, emotion_lexicon
 
 class EmotionalIntelligence:
-    def __init__(self):
-        self.emotions = {
-            0: 'neutral',
-            1: 'happy', 
-            2: 'sad',
-            3: 'angry',
-            4: 'fearful',
-            5: 'disgusted',
-            6: 'surprised',
-            7: 'stressed'
-        }
+    def __init__(self, snapshot=None, model=None):
+        self.emotions = dict(enumerate(EMOTIONS))
+        self.lexicon = emotion_lexicon
         
         self.emotion_responses = {
             'happy': [
@@ -63,73 +54,51 @@ class EmotionalIntelligence:
             ]
         }
         
-        self.user_emotion_history = {}
-        self.scaler = StandardScaler()
+        self.history = EmotionHistory(snapshot)
+        # 'fast' drops tempo and tuning estimation for interactive latency
+        self.feature_tier = audio_features.default_tier()
+        # Trained softmax weights (emotion_model.py); keyword rules when absent
+        self.model = model or emotion_model.load_model()
         
-    def extract_audio_features(self, audio_data, sample_rate=22050):
+    def extract_audio_features(self, audio_data, sample_rate=22050, tier=None):
         """Extract features from audio for emotion detection"""
         try:
-            # Extract MFCC features
-            mfccs = librosa.feature.mfcc(y=audio_data, sr=sample_rate, n_mfcc=13)
-            mfccs_mean = np.mean(mfccs, axis=1)
-            
-            # Extract spectral features
-            spectral_centroids = librosa.feature.spectral_centroid(y=audio_data, sr=sample_rate)
-            spectral_centroids_mean = np.mean(spectral_centroids)
-            
-            # Extract zero crossing rate
-            zcr = librosa.feature.zero_crossing_rate(audio_data)
-            zcr_mean = np.mean(zcr)
-            
-            # Extract chroma features
-            chroma = librosa.feature.chroma_stft(y=audio_data, sr=sample_rate)
-            chroma_mean = np.mean(chroma, axis=1)
-            
-            # Extract tempo
-            tempo, _ = librosa.beat.beat_track(y=audio_data, sr=sample_rate)
-            
-            # Combine all features
-            features = np.concatenate([
-                mfccs_mean,
-                [spectral_centroids_mean, zcr_mean, tempo],
-                chroma_mean
-            ])
-            
-            return features
+            # One STFT shared by every spectral feature; see audio_features
+            return audio_features.extract_features(audio_data, sample_rate, tier or self.feature_tier)
             
         except Exception as e:
             print(f"Feature extraction error: {e}")
-            return np.zeros(28)  # Return default feature vector
+            return np.zeros(audio_features.FEATURE_DIM, dtype=np.float32)  # Return default feature vector
     
     def detect_emotion_from_text(self, text):
         """Simple text-based emotion detection"""
-        text = text.lower()
-        
-        # Emotion keywords
-        emotion_keywords = {
-            'happy': ['happy', 'great', 'awesome', 'wonderful', 'excellent', 'good', 'love', 'amazing'],
-            'sad': ['sad', 'depressed', 'down', 'upset', 'crying', 'terrible', 'awful', 'bad'],
-            'angry': ['angry', 'mad', 'furious', 'annoyed', 'frustrated', 'hate', 'stupid'],
-            'stressed': ['stressed', 'worried', 'anxious', 'nervous', 'overwhelmed', 'pressure'],
-            'fearful': ['scared', 'afraid', 'frightened', 'terrified', 'worried', 'nervous'],
-            'surprised': ['wow', 'amazing', 'incredible', 'unbelievable', 'shocking', 'surprised']
-        }
-        
-        emotion_scores = {}
-        
-        for emotion, keywords in emotion_keywords.items():
-            score = sum(1 for keyword in keywords if keyword in text)
-            if score > 0:
-                emotion_scores[emotion] = score
-        
-        if emotion_scores:
-            detected_emotion = max(emotion_scores.items(), key=lambda x: x[1])[0]
-            return detected_emotion
-        
-        return 'neutral'
+        # Whole-word keyword counts, one pass over the tokens
+        return self.lexicon.detect(text)
     
-    def detect_emotion_from_voice_patterns(self, text, confidence=0.8):
+    def text_scores(self, texts):
+        """Keyword counts as an (n, emotions) matrix, columns ordered as self.emotions"""
+        return self.lexicon.score_batch(texts)
+    
+    def classify_batch(self, features, texts=None):
+        """Label a batch of clips from one (n, emotions) score matrix"""
+        if self.model is not None and (texts is not None or not self.model.needs_text):
+            return self.model.predict(
+                audio=features,
+                text=self.text_scores(texts) if self.model.needs_text else None
+            )
+        
+        if texts is None:
+            return ['neutral'] * len(features)
+        return self.lexicon.best(self.text_scores(texts))
+    
+    def detect_emotion_from_voice_patterns(self, text, confidence=0.8, audio_data=None, sample_rate=22050):
         """Detect emotion from voice patterns and speech characteristics"""
+        if self.model is not None and (audio_data is not None or not self.model.needs_audio):
+            return self.model.predict(
+                audio=self.extract_audio_features(audio_data, sample_rate) if self.model.needs_audio else None,
+                text=self.text_scores([text]) if self.model.needs_text else None
+            )[0]
+        
         # Analyze speech patterns
         word_count = len(text.split())
         avg_word_length = np.mean([len(word) for word in text.split()])
@@ -223,51 +192,18 @@ class EmotionalIntelligence:
     
     def store_emotion_history(self, user_id, emotion):
         """Store user's emotion history for learning"""
-        if user_id not in self.user_emotion_history:
-            self.user_emotion_history[user_id] = []
-        
-        self.user_emotion_history[user_id].append({
-            'emotion': emotion,
-            'timestamp': datetime.now().isoformat()
-        })
-        
-        # Keep only last 50 emotions
-        if len(self.user_emotion_history[user_id]) > 50:
-            self.user_emotion_history[user_id] = self.user_emotion_history[user_id][-50:]
+        # Ring buffer of the last LUA_EMOTION_HISTORY_SIZE emotions
+        self.history.record(user_id, emotion)
     
     def get_emotion_patterns(self, user_id):
         """Analyze user's emotion patterns"""
-        if user_id not in self.user_emotion_history:
-            return {}
-        
-        emotions = [entry['emotion'] for entry in self.user_emotion_history[user_id]]
-        
-        # Count emotion frequencies
-        emotion_counts = {}
-        for emotion in emotions:
-            emotion_counts[emotion] = emotion_counts.get(emotion, 0) + 1
-        
-        # Calculate percentages
-        total = len(emotions)
-        emotion_percentages = {
-            emotion: (count / total) * 100 
-            for emotion, count in emotion_counts.items()
-        }
-        
-        # Get recent trend (last 10 interactions)
-        recent_emotions = emotions[-10:] if len(emotions) >= 10 else emotions
-        recent_trend = recent_emotions[-1] if recent_emotions else 'neutral'
-        
-        return {
-            'emotion_distribution': emotion_percentages,
-            'recent_trend': recent_trend,
-            'total_interactions': total,
-            'dominant_emotion': max(emotion_counts.items(), key=lambda x: x[1])[0] if emotion_counts else 'neutral'
-        }
+        # Read from running counts, not by recounting the history
+        return self.history.patterns(user_id)
     
-    def adjust_response_style(self, user_id, base_response):
+    def adjust_response_style(self, user_id, base_response, patterns=None):
         """Adjust response style based on user's emotional patterns"""
-        patterns = self.get_emotion_patterns(user_id)
+        if patterns is None:
+            patterns = self.get_emotion_patterns(user_id)
         
         if not patterns:
             return base_response
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+LUA Assistant - Inflection
+Inflected forms of keywords, shared by the intent and emotion indexes
+"""
+
+VOWELS = set('aeiou')
+
+
+def _consonant_y(word):
+    return word.endswith('y') and len(word) > 1 and word[-2] not in VOWELS
+
+
+def inflections(word, derived=False):
+    """Plural and verb forms of a keyword ("calls", "calling", "texted", "photos")
+
+    derived=True adds the -ly and -ness forms ("happily", "happiness",
+    "sadly", "terribly"). Over-generates on purpose ("opening" and
+    "openning"); a form nobody says costs one dict entry and never matches.
+    """
+    if word.endswith('e'):
+        forms = {word + 's', word + 'd', word[:-1] + 'ing'}
+    elif _consonant_y(word):
+        forms = {word[:-1] + 'ies', word[:-1] + 'ied', word + 'ing'}
+    else:
+        forms = {word + 'ed', word + 'ing'}
+        forms.add(word + 'es' if word.endswith(('s', 'sh', 'ch', 'x', 'z')) else word + 's')
+        # stop -> stopping, skip -> skipped
+        if (len(word) >= 3 and word[-1] not in VOWELS | set('wxy')
+                and word[-2] in VOWELS and word[-3] not in VOWELS):
+            forms |= {word + word[-1] + 'ed', word + word[-1] + 'ing'}
+
+    if derived:
+        if _consonant_y(word):
+            # happy -> happily, happiness
+            forms |= {word[:-1] + 'ily', word[:-1] + 'iness'}
+        else:
+            forms.add(word + 'ness')
+            # terrible -> terribly, sad -> sadly
+            forms.add(word[:-1] + 'y' if word.endswith('le') and word[-3:-2] not in VOWELS else word + 'ly')
+    return forms
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+LUA Assistant - Intent Classifier
+One declarative intent table compiled into a token index, shared by every entry point
+"""
+
+import re
+from collections import namedtuple
+
+from inflection import inflections
+
+IntentMatch = namedtuple('IntentMatch', ['intent', 'score', 'hits'])
+
+# (intent, priority, keywords) - when several intents hit, the highest priority wins.
+# Generic words ("play", "stop", "next") sit on low-priority intents so they only
+# decide the result when nothing more specific was said.
+INTENT_TABLE = [
+    ('help', 100, ['help', 'commands', 'what can you do']),
+    ('reminder', 90, ['remind', 'reminder', 'reminders', 'alert', 'notify']),
+    ('open', 80, ['open', 'launch', 'start', 'run']),
+    ('call', 70, ['call', 'phone', 'dial', 'ring']),
+    ('message', 60, ['message', 'text', 'sms', 'send']),
+    ('weather', 50, ['weather', 'temperature', 'forecast']),
+    ('camera', 40, ['camera', 'photo', 'picture', 'selfie']),
+    ('gallery', 35, ['gallery', 'photos', 'pictures', 'images']),
+    ('settings', 30, ['settings', 'preferences', 'config']),
+    ('calculator', 25, ['calculator', 'calculate', 'math']),
+    ('music', 20, ['play', 'music', 'song', 'songs', 'pause', 'stop', 'next', 'previous', 'skip']),
+]
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9']+")
+
+
+class IntentClassifier:
+    """Finds every intent keyword in a single pass over the utterance tokens
+
+    Single-word keywords also match their inflections. A token that is
+    listed as a keyword only matches as listed, so "photos" is gallery
+    where gallery is a candidate and an inflection of camera's "photo"
+    where it is not.
+    """
+
+    def __init__(self, table=INTENT_TABLE):
+        self.priorities = {}
+        # first token -> [(remaining tokens, intent, listed)]
+        self._index = {}
+
+        for intent, priority, keywords in table:
+            self.priorities[intent] = priority
+            for keyword in keywords:
+                tokens = tuple(TOKEN_PATTERN.findall(keyword.lower()))
+                if tokens:
+                    self._index.setdefault(tokens[0], []).append((tokens[1:], intent, True))
+
+        for intent, _, keywords in table:
+            for keyword in keywords:
+                tokens = TOKEN_PATTERN.findall(keyword.lower())
+                if len(tokens) != 1:
+                    continue
+                for form in inflections(tokens[0]):
+                    entries = self._index.setdefault(form, [])
+                    if not any(entry[1] == intent for entry in entries):
+                        entries.append(((), intent, False))
+
+    def tokenize(self, text):
+        return TOKEN_PATTERN.findall(text.lower())
+
+    def find_hits(self, text, intents=None):
+        """Return {intent: [matched keywords]} for every keyword in the text"""
+        tokens = self.tokenize(text)
+        hits = {}
+
+        for position, token in enumerate(tokens):
+            matched = []
+            for rest, intent, listed in self._index.get(token, ()):
+                if intents is not None and intent not in intents:
+                    continue
+                end = position + 1 + len(rest)
+                if rest and tuple(tokens[position + 1:end]) != rest:
+                    continue
+                matched.append((intent, listed, ' '.join(tokens[position:end])))
+
+            # Inflections only count when no candidate lists the token itself
+            if any(listed for _, listed, _ in matched):
+                matched = [match for match in matched if match[1]]
+            for intent, _, words in matched:
+                hits.setdefault(intent, []).append(words)
+
+        return hits
+
+    def classify(self, text, intents=None):
+        """Return the winning IntentMatch; intents restricts the candidates"""
+        hits = self.find_hits(text, intents)
+
+        if not hits:
+            return IntentMatch(None, 0.0, ())
+
+        intent = max(hits, key=lambda name: self.priorities[name])
+        total = sum(len(words) for words in hits.values())
+        score = len(hits[intent]) / total
+
+        return IntentMatch(intent, round(score, 3), tuple(hits[intent]))
+
+
+# Compiled once at import and shared by app.py, main.py and ai_learning.py
+command_intents = IntentClassifier()
@@ -14,12 +14,24 @@ from datetime import datetime
 import json
 import logging
 import re
+import signal
 from dotenv import load_dotenv
 try:
     import libsql_client
 except ImportError:
     libsql_client = None
 
+from intent_classifier import command_intents
+from batch_items import parse_batch_item
+from write_behind import WriteBehindQueue
+from response_cache import ResponseCache, cacheable
+from state_snapshot import SnapshotManager
+from user_registry import UserRegistry
+from embedded_replica import EmbeddedReplica
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from database.lua_db import STATS_ROLLUP_REBUILD, STATS_ROLLUP_SCHEMA
+
 # Load environment variables
 load_dotenv()
 
@@ -31,17 +43,42 @@ app = Flask(__name__)
 CORS(app)
 
 class LuaBackend:
+    # Context fields that change a cacheable handler's result (none read context yet)
+    RESPONSE_CACHE_CONTEXT_KEYS = ()
+    
     def __init__(self):
         self.is_listening = False
         self.active_users = {}
         self.command_queue = []
-        self.response_cache = {}
+        self.response_cache = ResponseCache()
         self.db_client = None
-        self.seen_users = self._load_seen_users()
+        self.replica = None
+        
+        # Intents from the shared table that this backend handles
+        self.intent_handlers = {
+            'help': self.handle_help_command,
+            'reminder': self.handle_reminder,
+            'open': self.handle_app_launch,
+            'call': self.handle_phone_call,
+            'message': self.handle_sms,
+            'music': self.handle_music_control,
+            'camera': self.handle_camera_control,
+            'weather': self.handle_weather_request
+        }
         
         # Initialize database connection
         self._init_database()
         
+        # Restart state comes from the last snapshot; the database only on a miss
+        self.snapshot = SnapshotManager(default_path='lua_main.snap')
+        self.seen_users = UserRegistry(self.db_client, snapshot=self.snapshot)
+        self.snapshot.start()
+        
+        # Command logging is written behind the request in batches
+        self.command_log = WriteBehindQueue(
+            self._write_command_batch, name='command-log', on_drop=self._command_dropped
+        )
+        
         logger.info("LUA Backend initialized successfully")
     
     def _init_database(self):
@@ -60,6 +97,11 @@ class LuaBackend:
                     # Create tables if they don't exist
                     self._create_tables()
                     logger.info("Turso database connected successfully")
+                    
+                    # Reads are served from a local copy instead of across the network
+                    if os.getenv('LUA_EMBEDDED_REPLICA', '1') == '1':
+                        self.replica = EmbeddedReplica(self.db_client)
+                        self.db_client = self.replica
                 else:
                     logger.warning("Turso credentials not found, using file storage")
             else:
@@ -77,8 +119,7 @@ class LuaBackend:
                     CREATE TABLE IF NOT EXISTS users (
                         id TEXT PRIMARY KEY,
                         first_seen TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        last_active TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        total_commands INTEGER DEFAULT 0
+                        last_active TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                     )
                 """)
                 
@@ -94,60 +135,107 @@ class LuaBackend:
                         FOREIGN KEY (user_id) REFERENCES users (id)
                     )
                 """)
+
+                # user_stats reads one user's latest commands by seeking this index
+                self.db_client.execute("""
+                    CREATE INDEX IF NOT EXISTS idx_commands_user_time
+                    ON commands (user_id, timestamp)
+                """)
                 
+                # App usage table
+                self.db_client.execute("""
+                    CREATE TABLE IF NOT EXISTS app_usage (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        user_id TEXT,
+                        app_name TEXT NOT NULL,
+                        package_name TEXT,
+                        usage_count INTEGER DEFAULT 1,
+                        last_opened TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        FOREIGN KEY (user_id) REFERENCES users (id)
+                    )
+                """)
+                self.db_client.execute("""
+                    CREATE UNIQUE INDEX IF NOT EXISTS idx_app_usage_key
+                    ON app_usage (user_id, package_name)
+                """)
+                
+                # The same stats rollup and triggers as the SQLite backend;
+                # a database that predates it is backfilled once
+                tables = self.db_client.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'user_stats_rollup'"
+                )
+                self.db_client.batch([(statement, []) for statement in STATS_ROLLUP_SCHEMA])
+                if not tables.rows:
+                    self.rebuild_user_stats()
+
                 logger.info("Database tables created/verified")
         except Exception as e:
             logger.error(f"Table creation error: {e}")
     
-    def _load_seen_users(self):
-        """Load seen users from database or file"""
-        try:
-            if self.db_client:
-                result = self.db_client.execute("SELECT id FROM users")
-                return set(row[0] for row in result.rows)
-            else:
-                # Fallback to file storage
-                with open('/tmp/lua_seen_users.json', 'r') as f:
-                    return set(json.load(f))
-        except Exception as e:
-            logger.error(f"Error loading seen users: {e}")
-            return set()
+    def rebuild_user_stats(self):
+        """Recompute user_stats_rollup from commands and app_usage, for backfill or repair"""
+        self.db_client.batch([(statement, []) for statement in STATS_ROLLUP_REBUILD])
     
     def _save_user_to_db(self, user_id):
         """Save user to database"""
         try:
-            if self.db_client:
-                self.db_client.execute(
-                    "INSERT OR IGNORE INTO users (id) VALUES (?)",
-                    [user_id]
-                )
-                self.db_client.execute(
-                    "UPDATE users SET last_active = CURRENT_TIMESTAMP WHERE id = ?",
-                    [user_id]
-                )
-            else:
-                # Fallback to file storage
-                with open('/tmp/lua_seen_users.json', 'w') as f:
-                    json.dump(list(self.seen_users), f)
+            statements = [
+                ("INSERT OR IGNORE INTO users (id) VALUES (?)", [user_id]),
+                ("UPDATE users SET last_active = CURRENT_TIMESTAMP WHERE id = ?", [user_id])
+            ]
+            if self.replica:
+                # Off the request path; this user's reads wait for it with read_your_writes
+                self.replica.write(statements, key=user_id)
+            elif self.db_client:
+                self.db_client.batch(statements)
         except Exception as e:
             logger.error(f"Error saving user: {e}")
     
-    def _save_command_to_db(self, user_id, command_text, action, success):
-        """Save command to database"""
-        try:
-            if self.db_client:
-                self.db_client.execute(
-                    "INSERT INTO commands (user_id, command_text, action, success) VALUES (?, ?, ?, ?)",
-                    [user_id, command_text, action, success]
-                )
-                
-                # Update user command count
-                self.db_client.execute(
-                    "UPDATE users SET total_commands = total_commands + 1 WHERE id = ?",
-                    [user_id]
+    def _save_command_to_db(self, user_id, command_text, action, success, app=None):
+        """Queue command for the background database writer"""
+        if self.db_client:
+            # Reserved now, so this user's read_your_writes reads wait for the queued row
+            seq = self.replica.reserve(user_id) if self.replica else None
+            self.command_log.put((user_id, command_text, action, success, app, seq))
+    
+    def _command_dropped(self, row):
+        """Stop readers waiting on a command the log shed"""
+        if row[-1] is not None:
+            self.replica.release([row[-1]])
+    
+    def _write_command_batch(self, rows):
+        """Write queued commands and app launches in one database batch
+        
+        The rollup triggers update each user's stats as the rows go in.
+        """
+        statements = []
+        for user_id, command_text, action, success, app, _ in rows:
+            statements.append(
+                ("INSERT INTO commands (user_id, command_text, action, success) VALUES (?, ?, ?, ?)",
+                 [user_id, command_text, action, success])
+            )
+            if app is not None:
+                statements.append(
+                    ("INSERT INTO app_usage (user_id, app_name, package_name) VALUES (?, ?, ?) "
+                     "ON CONFLICT (user_id, package_name) DO UPDATE SET "
+                     "usage_count = usage_count + 1, last_opened = CURRENT_TIMESTAMP",
+                     [user_id, *app])
                 )
-        except Exception as e:
-            logger.error(f"Error saving command: {e}")
+        
+        if self.replica:
+            self.replica.batch(statements, seqs=[row[-1] for row in rows])
+        else:
+            self.db_client.batch(statements)
+    
+    def read(self, sql, args, user_id=None, consistency=None):
+        """Run a read query; consistency is 'strong', 'read_your_writes' or None for the replica as is"""
+        if not self.replica:
+            return self.db_client.execute(sql, args)
+        if consistency == 'strong':
+            return self.replica.execute(sql, args, fresh=True)
+        if consistency == 'read_your_writes':
+            return self.replica.execute(sql, args, read_your_writes=user_id)
+        return self.replica.execute(sql, args)
     
     def is_first_time_user(self, user_id):
         """Check if user is using LUA for the first time"""
@@ -184,21 +272,25 @@ Just say "Hey LUA" anytime to activate me. Try it now!
             'success': True
         }
     
-    def process_command(self, user_id, command_text, context=None):
-        """Process command with basic text analysis"""
+    def process_command(self, user_id, command_text, context=None, first_time=None):
+        """Process command with basic text analysis
+        
+        first_time skips the seen-user lookup when the caller already knows.
+        """
         try:
             start_time = time.time()
             logger.info(f"Processing command from user {user_id}: {command_text}")
-            logger.info(f"Seen users: {list(self.seen_users)}")
+            if first_time is None:
+                first_time = self.is_first_time_user(user_id)
             
             # Check if first time user (only for very first interaction)
-            if self.is_first_time_user(user_id) and command_text.lower().strip() in ['', 'hello', 'hi', 'hey']:
+            if first_time and command_text.lower().strip() in ['', 'hello', 'hi', 'hey']:
                 logger.info(f"First time user with greeting: {user_id}")
                 self.mark_user_as_seen(user_id)
                 return self.handle_first_time_user()
             
             # Mark user as seen for any command
-            if self.is_first_time_user(user_id):
+            if first_time:
                 logger.info(f"Marking new user as seen: {user_id}")
                 self.mark_user_as_seen(user_id)
             
@@ -210,11 +302,15 @@ Just say "Hey LUA" anytime to activate me. Try it now!
             logger.info(f"Command processed in {processing_time:.2f}s: {command_text}")
             
             # Save command to database
+            app = None
+            if result.get('action') == 'open_app' and result.get('package'):
+                app = (result.get('app_name'), result['package'])
             self._save_command_to_db(
                 user_id, 
                 command_text, 
                 result.get('action', 'unknown'), 
-                result.get('success', False)
+                result.get('success', False),
+                app
             )
             
             return result
@@ -227,36 +323,64 @@ Just say "Hey LUA" anytime to activate me. Try it now!
                 'error': str(e)
             }
     
+    def process_batch(self, items):
+        """Process many {user_id, text, context} items, returning results in input order
+        
+        Items are grouped by user, so each user's seen-user lookup runs once
+        per batch; the command rows go through the write-behind log.
+        """
+        results = [None] * len(items)
+        by_user = {}
+        
+        for position, item in enumerate(items):
+            try:
+                user_id, text, context = parse_batch_item(item)
+            except ValueError as e:
+                results[position] = {'error': str(e)}
+                continue
+            by_user.setdefault(user_id, []).append((position, text, context))
+        
+        for user_id, entries in by_user.items():
+            try:
+                first_time = self.is_first_time_user(user_id)
+            except Exception as e:
+                for position, _, _ in entries:
+                    results[position] = {'error': str(e)}
+                continue
+            
+            for position, text, context in entries:
+                try:
+                    results[position] = self.process_command(
+                        user_id, text, context, first_time=first_time
+                    )
+                except Exception as e:
+                    results[position] = {'error': str(e)}
+                # Only the user's first command in the batch can be their first ever
+                first_time = False
+        
+        return results
+    
     def execute_command(self, command_text, context):
         """Execute command based on text analysis"""
         try:
-            command_lower = command_text.lower()
-            
-            # Help command with privacy warning
-            if any(word in command_lower for word in ['help', 'commands', 'what can you do']):
-                return self.handle_help_command()
-            
-            # Check for reminders first (before calls)
-            elif any(word in command_lower for word in ['remind', 'reminder', 'alert']):
-                return self.handle_reminder(command_text)
-            
-            elif any(word in command_lower for word in ['open', 'launch', 'start']):
-                return self.handle_app_launch(command_text)
-            
-            elif any(word in command_lower for word in ['call', 'phone', 'dial']):
-                return self.handle_phone_call(command_text)
-            
-            elif any(word in command_lower for word in ['message', 'sms', 'text']):
-                return self.handle_sms(command_text)
-            
-            elif any(word in command_lower for word in ['music', 'play', 'song']):
-                return self.handle_music_control(command_text)
+            # Repeated deterministic commands skip parsing entirely
+            cache_key = self.response_cache.make_key(
+                command_text, context, self.RESPONSE_CACHE_CONTEXT_KEYS
+            )
+            cached = self.response_cache.get(cache_key)
+            if cached is not None:
+                return cached
             
-            elif any(word in command_lower for word in ['camera', 'photo', 'selfie']):
-                return self.handle_camera_control(command_text)
+            match = command_intents.classify(command_text, intents=self.intent_handlers)
             
-            elif any(word in command_lower for word in ['weather', 'temperature']):
-                return self.handle_weather_request(command_text)
+            if match.intent:
+                handler = self.intent_handlers[match.intent]
+                if getattr(handler, 'cacheable', False):
+                    # Given the key's text, so every utterance sharing the key gets the same result
+                    result = handler(cache_key[0])
+                    self.response_cache.put(cache_key, result)
+                    return result
+                return handler(command_text)
             
             else:
                 return {
@@ -272,7 +396,8 @@ Just say "Hey LUA" anytime to activate me. Try it now!
                 'response': f'Error executing command: {str(e)}'
             }
     
-    def handle_help_command(self):
+    @cacheable
+    def handle_help_command(self, command_text=None):
         """Handle help command with privacy warning"""
         help_text = """
 Here are my available commands:
@@ -296,6 +421,7 @@ Say "Hey LUA" anytime to activate me!
             'success': True
         }
     
+    @cacheable
     def handle_app_launch(self, command_text):
         """Handle app launching"""
         words = command_text.lower().split()
@@ -378,6 +504,7 @@ Say "Hey LUA" anytime to activate me!
             'success': False
         }
     
+    # Not cacheable: "in 10 minutes" and "tomorrow" are relative to the request time
     def handle_reminder(self, command_text):
         """Handle reminder setting"""
         import re
@@ -415,6 +542,7 @@ Say "Hey LUA" anytime to activate me!
             'success': True
         }
     
+    @cacheable
     def handle_music_control(self, command_text):
         """Handle music control"""
         command_lower = command_text.lower()
@@ -447,6 +575,7 @@ Say "Hey LUA" anytime to activate me!
             'success': True
         }
     
+    @cacheable
     def handle_camera_control(self, command_text):
         """Handle camera control"""
         mode = 'default'
@@ -460,6 +589,7 @@ Say "Hey LUA" anytime to activate me!
             'success': True
         }
     
+    # Not cacheable: the weather changes with the time
     def handle_weather_request(self, command_text):
         """Handle weather requests"""
         return {
@@ -477,6 +607,8 @@ Say "Hey LUA" anytime to activate me!
 # Initialize backend
 lua_backend = LuaBackend()
 
+MAX_BATCH_ITEMS = int(os.getenv('LUA_BATCH_MAX_ITEMS', 1000))
+
 # API Routes
 @app.route('/', methods=['GET'])
 def home():
@@ -493,6 +625,7 @@ def home():
         ],
         'endpoints': {
             'process_voice': '/api/process_voice',
+            'process_voice_batch': '/api/process_voice_batch',
             'user_stats': '/api/user_stats',
             'health': '/health'
         }
@@ -519,33 +652,59 @@ def process_voice():
         logger.error(f"Voice processing error: {e}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/process_voice_batch', methods=['POST'])
+def process_voice_batch():
+    """Process a list of voice commands in one call"""
+    try:
+        data = request.get_json()
+        items = data.get('items', [])
+        
+        if not isinstance(items, list) or not items:
+            return jsonify({'error': 'No items provided'}), 400
+        if len(items) > MAX_BATCH_ITEMS:
+            return jsonify({'error': f'Batch limited to {MAX_BATCH_ITEMS} items'}), 400
+        
+        results = lua_backend.process_batch(items)
+        
+        return jsonify({'results': results})
+        
+    except Exception as e:
+        logger.error(f"Batch processing error: {e}")
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/user_stats', methods=['GET'])
 def get_user_stats():
     """Get user statistics"""
     try:
         user_id = request.args.get('user_id', 'default')
+        consistency = request.args.get('consistency', 'read_your_writes')
         
         if lua_backend.db_client:
-            # Get stats from database
-            user_result = lua_backend.db_client.execute(
-                "SELECT total_commands, first_seen, last_active FROM users WHERE id = ?",
-                [user_id]
+            # Get stats from the rollup; one row however long the history
+            user_result = lua_backend.read(
+                "SELECT r.total_commands, r.successful_commands, r.top_apps, u.first_seen, u.last_active "
+                "FROM users u LEFT JOIN user_stats_rollup r ON r.user_id = u.id WHERE u.id = ?",
+                [user_id], user_id, consistency
             )
             
             if user_result.rows:
                 row = user_result.rows[0]
                 total_commands = row[0] or 0
-                first_seen = row[1]
-                last_active = row[2]
+                successful_commands = row[1] or 0
+                top_apps = json.loads(row[2] or '[]')
+                first_seen = row[3]
+                last_active = row[4]
             else:
                 total_commands = 0
+                successful_commands = 0
+                top_apps = []
                 first_seen = datetime.now().isoformat()
                 last_active = datetime.now().isoformat()
             
             # Get recent commands
-            recent_result = lua_backend.db_client.execute(
+            recent_result = lua_backend.read(
                 "SELECT command_text, action, success, timestamp FROM commands WHERE user_id = ? ORDER BY timestamp DESC LIMIT 10",
-                [user_id]
+                [user_id], user_id, consistency
             )
             
             recent_commands = [{
@@ -558,6 +717,8 @@ def get_user_stats():
         else:
             # Fallback stats
             total_commands = 0
+            successful_commands = 0
+            top_apps = []
             first_seen = datetime.now().isoformat()
             last_active = datetime.now().isoformat()
             recent_commands = []
@@ -565,9 +726,11 @@ def get_user_stats():
         stats = {
             'user_id': user_id,
             'total_commands': total_commands,
-            'success_rate': 100,
+            'successful_commands': successful_commands,
+            'success_rate': (successful_commands / total_commands * 100) if total_commands > 0 else 0,
             'first_seen': first_seen,
             'last_active': last_active,
+            'top_apps': top_apps,
             'recent_commands': recent_commands
         }
         return jsonify(stats)
@@ -589,7 +752,12 @@ def health_check():
             'backend': 'running',
             'api': 'active',
             'database': db_status,
-            'users_seen': len(lua_backend.seen_users)
+            'users_seen': len(lua_backend.seen_users),
+            'seen_users': lua_backend.seen_users.stats(),
+            'response_cache': lua_backend.response_cache.stats(),
+            'command_log': lua_backend.command_log.stats(),
+            'snapshot': lua_backend.snapshot.stats(),
+            'replica': lua_backend.replica.stats() if lua_backend.replica else None
         }
     })
 
@@ -602,9 +770,25 @@ def ping():
     })
 
 if __name__ == '__main__':
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="LUA Assistant Backend")
+    parser.add_argument('--rebuild-stats', action='store_true',
+                        help='recompute user_stats_rollup from the commands and app_usage tables and exit')
+    args = parser.parse_args()
+    if args.rebuild_stats:
+        if not lua_backend.db_client:
+            sys.exit("No database configured")
+        lua_backend.rebuild_user_stats()
+        logger.info("User stats rebuilt")
+        sys.exit(0)
+    
     port = int(os.environ.get('PORT', 5000))
     debug = os.environ.get('FLASK_ENV') == 'development'
     
+    # Exit through atexit on SIGTERM so queued commands are drained
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    
     logger.info(f"Starting LUA Assistant Backend on port {port}")
     logger.info(f"Debug mode: {debug}")
     
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+LUA Assistant - Learned Pattern Cache
+Per-user pattern indexes loaded on first use and evicted least-recently-used
+"""
+
+import os
+import struct
+import threading
+from collections import OrderedDict
+
+from text_index import LearnedPatternIndex
+
+PATTERN_HEADER = struct.Struct('<HHf')
+VERSION_HEADER = struct.Struct('<H')
+
+# Entries carry the table version they were read at; the first layout had none
+PATTERN_SECTION = 'learned_patterns_v2'
+
+
+def encode_patterns(rows):
+    """Pack (pattern, action, confidence) rows for a snapshot"""
+    parts = []
+    for pattern, action, confidence in rows:
+        pattern = pattern.encode('utf-8')[:0xFFFF]
+        action = action.encode('utf-8')[:0xFFFF]
+        parts.append(PATTERN_HEADER.pack(len(pattern), len(action), confidence) + pattern + action)
+    return b''.join(parts)
+
+
+def decode_patterns(data):
+    rows = []
+    position = 0
+    while position < len(data):
+        pattern_length, action_length, confidence = PATTERN_HEADER.unpack_from(data, position)
+        position += PATTERN_HEADER.size
+        pattern = bytes(data[position:position + pattern_length]).decode('utf-8')
+        position += pattern_length
+        action = bytes(data[position:position + action_length]).decode('utf-8')
+        position += action_length
+        rows.append((pattern, action, confidence))
+    return rows
+
+
+def encode_entry(version, rows):
+    """A snapshot entry: the table version the rows were read at, then the rows"""
+    version = version.encode('utf-8')
+    return VERSION_HEADER.pack(len(version)) + version + encode_patterns(rows)
+
+
+def decode_entry(data):
+    (length,) = VERSION_HEADER.unpack_from(data)
+    version = bytes(data[VERSION_HEADER.size:VERSION_HEADER.size + length]).decode('utf-8')
+    return version, decode_patterns(data[VERSION_HEADER.size + length:])
+
+
+class LearnedPatternCache:
+    """Write-through cache of LearnedPatternIndex objects keyed by user"""
+
+    def __init__(self, loader, max_users=None, max_patterns=None, snapshot=None, version=None):
+        # loader(user_id) -> iterable of (pattern, action, confidence)
+        self.loader = loader
+        # version(user_id) -> version string of the user's rows. A snapshot entry
+        # is only used while it matches, so writes committed after the
+        # snapshot (or by another process) are never hidden by it
+        self.snapshot = snapshot if version is not None else None
+        self.version = version
+        self.max_users = max_users or int(os.getenv('LUA_PATTERN_CACHE_USERS', 1000))
+        self.max_patterns = max_patterns or int(os.getenv('LUA_PATTERN_CACHE_PATTERNS', 200000))
+
+        self._users = OrderedDict()
+        self._sizes = {}
+        # Version each resident index was loaded at; None once it has had writes
+        self._versions = {}
+        self._loading = {}
+        self._pattern_count = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.snapshot_restores = 0
+        self.snapshot_rejects = 0
+
+    def _current_version(self, user_id):
+        if self.version is None:
+            return None
+        try:
+            return self.version(user_id)
+        except Exception:
+            return None
+
+    def _load(self, user_id):
+        """Return (version, rows), from the snapshot if it is still current"""
+        version = self._current_version(user_id)
+        data = self.snapshot.get(user_id) if self.snapshot is not None and version is not None else None
+        if data is not None:
+            snapshot_version, rows = decode_entry(data)
+            with self._lock:
+                if snapshot_version == version:
+                    self.snapshot_restores += 1
+                    return version, rows
+                self.snapshot_rejects += 1
+        # Versioned before the read: a write landing in between makes the
+        # stored version older than the rows, which only costs a reload later
+        return version, self.loader(user_id)
+
+    def get(self, user_id):
+        """Return the user's index, loading it from the database on a miss"""
+        with self._lock:
+            index = self._users.get(user_id)
+            if index is not None:
+                self._users.move_to_end(user_id)
+                self.hits += 1
+                return index
+            self.misses += 1
+            # Writes that land while the rows are being read are replayed after
+            pending = self._loading.setdefault(user_id, [])
+
+        index = LearnedPatternIndex()
+        version = None
+        try:
+            version, rows = self._load(user_id)
+            for pattern, action, confidence in rows:
+                index.upsert(pattern, action, confidence)
+        finally:
+            with self._lock:
+                pending = self._loading.pop(user_id, pending)
+
+        for pattern, action, confidence in pending:
+            index.upsert(pattern, action, confidence)
+
+        with self._lock:
+            existing = self._users.get(user_id)
+            if existing is not None:
+                # Another request loaded the same user first
+                self._users.move_to_end(user_id)
+                return existing
+            self._users[user_id] = index
+            self._sizes[user_id] = len(index)
+            self._versions[user_id] = None if pending else version
+            self._pattern_count += len(index)
+            self._evict()
+
+        return index
+
+    def record(self, user_id, pattern, action, confidence):
+        """Apply a pattern write that has just been committed to the database"""
+        with self._lock:
+            if user_id in self._loading:
+                self._loading[user_id].append((pattern, action, confidence))
+                return
+
+            index = self._users.get(user_id)
+            if index is None:
+                # Not resident: the write changed the version, so the next
+                # get() rejects any snapshot entry and reads the table
+                return
+
+            index.upsert(pattern, action, confidence)
+            self._versions[user_id] = None
+            self._pattern_count += len(index) - self._sizes[user_id]
+            self._sizes[user_id] = len(index)
+            self._evict()
+
+    def _evict(self):
+        """Drop cold users until both budgets hold (caller holds the lock)"""
+        while len(self._users) > 1 and (
+            len(self._users) > self.max_users or self._pattern_count > self.max_patterns
+        ):
+            user_id, _ = self._users.popitem(last=False)
+            self._pattern_count -= self._sizes.pop(user_id)
+            self._versions.pop(user_id, None)
+            self.evictions += 1
+
+    def snapshot_items(self):
+        """Versioned patterns per user: resident indexes plus untouched snapshot entries
+
+        Entries carried over keep the version they were written with and are
+        checked again on restore, so a long-lived entry cannot go stale.
+        """
+        with self._lock:
+            resident = [(user_id, index, self._versions.get(user_id)) for user_id, index in self._users.items()]
+
+        items = {}
+        if self.snapshot is not None:
+            for user_id, data in self.snapshot.items():
+                items[user_id] = bytes(data)
+        for user_id, index, version in resident:
+            if version is None:
+                # Written since it was loaded: re-read to pair rows with a version
+                version = self._current_version(user_id)
+                if version is None:
+                    items.pop(user_id, None)
+                    continue
+                try:
+                    rows = list(self.loader(user_id))
+                except Exception:
+                    items.pop(user_id, None)
+                    continue
+            else:
+                with index._lock:
+                    rows = [(e['pattern'], e['action'], e['confidence']) for e in index.entries]
+            items[user_id] = encode_entry(version, rows)
+        return items
+
+    def stats(self):
+        """Return hit/miss/eviction counters and current occupancy"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'users': len(self._users),
+                'patterns': self._pattern_count,
+                'snapshot_restores': self.snapshot_restores,
+                'snapshot_rejects': self.snapshot_rejects
+            }
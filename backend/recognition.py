@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+LUA Assistant - Recognition Scheduler
+Hedged, concurrent multi-engine speech recognition with an overall deadline
+"""
+
+import atexit
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+import requests
+from requests.adapters import HTTPAdapter
+import speech_recognition as sr
+
+logger = logging.getLogger(__name__)
+
+NO_RESULT = {'engine': 'none', 'text': '', 'confidence': 0.0}
+
+
+class GoogleSpeechEngine:
+    """Google Web Speech API client that reuses pooled HTTP connections"""
+
+    name = 'google'
+
+    def __init__(self, url=None, key=None, timeout=None, pool_size=8, session=None, recognizer=None):
+        # Point LUA_GOOGLE_SPEECH_URL at a local stub server to test without Google
+        self.url = url or os.getenv('LUA_GOOGLE_SPEECH_URL', 'http://www.google.com/speech-api/v2/recognize')
+        self.key = key or os.getenv('LUA_GOOGLE_SPEECH_KEY')
+        self.timeout = timeout or float(os.getenv('LUA_GOOGLE_SPEECH_TIMEOUT', 8))
+
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+        self.session = session
+        # Without a key of our own, speech_recognition's built-in key is used
+        self.recognizer = recognizer or sr.Recognizer()
+
+    def recognize(self, audio, language='en-US'):
+        """Return a result dict, or None when no speech was recognized"""
+        if not self.key:
+            try:
+                result = self.recognizer.recognize_google(audio, language=language, show_all=True)
+            except sr.UnknownValueError:
+                return None
+            return self._best(result.get('alternative', []) if isinstance(result, dict) else [])
+
+        flac_data = audio.get_flac_data(
+            convert_rate=None if audio.sample_rate >= 8000 else 8000,
+            convert_width=2
+        )
+        sample_rate = audio.sample_rate if audio.sample_rate >= 8000 else 8000
+
+        response = self.session.post(
+            self.url,
+            params={'client': 'chromium', 'lang': language, 'key': self.key, 'pFilter': 0},
+            data=flac_data,
+            headers={'Content-Type': f'audio/x-flac; rate={sample_rate}'},
+            timeout=self.timeout
+        )
+        response.raise_for_status()
+
+        # One JSON object per line; the first is usually an empty result
+        for line in response.text.split('\n'):
+            if not line:
+                continue
+            result = json.loads(line).get('result', [])
+            if result:
+                break
+        else:
+            return None
+
+        return self._best(result[0].get('alternative', []))
+
+    def _best(self, alternatives):
+        if not alternatives:
+            return None
+        best = max(alternatives, key=lambda alt: alt.get('confidence', 0.0))
+        return {
+            'engine': self.name,
+            'text': best['transcript'],
+            'confidence': best.get('confidence', 0.9)
+        }
+
+
+class SphinxEngine:
+    """Offline PocketSphinx recognition, through a decoder pool when one is given"""
+
+    name = 'sphinx'
+
+    def __init__(self, recognizer=None, confidence=0.7, pool=None):
+        self.recognizer = recognizer or sr.Recognizer()
+        self.confidence = confidence
+        self.pool = pool
+
+    def recognize(self, audio, language='en-US'):
+        if self.pool is not None and language == self.pool.language:
+            text = self.pool.decode(audio)
+            if not text:
+                return None
+        else:
+            # Builds a fresh decoder, model load included
+            try:
+                text = self.recognizer.recognize_sphinx(audio, language=language)
+            except sr.UnknownValueError:
+                return None
+        return {'engine': self.name, 'text': text, 'confidence': self.confidence}
+
+
+class RecognitionScheduler:
+    """Runs engines in preference order, hedging to the next one after a delay
+
+    The primary engine starts immediately. Each fallback starts after
+    hedge_delay, or at once if an earlier engine failed or came back below the
+    confidence threshold. The first result that clears the threshold is
+    returned; stragglers are ignored and the call never outlives the deadline.
+    """
+
+    def __init__(self, engines, hedge_delay_ms=None, deadline_ms=None,
+                 confidence_threshold=None, max_workers=None):
+        self.engines = list(engines)
+        self.hedge_delay = (hedge_delay_ms if hedge_delay_ms is not None
+                            else int(os.getenv('LUA_ASR_HEDGE_MS', 400))) / 1000.0
+        self.deadline = (deadline_ms or int(os.getenv('LUA_ASR_DEADLINE_MS', 8000))) / 1000.0
+        self.confidence_threshold = (confidence_threshold if confidence_threshold is not None
+                                     else float(os.getenv('LUA_ASR_CONFIDENCE', 0.6)))
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers or 4 * max(len(self.engines), 1),
+            thread_name_prefix='asr'
+        )
+        atexit.register(self.close)
+
+    def _run_engine(self, engine, audio, language):
+        started = time.monotonic()
+        result = engine.recognize(audio, language)
+        if result is not None:
+            result['latency_ms'] = round((time.monotonic() - started) * 1000, 1)
+        return result
+
+    def recognize(self, audio, language='en-US'):
+        """Return the first confident result, the best one seen, or an empty result"""
+        start = time.monotonic()
+        deadline = start + self.deadline
+        waiting = list(self.engines)
+        running = {}
+        best = None
+
+        def launch():
+            engine = waiting.pop(0)
+            future = self.executor.submit(self._run_engine, engine, audio, language)
+            running[future] = engine
+            return time.monotonic() + self.hedge_delay
+
+        next_launch = launch()
+
+        while running or waiting:
+            now = time.monotonic()
+            if now >= deadline:
+                break
+
+            if waiting and (now >= next_launch or not running):
+                next_launch = launch()
+                continue
+
+            wake_at = min(deadline, next_launch) if waiting else deadline
+            done, _ = wait(list(running), timeout=max(wake_at - now, 0), return_when=FIRST_COMPLETED)
+
+            for future in done:
+                engine = running.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    logger.warning(f"{engine.name} recognition error: {e}")
+                    result = None
+
+                if result and result['confidence'] >= self.confidence_threshold:
+                    for straggler in running:
+                        straggler.cancel()
+                    return result
+
+                if result and (best is None or result['confidence'] > best['confidence']):
+                    best = result
+
+                # A failed or weak engine hands over to the next one immediately
+                next_launch = time.monotonic()
+
+        for straggler in running:
+            straggler.cancel()
+
+        return best or dict(NO_RESULT)
+
+    def close(self):
+        """Stop the engine threads; a recognition still running is abandoned"""
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+LUA Assistant - Response Cache
+Bounded TTL/LRU cache for deterministic command results
+"""
+
+import copy
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+def cacheable(handler):
+    """Mark a command handler whose result depends only on the normalized text
+
+    Handlers that read per-user state, the context or the clock must not be
+    marked; a cached result is replayed to every user until the TTL expires.
+    """
+    handler.cacheable = True
+    return handler
+
+
+def normalize_command(text):
+    """Lowercase and collapse whitespace so trivially different utterances share a key"""
+    return ' '.join(text.lower().split())
+
+
+class ResponseCache:
+    """Thread-safe LRU cache whose entries also expire after a TTL"""
+
+    def __init__(self, max_entries=None, ttl=None):
+        self.max_entries = max_entries or int(os.getenv('LUA_RESPONSE_CACHE_SIZE', 2048))
+        self.ttl = ttl or float(os.getenv('LUA_RESPONSE_CACHE_TTL', 300))
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def make_key(self, command_text, context=None, context_keys=()):
+        """Key on the normalized text plus any context fields that affect the result"""
+        context = context or {}
+        return (normalize_command(command_text),) + tuple(
+            context.get(field) for field in context_keys
+        )
+
+    def get(self, key):
+        """Return a deep copy of the cached result, or None on a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, result = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return copy.deepcopy(result)
+
+    def put(self, key, result):
+        """Store a deep copy of result, evicting the least recently used entries"""
+        result = copy.deepcopy(result)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Return hit-rate metrics and current size"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'size': len(self._entries)
+            }
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+LUA Assistant - Speech Cache
+Content-addressed on-disk cache of synthesized audio with LRU eviction under a byte budget
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+def make_key(engine, voice, rate, text, volume=None):
+    """Stable digest of everything that changes the rendered audio
+
+    Unlike hash(), sha256 is identical across processes, so entries survive restarts.
+    """
+    payload = json.dumps([engine, voice, rate, volume, text.strip()], ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def file_digest(path, chunk_size=1024 * 1024):
+    """sha256 of a file, used to key cloned voices by their reference audio"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class SpeechCache:
+    """Audio files named by key, indexed in memory in least recently used order
+
+    The index is built from the directory on first use (or by load()),
+    oldest mtime first; hits refresh the mtime so recency survives a
+    restart. Writes go to a temporary file in the same directory and are
+    renamed into place, so a reader never sees a partial file.
+    """
+
+    def __init__(self, directory=None, max_bytes=None, suffix='.wav', stale_temp_age=None):
+        self.directory = directory or os.getenv('LUA_SPEECH_CACHE_DIR', 'speech_cache')
+        self.max_bytes = max_bytes or int(os.getenv('LUA_SPEECH_CACHE_BYTES', 256 * 1024 * 1024))
+        self.suffix = suffix
+        # Temporary files younger than this may still be written by another process
+        self.stale_temp_age = stale_temp_age or float(os.getenv('LUA_SPEECH_CACHE_STALE_TEMP_SECONDS', 3600))
+
+        # key -> size in bytes
+        self._index = OrderedDict()
+        self._bytes = 0
+        self._loaded = False
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def load(self):
+        """Build the index from the directory now, e.g. from a warm-up thread"""
+        with self._lock:
+            self._load_index()
+
+    def _load_index(self):
+        """Walk the directory once; caller holds the lock"""
+        if self._loaded:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        stale_before = time.time() - self.stale_temp_age
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                    if name.startswith('.tmp-'):
+                        # Left behind by a crash between write and rename
+                        if stat.st_mtime < stale_before:
+                            os.unlink(path)
+                        continue
+                except OSError:
+                    continue
+                if name.endswith(self.suffix):
+                    entries.append((stat.st_mtime, name[:-len(self.suffix)], stat.st_size))
+
+        for _, key, size in sorted(entries):
+            self._index[key] = size
+            self._bytes += size
+        self._loaded = True
+        self._evict()
+
+    def path(self, key):
+        """Where an entry lives; two-character shards keep directories small"""
+        return os.path.join(self.directory, key[:2], key + self.suffix)
+
+    def get_path(self, key):
+        """Return the path of a cached entry, or None on a miss
+
+        Eviction may delete the file at any time; use export() to keep a copy.
+        """
+        with self._lock:
+            self._load_index()
+            if key not in self._index:
+                self.misses += 1
+                return None
+            self._index.move_to_end(key)
+            self.hits += 1
+
+        path = self.path(key)
+        try:
+            os.utime(path)
+        except OSError:
+            # Deleted behind our back
+            with self._lock:
+                size = self._index.pop(key, None)
+                if size is not None:
+                    self._bytes -= size
+                self.hits -= 1
+                self.misses += 1
+            return None
+        return path
+
+    def get(self, key):
+        """Return cached audio bytes, or None on a miss"""
+        path = self.get_path(key)
+        if path is None:
+            return None
+        try:
+            with open(path, 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def export(self, key, destination):
+        """Give the caller its own file of a cached entry; False on a miss
+
+        A hard link where the cache and destination share a filesystem, a
+        copy otherwise. Evicting the entry later leaves the caller's file.
+        """
+        path = self.get_path(key)
+        if path is None:
+            return False
+
+        staging = f"{destination}.tmp-{os.getpid()}-{threading.get_ident()}"
+        try:
+            try:
+                os.link(path, staging)
+            except FileNotFoundError:
+                raise
+            except OSError:
+                shutil.copyfile(path, staging)
+            os.replace(staging, destination)
+        except FileNotFoundError:
+            # Evicted between the lookup and the link
+            try:
+                os.unlink(staging)
+            except OSError:
+                pass
+            return False
+        return True
+
+    def _commit(self, key, size):
+        with self._lock:
+            self._load_index()
+            previous = self._index.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous
+            self._index[key] = size
+            self._bytes += size
+            self._evict()
+
+    def put(self, key, data):
+        """Store audio bytes atomically and return the entry's path"""
+        path = self.path(key)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+
+        fd, temp_path = tempfile.mkstemp(prefix='.tmp-', dir=directory)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        except BaseException:
+            try:
+                os.unlink(temp_path)
+            except OSError:
+                pass
+            raise
+
+        self._commit(key, len(data))
+        return path
+
+    def put_file(self, key, source_path):
+        """Copy an already rendered file in atomically and return the entry's path"""
+        path = self.path(key)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+
+        fd, temp_path = tempfile.mkstemp(prefix='.tmp-', dir=directory)
+        os.close(fd)
+        try:
+            shutil.copyfile(source_path, temp_path)
+            os.replace(temp_path, path)
+        except BaseException:
+            try:
+                os.unlink(temp_path)
+            except OSError:
+                pass
+            raise
+
+        self._commit(key, os.path.getsize(path))
+        return path
+
+    def _evict(self):
+        """Drop least recently used entries until under budget; caller holds the lock"""
+        while self._bytes > self.max_bytes and self._index:
+            key, size = self._index.popitem(last=False)
+            self._bytes -= size
+            self.evictions += 1
+            try:
+                os.unlink(self.path(key))
+            except OSError:
+                pass
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'loaded': self._loaded,
+                'entries': len(self._index),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+def default_speech_cache():
+    """The process-wide cache shared by every TTS path"""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = SpeechCache()
+        return _default_cache
@@ -8,6 +8,11 @@ import time
 from datetime import datetime
 import json
 import os
+from audio_input import pcm_rms
+from recognition import RecognitionScheduler, GoogleSpeechEngine, SphinxEngine
+from sphinx_pool import SphinxDecoderPool
+from command_grammar import CommandGrammar
+from device_integration import DeviceIntegration
 
 class AdvancedSpeechProcessor:
     def __init__(self):
@@ -23,6 +28,16 @@ class AdvancedSpeechProcessor:
         self.recognizer.phrase_threshold = 0.3
         self.recognizer.non_speaking_duration = 0.8
         
+        # Online and offline engines, hedged rather than run back to back;
+        # Sphinx decoders are loaded once; the command grammar is used when LUA_SPHINX_SEARCH=grammar
+        self.device = DeviceIntegration()
+        self.command_grammar = CommandGrammar([lambda: self.device.android_packages])
+        self.sphinx_pool = SphinxDecoderPool(grammar=self.command_grammar)
+        self.recognition = RecognitionScheduler([
+            GoogleSpeechEngine(recognizer=self.recognizer),
+            SphinxEngine(self.recognizer, pool=self.sphinx_pool)
+        ])
+        
         # Configure TTS
         self.setup_tts()
         
@@ -54,6 +69,10 @@ class AdvancedSpeechProcessor:
         except Exception as e:
             print(f"TTS setup error: {e}")
     
+    def add_app_catalog(self, catalog):
+        """Make more app names speakable offline; catalog returns an iterable of names"""
+        self.command_grammar.add_catalog(catalog)
+    
     def calibrate_microphone(self):
         """Calibrate microphone for ambient noise"""
         try:
@@ -94,39 +113,7 @@ class AdvancedSpeechProcessor:
     
     def recognize_speech_from_audio(self, audio_data, language='en-US'):
         """Recognize speech from audio data with multiple engines"""
-        results = []
-        
-        # Try Google Speech Recognition (online)
-        try:
-            text = self.recognizer.recognize_google(audio_data, language=language)
-            results.append({
-                'engine': 'google',
-                'text': text,
-                'confidence': 0.9
-            })
-        except sr.UnknownValueError:
-            pass
-        except sr.RequestError as e:
-            print(f"Google Speech Recognition error: {e}")
-        
-        # Try Sphinx (offline) as fallback
-        try:
-            text = self.recognizer.recognize_sphinx(audio_data)
-            results.append({
-                'engine': 'sphinx',
-                'text': text,
-                'confidence': 0.7
-            })
-        except sr.UnknownValueError:
-            pass
-        except sr.RequestError as e:
-            print(f"Sphinx error: {e}")
-        
-        # Return best result
-        if results:
-            return max(results, key=lambda x: x['confidence'])
-        else:
-            return {'engine': 'none', 'text': '', 'confidence': 0.0}
+        return self.recognition.recognize(audio_data, language=language)
     
     def recognize_from_file(self, audio_file_path):
         """Recognize speech from audio file"""
@@ -209,8 +196,7 @@ class AdvancedSpeechProcessor:
                 # Listen for a short duration to get audio level
                 audio = self.recognizer.listen(source, timeout=0.1, phrase_time_limit=0.1)
                 # Calculate RMS (Root Mean Square) for audio level
-                import audioop
-                rms = audioop.rms(audio.get_wav_data(), 2)
+                rms = pcm_rms(audio.get_raw_data(convert_width=2), 2)
                 return min(rms / 1000, 100)  # Normalize to 0-100
         except:
             return 0
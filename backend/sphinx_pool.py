@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+LUA Assistant - Sphinx Decoder Pool
+Preloaded PocketSphinx decoders leased per recognition instead of rebuilt per call
+"""
+
+import logging
+import os
+import queue
+import threading
+from contextlib import contextmanager
+
+import speech_recognition as sr
+
+logger = logging.getLogger(__name__)
+
+
+class SphinxDecoderPool:
+    """Fixed-size pool of decoders with the acoustic and language models already loaded"""
+
+    def __init__(self, size=None, language='en-US', grammar=None):
+        self.size = size or int(os.getenv('LUA_SPHINX_POOL_SIZE', os.getenv('WEB_CONCURRENCY', 2)))
+        self.language = language
+        self.lease_timeout = float(os.getenv('LUA_SPHINX_LEASE_TIMEOUT', 5))
+
+        # LUA_SPHINX_SEARCH=grammar decodes against the command grammar first,
+        # falling back to the full language model for free-text commands
+        use_grammar = os.getenv('LUA_SPHINX_SEARCH', 'lm') == 'grammar'
+        self.grammar = grammar if use_grammar else None
+        self._grammar_versions = {}
+        self.language_model_fallbacks = 0
+
+        # LIFO hands out the most recently used, cache-warm decoder first
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def model_paths(self):
+        """Return (acoustic model dir, language model, dictionary) bundled with speech_recognition"""
+        language_directory = os.path.join(
+            os.path.dirname(os.path.realpath(sr.__file__)), 'pocketsphinx-data', self.language
+        )
+        return (
+            os.path.join(language_directory, 'acoustic-model'),
+            os.path.join(language_directory, 'language-model.lm.bin'),
+            os.path.join(language_directory, 'pronounciation-dictionary.dict')
+        )
+
+    def create_config(self):
+        """Build the decoder configuration, mirroring recognize_sphinx"""
+        try:
+            from pocketsphinx import pocketsphinx
+        except ImportError:
+            raise sr.RequestError("missing PocketSphinx module: ensure that PocketSphinx is set up correctly.")
+
+        acoustic_model, language_model, dictionary = self.model_paths()
+        if not os.path.isdir(acoustic_model):
+            raise sr.RequestError(f"missing PocketSphinx language data directory: \"{acoustic_model}\"")
+
+        config = pocketsphinx.Config()
+        config.set_string("-hmm", acoustic_model)
+        config.set_string("-lm", language_model)
+        config.set_string("-dict", dictionary)
+        config.set_string("-logfn", os.devnull)
+        return config
+
+    def _create_decoder(self):
+        from pocketsphinx import pocketsphinx
+        return pocketsphinx.Decoder(self.create_config())
+
+    def _apply_grammar(self, decoder):
+        """Switch a decoder to the current command grammar if it has an older one"""
+        try:
+            compiled = self.grammar.compile(self.model_paths()[2])
+            if self._grammar_versions.get(id(decoder)) == compiled.version:
+                return
+
+            missing = [(word, phones) for word, phones in compiled.pronunciations.items()
+                       if decoder.lookup_word(word) is None]
+            for position, (word, phones) in enumerate(missing):
+                # Rebuild the decoder's dictionary once, after the last word
+                decoder.add_word(word, phones, position == len(missing) - 1)
+
+            decoder.add_jsgf_string(self.grammar.name, compiled.jsgf)
+            decoder.activate_search(self.grammar.name)
+            self._grammar_versions[id(decoder)] = compiled.version
+        except Exception as e:
+            # Decoding against the language model is slower but still correct
+            logger.warning(f"Sphinx grammar not applied, using language model: {e}")
+
+    def warm(self):
+        """Load every decoder now rather than on first use"""
+        decoders = []
+        try:
+            while True:
+                with self._lock:
+                    if self._created >= self.size:
+                        break
+                    self._created += 1
+                try:
+                    decoder = self._create_decoder()
+                    if self.grammar is not None:
+                        self._apply_grammar(decoder)
+                    decoders.append(decoder)
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+        finally:
+            for decoder in decoders:
+                self._idle.put(decoder)
+        logger.info(f"Sphinx decoder pool ready ({self.size} decoders)")
+
+    @contextmanager
+    def lease(self, timeout=None):
+        """Borrow a decoder; a new one is only loaded while the pool is below size"""
+        try:
+            decoder = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                can_create = self._created < self.size
+                if can_create:
+                    self._created += 1
+
+            if can_create:
+                try:
+                    decoder = self._create_decoder()
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+            else:
+                try:
+                    decoder = self._idle.get(timeout=timeout or self.lease_timeout)
+                except queue.Empty:
+                    raise sr.RequestError("No Sphinx decoder available")
+
+        if self.grammar is not None:
+            self._apply_grammar(decoder)
+
+        healthy = False
+        try:
+            yield decoder
+            healthy = True
+        finally:
+            if healthy:
+                self._idle.put(decoder)
+            else:
+                # A decoder that failed mid-utterance is dropped, not reused
+                self._grammar_versions.pop(id(decoder), None)
+                with self._lock:
+                    self._created -= 1
+
+    def _decode_raw(self, decoder, raw_data):
+        # start_utt resets the search state left by the previous utterance
+        decoder.start_utt()
+        decoder.process_raw(raw_data, False, True)
+        decoder.end_utt()
+        hypothesis = decoder.hyp()
+        return hypothesis.hypstr if hypothesis is not None else None
+
+    def decode(self, audio, timeout=None):
+        """Decode one utterance, returning the hypothesis text or None
+
+        Against the command grammar, spoken numbers come back as digits, and
+        utterances the grammar cannot cover are decoded again with the
+        language model.
+        """
+        raw_data = audio.get_raw_data(convert_rate=16000, convert_width=2)
+
+        with self.lease(timeout) as decoder:
+            text = self._decode_raw(decoder, raw_data)
+            if id(decoder) not in self._grammar_versions:
+                return text
+
+            text = self.grammar.normalize(text) if text else None
+            if not self.grammar.needs_language_model(text):
+                return text
+            with self._lock:
+                self.language_model_fallbacks += 1
+            decoder.activate_search()
+            try:
+                return self._decode_raw(decoder, raw_data)
+            finally:
+                decoder.activate_search(self.grammar.name)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': self.size,
+                'loaded': self._created,
+                'idle': self._idle.qsize(),
+                'search': 'grammar' if self.grammar is not None else 'lm',
+                'grammar_version': self.grammar.version if self.grammar is not None else None,
+                'language_model_fallbacks': self.language_model_fallbacks
+            }
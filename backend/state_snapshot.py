@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""
+LUA Assistant - State Snapshot
+Memory-mapped snapshot of in-memory state, restored per key instead of rebuilt from the database
+
+File layout (little-endian):
+
+    header     b'LUASNAP1', uint32 section count, float64 written_at
+    directory  per section: uint16 name length, name, uint64 offset, uint64 length
+    section    uint32 key count, then one 24-byte slot per key sorted by key bytes:
+               uint64 key offset, uint32 key length, uint64 value offset, uint32 value length
+               followed by the key and value bytes the slots point at
+
+Lookups binary-search the slot table through the mapping, so restoring one
+user touches a handful of pages no matter how large the snapshot is.
+"""
+
+import atexit
+import json
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'LUASNAP1'
+HEADER = struct.Struct('<8sId')
+DIRECTORY_ENTRY = struct.Struct('<QQ')
+SLOT = struct.Struct('<QIQI')
+COUNT = struct.Struct('<I')
+
+
+def encode_json(value):
+    return json.dumps(value, separators=(',', ':'), default=str).encode('utf-8')
+
+
+def decode_json(data):
+    return json.loads(bytes(data).decode('utf-8'))
+
+
+class SnapshotSection:
+    """Read-only sorted key/value view over one section of a mapped snapshot"""
+
+    def __init__(self, buffer, offset, length):
+        self._buffer = buffer
+        self._base = offset
+        self._count = COUNT.unpack_from(buffer, offset)[0]
+        self._slots = offset + COUNT.size
+
+    def __len__(self):
+        return self._count
+
+    def _slot(self, position):
+        key_offset, key_length, value_offset, value_length = SLOT.unpack_from(
+            self._buffer, self._slots + position * SLOT.size
+        )
+        return (self._base + key_offset, key_length, self._base + value_offset, value_length)
+
+    def _key_at(self, position):
+        key_offset, key_length, _, _ = self._slot(position)
+        return bytes(self._buffer[key_offset:key_offset + key_length])
+
+    def _find(self, key):
+        """Binary search for a key; returns its slot position or -1"""
+        target = key.encode('utf-8')
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            if self._key_at(middle) < target:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self._count and self._key_at(low) == target:
+            return low
+        return -1
+
+    def __contains__(self, key):
+        return self._find(key) >= 0
+
+    def get(self, key, default=None):
+        """Return the raw value bytes for key, or default"""
+        position = self._find(key)
+        if position < 0:
+            return default
+        _, _, value_offset, value_length = self._slot(position)
+        return self._buffer[value_offset:value_offset + value_length]
+
+    def keys(self):
+        for position in range(self._count):
+            yield self._key_at(position).decode('utf-8')
+
+    def items(self):
+        for position in range(self._count):
+            key_offset, key_length, value_offset, value_length = self._slot(position)
+            yield (
+                bytes(self._buffer[key_offset:key_offset + key_length]).decode('utf-8'),
+                self._buffer[value_offset:value_offset + value_length]
+            )
+
+
+class Snapshot:
+    """A snapshot file mapped into memory; sections are parsed only when asked for"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._buffer = memoryview(self._mmap)
+
+        magic, section_count, self.written_at = HEADER.unpack_from(self._buffer, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a LUA snapshot")
+
+        self._directory = {}
+        position = HEADER.size
+        for _ in range(section_count):
+            name_length = struct.unpack_from('<H', self._buffer, position)[0]
+            position += 2
+            name = bytes(self._buffer[position:position + name_length]).decode('utf-8')
+            position += name_length
+            self._directory[name] = DIRECTORY_ENTRY.unpack_from(self._buffer, position)
+            position += DIRECTORY_ENTRY.size
+
+    def section(self, name):
+        entry = self._directory.get(name)
+        if entry is None:
+            return None
+        return SnapshotSection(self._buffer, *entry)
+
+    def sections(self):
+        return list(self._directory)
+
+
+def write_snapshot(path, sections):
+    """Atomically write {section name: {key: value bytes}} to path"""
+    names = sorted(sections)
+    encoded_names = [name.encode('utf-8') for name in names]
+    directory_size = sum(2 + len(name) + DIRECTORY_ENTRY.size for name in encoded_names)
+
+    bodies = []
+    for name in names:
+        entries = sorted(
+            (key.encode('utf-8'), bytes(value)) for key, value in sections[name].items()
+        )
+        slots_size = COUNT.size + SLOT.size * len(entries)
+        slots = [COUNT.pack(len(entries))]
+        blobs = []
+        cursor = slots_size
+        for key, value in entries:
+            slots.append(SLOT.pack(cursor, len(key), cursor + len(key), len(value)))
+            blobs.append(key)
+            blobs.append(value)
+            cursor += len(key) + len(value)
+        bodies.append(b''.join(slots) + b''.join(blobs))
+
+    directory = []
+    offset = HEADER.size + directory_size
+    for name, body in zip(encoded_names, bodies):
+        directory.append(struct.pack('<H', len(name)) + name + DIRECTORY_ENTRY.pack(offset, len(body)))
+        offset += len(body)
+
+    target_directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(prefix='.snapshot-', dir=target_directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, len(names), time.time()))
+            f.writelines(directory)
+            f.writelines(bodies)
+            f.flush()
+            os.fsync(f.fileno())
+        # Readers holding the old mapping keep the old inode until they drop it
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+class SnapshotBackedDict(dict):
+    """Dict that pulls a key from a snapshot section the first time it is looked up
+
+    Keys never touched keep their snapshot bytes as-is, so rewriting the
+    snapshot carries them over without decoding.
+    """
+
+    def __init__(self, section=None, decode=decode_json, encode=encode_json):
+        super().__init__()
+        self.section = section
+        self.decode = decode
+        self.encode = encode
+        self._dropped = set()
+
+    def _fault(self, key):
+        if self.section is not None and not dict.__contains__(self, key) and key not in self._dropped:
+            data = self.section.get(key) if isinstance(key, str) else None
+            if data is not None:
+                dict.__setitem__(self, key, self.decode(data))
+                return True
+        return dict.__contains__(self, key)
+
+    def __contains__(self, key):
+        return self._fault(key)
+
+    def __getitem__(self, key):
+        self._fault(key)
+        return dict.__getitem__(self, key)
+
+    def get(self, key, default=None):
+        return dict.get(self, key, default) if self._fault(key) else default
+
+    def __delitem__(self, key):
+        self._fault(key)
+        self._dropped.add(key)
+        dict.__delitem__(self, key)
+
+    def pop(self, key, *default):
+        self._fault(key)
+        self._dropped.add(key)
+        return dict.pop(self, key, *default)
+
+    def snapshot_items(self):
+        """Encoded values for every key, resident or still only in the snapshot"""
+        items = {}
+        if self.section is not None:
+            for key, data in self.section.items():
+                if key not in self._dropped and not dict.__contains__(self, key):
+                    items[key] = bytes(data)
+        for key, value in list(dict.items(self)):
+            items[key] = self.encode(value)
+        return items
+
+
+class SnapshotManager:
+    """Loads the last snapshot at startup and rewrites it periodically and at exit
+
+    Providers register a dump() returning {key: bytes} for their section. A
+    missing, unreadable or too old snapshot simply yields no sections, and
+    callers fall back to the database.
+    """
+
+    def __init__(self, path=None, interval=None, max_age=None, default_path='lua_state.snap'):
+        # Each server passes its own default_path so app.py and main.py never share a file
+        self.path = path or os.getenv('LUA_SNAPSHOT_PATH', default_path)
+        self.interval = interval or float(os.getenv('LUA_SNAPSHOT_INTERVAL', 300))
+        self.max_age = max_age or float(os.getenv('LUA_SNAPSHOT_MAX_AGE', 86400))
+
+        self._providers = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+        self.writes = 0
+        self.last_write_ms = None
+        self.snapshot = self._open()
+
+    def _open(self):
+        if not os.path.exists(self.path):
+            return None
+        try:
+            snapshot = Snapshot(self.path)
+        except (OSError, ValueError, struct.error) as e:
+            logger.warning(f"Ignoring unreadable snapshot {self.path}: {e}")
+            return None
+        if time.time() - snapshot.written_at > self.max_age:
+            logger.info(f"Ignoring snapshot older than {self.max_age:.0f}s")
+            return None
+        return snapshot
+
+    def section(self, name):
+        """The named section of the loaded snapshot, or None"""
+        return self.snapshot.section(name) if self.snapshot is not None else None
+
+    def register(self, name, dump):
+        with self._lock:
+            self._providers[name] = dump
+
+    def write(self):
+        """Dump every provider and replace the snapshot file"""
+        started = time.monotonic()
+        with self._lock:
+            providers = dict(self._providers)
+        sections = {}
+        for name, dump in providers.items():
+            try:
+                sections[name] = dump()
+            except Exception as e:
+                logger.error(f"Snapshot section {name} failed: {e}")
+        write_snapshot(self.path, sections)
+        self.writes += 1
+        self.last_write_ms = round((time.monotonic() - started) * 1000, 1)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.write()
+            except Exception as e:
+                logger.error(f"Snapshot write failed: {e}")
+
+    def start(self):
+        """Begin periodic writes and write a final snapshot at exit"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='snapshot', daemon=True)
+            self._thread.start()
+            atexit.register(self.close)
+
+    def close(self):
+        self._stop.set()
+        try:
+            self.write()
+        except Exception as e:
+            logger.error(f"Final snapshot write failed: {e}")
+
+    def stats(self):
+        return {
+            'path': self.path,
+            'loaded_sections': self.snapshot.sections() if self.snapshot is not None else [],
+            'writes': self.writes,
+            'last_write_ms': self.last_write_ms
+        }
@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+LUA Assistant - Sparse Text Indexes
+Precomputed sparse vectors so matching scores every stored row at once
+"""
+
+import math
+import re
+import threading
+
+import numpy as np
+
+# Same tokenisation TfidfVectorizer uses by default
+TOKEN_PATTERN = re.compile(r'(?u)\b\w\w+\b')
+
+# scipy.sparse and sklearn take over a second to import between them, so they
+# load on first use (or from preload()) rather than when the server starts
+_stop_words = None
+
+
+def stop_words():
+    global _stop_words
+    if _stop_words is None:
+        from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS
+        _stop_words = ENGLISH_STOP_WORDS
+    return _stop_words
+
+
+def preload():
+    """Import the deferred dependencies now, e.g. from a warm-up thread"""
+    stop_words()
+    from scipy import sparse  # noqa: F401
+
+
+class SparseRowIndex:
+    """Growable CSR matrix of L2-normalised rows over an incremental vocabulary"""
+
+    def __init__(self, initial_capacity=64):
+        self.vocabulary = {}
+        self.n_rows = 0
+        self._nnz = 0
+        self._indptr = np.zeros(initial_capacity + 1, dtype=np.int32)
+        self._indices = np.empty(initial_capacity * 4, dtype=np.int32)
+        self._data = np.empty(initial_capacity * 4, dtype=np.float32)
+        self._matrix = None
+        self._lock = threading.RLock()
+
+    def features(self, text):
+        """Return the list of features for a text (implemented by subclasses)"""
+        raise NotImplementedError
+
+    def _vectorize(self, text, grow=False):
+        """Return (columns, values) of the normalised feature vector for text"""
+        counts = {}
+        for feature in self.features(text):
+            counts[feature] = counts.get(feature, 0) + 1
+
+        if not counts:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32)
+
+        # Unknown features still count towards the norm so cosine stays exact
+        norm = math.sqrt(sum(count * count for count in counts.values()))
+        columns = []
+        values = []
+        for feature, count in counts.items():
+            column = self.vocabulary.get(feature)
+            if column is None:
+                if not grow:
+                    continue
+                column = len(self.vocabulary)
+                self.vocabulary[feature] = column
+            columns.append(column)
+            values.append(count / norm)
+
+        return np.array(columns, dtype=np.int32), np.array(values, dtype=np.float32)
+
+    def _reserve(self, extra_nnz):
+        """Grow the backing buffers for one more row"""
+        if self.n_rows + 2 > len(self._indptr):
+            indptr = np.zeros(len(self._indptr) * 2, dtype=np.int32)
+            indptr[:self.n_rows + 1] = self._indptr[:self.n_rows + 1]
+            self._indptr = indptr
+
+        needed = self._nnz + extra_nnz
+        if needed > len(self._indices):
+            capacity = max(needed, len(self._indices) * 2)
+            indices = np.empty(capacity, dtype=np.int32)
+            data = np.empty(capacity, dtype=np.float32)
+            indices[:self._nnz] = self._indices[:self._nnz]
+            data[:self._nnz] = self._data[:self._nnz]
+            self._indices = indices
+            self._data = data
+
+    def add_row(self, text):
+        """Append the vector for text and return its row number"""
+        with self._lock:
+            columns, values = self._vectorize(text, grow=True)
+            self._reserve(len(columns))
+
+            start = self._nnz
+            self._indices[start:start + len(columns)] = columns
+            self._data[start:start + len(values)] = values
+            self._nnz += len(columns)
+            self.n_rows += 1
+            self._indptr[self.n_rows] = self._nnz
+            self._matrix = None
+
+            return self.n_rows - 1
+
+    def matrix(self):
+        """Return the rows as a CSR matrix (views the buffers, no copy)"""
+        from scipy import sparse
+
+        with self._lock:
+            if self._matrix is None:
+                self._matrix = sparse.csr_matrix(
+                    (
+                        self._data[:self._nnz],
+                        self._indices[:self._nnz],
+                        self._indptr[:self.n_rows + 1]
+                    ),
+                    shape=(self.n_rows, len(self.vocabulary)),
+                    copy=False
+                )
+            return self._matrix
+
+    def score(self, text):
+        """Cosine similarity of text against every row in one sparse product"""
+        with self._lock:
+            matrix = self.matrix()
+            columns, values = self._vectorize(text)
+
+        if matrix.shape[0] == 0 or len(columns) == 0:
+            return np.zeros(matrix.shape[0], dtype=np.float32)
+
+        query = np.zeros(matrix.shape[1], dtype=np.float32)
+        query[columns] = values
+        return matrix.dot(query)
+
+    def score_batch(self, texts):
+        """Cosine similarity of many texts against every row, shape (texts, rows)"""
+        with self._lock:
+            matrix = self.matrix()
+            indptr = [0]
+            indices = []
+            data = []
+            for text in texts:
+                columns, values = self._vectorize(text)
+                indices.append(columns)
+                data.append(values)
+                indptr.append(indptr[-1] + len(columns))
+
+        if matrix.shape[0] == 0 or not texts:
+            return np.zeros((len(texts), matrix.shape[0]), dtype=np.float32)
+
+        from scipy import sparse
+        queries = sparse.csr_matrix(
+            (
+                np.concatenate(data) if data else np.empty(0, dtype=np.float32),
+                np.concatenate(indices) if indices else np.empty(0, dtype=np.int32),
+                np.array(indptr, dtype=np.int32)
+            ),
+            shape=(len(texts), matrix.shape[1])
+        )
+        return np.asarray(queries.dot(matrix.T).todense())
+
+
+class LearnedPatternIndex(SparseRowIndex):
+    """Per-user learned patterns scored against an utterance in one pass"""
+
+    def __init__(self, initial_capacity=64):
+        super().__init__(initial_capacity)
+        self.entries = []
+        self._rows = {}
+        self._confidence = np.zeros(initial_capacity, dtype=np.float32)
+
+    def features(self, text):
+        excluded = stop_words()
+        return [
+            token for token in TOKEN_PATTERN.findall(text.lower())
+            if token not in excluded
+        ]
+
+    def __len__(self):
+        return len(self.entries)
+
+    def upsert(self, pattern, action, confidence):
+        """Add a pattern or update the confidence of an existing one"""
+        with self._lock:
+            key = (pattern, action)
+            row = self._rows.get(key)
+
+            if row is None:
+                row = self.add_row(pattern)
+                self._rows[key] = row
+                self.entries.append({
+                    'pattern': pattern,
+                    'action': action,
+                    'confidence': confidence
+                })
+                if row >= len(self._confidence):
+                    grown = np.zeros(len(self._confidence) * 2, dtype=np.float32)
+                    grown[:len(self._confidence)] = self._confidence
+                    self._confidence = grown
+            else:
+                self.entries[row]['confidence'] = confidence
+
+            self._confidence[row] = confidence
+
+    def best_match(self, text, threshold=0.8, min_confidence=0.5, actions=None):
+        """Return the most similar confident pattern above threshold, if any"""
+        return self.best_matches([text], threshold, min_confidence, actions)[0]
+
+    def best_matches(self, texts, threshold=0.8, min_confidence=0.5, actions=None):
+        """best_match for many texts, scored with one sparse matrix product"""
+        with self._lock:
+            if self.n_rows == 0:
+                return [None] * len(texts)
+            if len(texts) == 1:
+                scores = self.score(texts[0])[np.newaxis, :]
+            else:
+                scores = self.score_batch(texts)
+            confidence = self._confidence[:scores.shape[1]].copy()
+            entries = list(self.entries)
+
+        scores = np.where(confidence > min_confidence, scores, 0.0)
+        matches = []
+        for row_scores in scores:
+            match = None
+            candidates = np.flatnonzero(row_scores > threshold)
+            for row in candidates[np.argsort(row_scores[candidates])[::-1]]:
+                entry = entries[row]
+                if actions is None or entry['action'] in actions:
+                    match = entry
+                    break
+            matches.append(match)
+
+        return matches
+
+
+class AppNameIndex(SparseRowIndex):
+    """Character n-gram index over app names for typo-tolerant lookup"""
+
+    def __init__(self, apps=None, ngram=3, initial_capacity=64):
+        super().__init__(initial_capacity)
+        self.ngram = ngram
+        self.names = []
+        self.packages = {}
+        for app_name, package in (apps or {}).items():
+            self.add(app_name, package)
+
+    def features(self, text):
+        # Spaces are dropped so "insta gram" and "instagram" share n-grams
+        compact = '#' + re.sub(r'[^a-z0-9]', '', text.lower()) + '#'
+        if len(compact) <= 2:
+            return []
+        return [compact[i:i + self.ngram] for i in range(max(len(compact) - self.ngram + 1, 1))]
+
+    def add(self, app_name, package):
+        """Register an app at runtime; existing names just get the new package"""
+        app_name = app_name.lower().strip()
+        with self._lock:
+            if app_name not in self.packages:
+                self.add_row(app_name)
+                self.names.append(app_name)
+            self.packages[app_name] = package
+
+    def _spans(self, text, max_words):
+        """Candidate substrings: every run of up to max_words adjacent words"""
+        words = text.lower().split()
+        spans = []
+        for size in range(1, max_words + 1):
+            for start in range(len(words) - size + 1):
+                spans.append(' '.join(words[start:start + size]))
+        return spans or [text]
+
+    def match(self, text, threshold=0.5, limit=5, max_words=2):
+        """Return up to limit (app_name, score) candidates ranked by similarity"""
+        with self._lock:
+            names = list(self.names)
+            scores = self.score_batch(self._spans(text, max_words))
+
+        if scores.size == 0:
+            return []
+
+        # Best span per app, all apps scored in one pass
+        best = scores.max(axis=0)
+        ranked = np.argsort(best)[::-1][:limit]
+        return [(names[i], float(best[i])) for i in ranked if best[i] > threshold]
+
+    def best_match(self, text, threshold=0.5, max_words=2):
+        """Return the best matching app name above threshold, if any"""
+        candidates = self.match(text, threshold=threshold, limit=1, max_words=max_words)
+        return candidates[0][0] if candidates else None
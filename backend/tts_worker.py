@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+LUA Assistant - TTS Worker
+One thread owns the pyttsx3 engine and renders queued text to WAV bytes
+"""
+
+import atexit
+import logging
+import os
+import queue
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import Future, TimeoutError as FuturesTimeout
+
+from speech_cache import make_key
+
+logger = logging.getLogger(__name__)
+
+ENGINE_START_TIMEOUT = 10.0
+
+
+class TTSBusy(RuntimeError):
+    """The synthesis queue is full"""
+
+
+def render_directory():
+    """Prefer a RAM-backed directory so rendered audio never touches disk"""
+    configured = os.getenv('LUA_TTS_TMPDIR')
+    if configured:
+        return configured
+    if os.path.isdir('/dev/shm') and os.access('/dev/shm', os.W_OK):
+        return '/dev/shm'
+    return tempfile.gettempdir()
+
+
+class TTSWorker:
+    """Serializes synthesis through a single engine owned by a worker thread
+
+    pyttsx3 engines are not thread-safe and drivers bind to the thread that
+    created them, so the engine is created, configured and used only inside
+    the worker. Voice, rate and volume are resolved once at startup.
+    """
+
+    def __init__(self, rate=150, volume=0.8, voice_keywords=('female', 'woman'),
+                 max_queue=None, engine_factory=None, name='tts', cache=None):
+        self.rate = rate
+        self.volume = volume
+        self.voice_keywords = voice_keywords
+        self.max_queue = max_queue or int(os.getenv('LUA_TTS_QUEUE_SIZE', 64))
+        self.engine_factory = engine_factory
+        self.name = name
+        self.directory = render_directory()
+        # Rendered replies are reused from here instead of synthesized again
+        self.cache = cache
+
+        self.voice = None
+        self.rendered = 0
+        self.failed = 0
+        self.rejected = 0
+
+        self._jobs = queue.Queue(maxsize=self.max_queue)
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._configured = threading.Event()
+        self._closed = False
+        atexit.register(self.close)
+
+    def start(self):
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+
+    def _create_engine(self):
+        if self.engine_factory is not None:
+            return self.engine_factory()
+        import pyttsx3
+        return pyttsx3.init()
+
+    def _configure(self, engine):
+        """Pick the voice once; requests never touch engine properties"""
+        voices = engine.getProperty('voices') or []
+        for voice in voices:
+            if any(keyword in (voice.name or '').lower() for keyword in self.voice_keywords):
+                engine.setProperty('voice', voice.id)
+                self.voice = voice.id
+                break
+        engine.setProperty('rate', self.rate)
+        engine.setProperty('volume', self.volume)
+
+    def _render(self, engine, text):
+        path = os.path.join(self.directory, f'lua-tts-{uuid.uuid4().hex}.wav')
+        try:
+            engine.save_to_file(text, path)
+            engine.runAndWait()
+            with open(path, 'rb') as f:
+                return f.read()
+        finally:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+
+    def _run(self):
+        try:
+            engine = self._create_engine()
+            self._configure(engine)
+        except Exception as e:
+            logger.error(f"TTS engine unavailable: {e}")
+            engine = None
+        self._configured.set()
+
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                break
+            text, key, future = job
+            if not future.set_running_or_notify_cancel():
+                continue
+
+            try:
+                if engine is None:
+                    raise RuntimeError("TTS engine unavailable")
+                started = time.monotonic()
+                audio = self._render(engine, text)
+                self.rendered += 1
+                logger.debug(f"Rendered {len(audio)} bytes in {time.monotonic() - started:.2f}s")
+                future.set_result(audio)
+                if key is not None:
+                    self._store(key, audio)
+            except Exception as e:
+                self.failed += 1
+                future.set_exception(e)
+
+    def _store(self, key, audio):
+        try:
+            self.cache.put(key, audio)
+        except OSError as e:
+            logger.warning(f"Speech cache write failed: {e}")
+
+    def cache_key(self, text):
+        """Key on the resolved voice, so it waits for the engine to be configured once"""
+        if not self._configured.wait(ENGINE_START_TIMEOUT):
+            raise TTSBusy("Speech engine is still starting")
+        return make_key('pyttsx3', self.voice, self.rate, text, volume=self.volume)
+
+    def submit(self, text):
+        """Queue text for synthesis and return a Future of the WAV bytes"""
+        if self._closed:
+            raise RuntimeError("TTS worker is closed")
+        self.start()
+
+        future = Future()
+        key = None
+        if self.cache is not None:
+            key = self.cache_key(text)
+            audio = self.cache.get(key)
+            if audio is not None:
+                future.set_result(audio)
+                return future
+
+        try:
+            self._jobs.put_nowait((text, key, future))
+        except queue.Full:
+            self.rejected += 1
+            raise TTSBusy("Speech synthesis queue is full")
+        return future
+
+    def synthesize(self, text, timeout=None):
+        """Render text and wait for the WAV bytes"""
+        future = self.submit(text)
+        try:
+            return future.result(timeout=timeout)
+        except FuturesTimeout:
+            # Skip the render if the worker has not reached it yet
+            future.cancel()
+            raise
+
+    def close(self, timeout=5.0):
+        """Finish queued jobs and stop the worker thread"""
+        if self._closed:
+            return
+        self._closed = True
+        if self._thread is not None:
+            try:
+                self._jobs.put(None, timeout=timeout)
+            except queue.Full:
+                return
+            self._thread.join(timeout)
+
+    def stats(self):
+        return {
+            'queued': self._jobs.qsize(),
+            'rendered': self.rendered,
+            'failed': self.failed,
+            'rejected': self.rejected,
+            'voice': self.voice,
+            'cache': self.cache.stats() if self.cache is not None else None
+        }
+
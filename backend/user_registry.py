@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+"""
+LUA Assistant - User Registry
+Seen-user membership from a Bloom filter and a recent-user LRU, confirmed against the database
+"""
+
+import hashlib
+import json
+import logging
+import math
+import os
+import struct
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+logger = logging.getLogger(__name__)
+
+BLOOM_HEADER = struct.Struct('<QIQ')
+LEGACY_JSON_PATH = '/tmp/lua_seen_users.json'
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter with double hashing over one blake2b digest"""
+
+    def __init__(self, capacity, error_rate=0.01, num_bits=None, num_hashes=None, bits=None, count=0):
+        self.capacity = capacity
+        self.num_bits = num_bits or max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.num_hashes = num_hashes or max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bits if bits is not None else bytearray((self.num_bits + 7) // 8)
+        self.count = count
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1, h2 = struct.unpack('<QQ', digest)
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add(self, item):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+    def to_bytes(self):
+        return BLOOM_HEADER.pack(self.num_bits, self.num_hashes, self.count) + bytes(self.bits)
+
+    @classmethod
+    def from_bytes(cls, data, capacity):
+        num_bits, num_hashes, count = BLOOM_HEADER.unpack_from(data, 0)
+        bits = bytearray(data[BLOOM_HEADER.size:])
+        if len(bits) != (num_bits + 7) // 8:
+            raise ValueError("Truncated Bloom filter")
+        return cls(capacity, num_bits=num_bits, num_hashes=num_hashes, bits=bits, count=count)
+
+
+class UserLog:
+    """Append-only file of user IDs, one JSON string per line
+
+    Used when there is no database. New users are appended instead of
+    rewriting the whole file; compact() drops duplicate and torn lines.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def identity(self):
+        """(inode, size) of the log; compaction replaces the inode"""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None, 0
+        return stat.st_ino, stat.st_size
+
+    def append(self, user_id):
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(user_id) + '\n')
+
+    def read(self, offset=0):
+        """Yield user IDs written at or after offset"""
+        try:
+            with open(self.path, 'rb') as f:
+                f.seek(offset)
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        try:
+                            yield json.loads(line)
+                        except ValueError:
+                            # A torn final line from a crash mid-append
+                            continue
+        except FileNotFoundError:
+            return
+
+    def compact(self, user_ids=None):
+        """Rewrite the log with each ID once, atomically; returns the bytes saved
+
+        Without user_ids the log itself is read, under the lock so that no
+        append lands between the read and the rewrite.
+        """
+        directory = os.path.dirname(os.path.abspath(self.path))
+        with self._lock:
+            _, size = self.identity()
+            if user_ids is None:
+                user_ids = dict.fromkeys(self.read())
+            compacted = sum(len(json.dumps(user_id)) + 1 for user_id in user_ids)
+            if compacted >= size:
+                return 0
+            fd, temp_path = tempfile.mkstemp(prefix='.users-', dir=directory)
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    f.writelines(json.dumps(user_id) + '\n' for user_id in user_ids)
+                os.replace(temp_path, self.path)
+            except BaseException:
+                try:
+                    os.unlink(temp_path)
+                except OSError:
+                    pass
+                raise
+            return size - compacted
+
+    def migrate_json(self, json_path):
+        """Convert the old whole-file JSON list into the log, once"""
+        if os.path.exists(self.path) or not os.path.exists(json_path):
+            return
+        try:
+            with open(json_path, 'r') as f:
+                user_ids = json.load(f)
+            self.compact(dict.fromkeys(user_ids))
+            os.unlink(json_path)
+            logger.info(f"Migrated {len(user_ids)} seen users to {self.path}")
+        except (OSError, ValueError) as e:
+            logger.error(f"Seen users migration failed: {e}")
+
+
+class UserRegistry:
+    """Whether a user has been seen, without holding every user ID in memory
+
+    Lookups check a bounded LRU of recent users, then the Bloom filter. A
+    negative is definite. A possible positive is confirmed with a primary key
+    lookup on the primary when a database is connected; in file mode the
+    filter's answer stands, so a small fraction of new users may miss the
+    welcome message. The file-mode log is compacted every compact_every
+    appends, in the background.
+
+    The filter is restored from the state snapshot and topped up with the
+    users added since it was dumped, so startup only rebuilds it in full when
+    there is no usable snapshot.
+    """
+
+    def __init__(self, db_client=None, log_path=None, snapshot=None,
+                 capacity=None, error_rate=None, cache_size=None, compact_every=None):
+        self.db_client = db_client
+        self.capacity = capacity or int(os.getenv('LUA_SEEN_USERS_CAPACITY', 100000))
+        self.error_rate = error_rate or float(os.getenv('LUA_SEEN_USERS_ERROR_RATE', 0.01))
+        self.cache_size = cache_size or int(os.getenv('LUA_SEEN_USERS_CACHE', 10000))
+        self.compact_every = compact_every or int(os.getenv('LUA_SEEN_USERS_COMPACT_EVERY', 10000))
+        self.log = None
+        if db_client is None:
+            self.log = UserLog(log_path or os.getenv('LUA_SEEN_USERS_LOG', '/tmp/lua_seen_users.log'))
+
+        self._recent = OrderedDict()
+        self._lock = threading.Lock()
+        self._appended = 0
+        self._compactor = None
+
+        self.cache_hits = 0
+        self.definite_misses = 0
+        self.db_lookups = 0
+        self.false_positives = 0
+        self.compactions = 0
+        self.restored_from = None
+
+        self.bloom = self._load(snapshot.section('seen_users') if snapshot else None)
+        if snapshot is not None:
+            snapshot.register('seen_users', self.snapshot_items)
+
+    def _new_filter(self):
+        return BloomFilter(self.capacity, self.error_rate)
+
+    def _load(self, section):
+        if self.log is not None:
+            self.log.migrate_json(LEGACY_JSON_PATH)
+
+        started = time.monotonic()
+        bloom = self._restore(section) if section is not None else None
+        if bloom is None:
+            bloom = self._rebuild()
+        logger.info(f"Seen-user filter from {self.restored_from} with {bloom.count} users "
+                    f"in {(time.monotonic() - started) * 1000:.0f}ms")
+        return bloom
+
+    def _restore(self, section):
+        """Filter from the snapshot plus users added after it was dumped, or None"""
+        try:
+            state = json.loads(bytes(section.get('state', b'{}')))
+            bloom = BloomFilter.from_bytes(section.get('bloom'), self.capacity)
+        except (TypeError, ValueError, struct.error):
+            return None
+        if bloom.num_bits != self._new_filter().num_bits:
+            # Capacity or error rate changed; the old filter no longer fits
+            return None
+
+        if self.log is not None:
+            inode, size = self.log.identity()
+            if inode != state.get('log_inode') or size < state.get('log_offset', 0):
+                return None
+            for user_id in self.log.read(state['log_offset']):
+                bloom.add(user_id)
+        elif self.db_client is not None:
+            # first_seen is stored in UTC at one-second resolution
+            since = datetime.fromtimestamp(state.get('dumped_at', 0) - 5, timezone.utc)
+            try:
+                result = self._primary().execute(
+                    "SELECT id FROM users WHERE first_seen >= ?",
+                    [since.strftime('%Y-%m-%d %H:%M:%S')]
+                )
+            except Exception as e:
+                logger.error(f"Seen users catch-up failed: {e}")
+                return None
+            for row in result.rows:
+                bloom.add(row[0])
+
+        self.restored_from = 'snapshot'
+        return bloom
+
+    def _primary(self):
+        """The primary behind an embedded replica, whose local copy may lag the snapshot"""
+        return getattr(self.db_client, 'primary', self.db_client)
+
+    def _rebuild(self):
+        """Full pass over the source of truth; compacts the log on the way"""
+        bloom = self._new_filter()
+        try:
+            if self.db_client is not None:
+                result = self._primary().execute("SELECT id FROM users")
+                for row in result.rows:
+                    bloom.add(row[0])
+                self.restored_from = 'database'
+            elif self.log is not None:
+                user_ids = dict.fromkeys(self.log.read())
+                for user_id in user_ids:
+                    bloom.add(user_id)
+                self.log.compact(user_ids)
+                self.restored_from = 'log'
+        except Exception as e:
+            logger.error(f"Error loading seen users: {e}")
+        if bloom.count > self.capacity:
+            logger.warning(f"{bloom.count} seen users exceed the filter capacity of {self.capacity}; "
+                           "raise LUA_SEEN_USERS_CAPACITY")
+        return bloom
+
+    def _remember(self, user_id):
+        """Record a confirmed user in the LRU; caller holds the lock"""
+        self._recent[user_id] = True
+        self._recent.move_to_end(user_id)
+        if len(self._recent) > self.cache_size:
+            self._recent.popitem(last=False)
+
+    def __contains__(self, user_id):
+        with self._lock:
+            if user_id in self._recent:
+                self._recent.move_to_end(user_id)
+                self.cache_hits += 1
+                return True
+            if user_id not in self.bloom:
+                self.definite_misses += 1
+                return False
+            if self.db_client is None:
+                self._remember(user_id)
+                return True
+            self.db_lookups += 1
+
+        try:
+            # A replica may not have the users row yet and would turn a returning user into a new one
+            result = self._primary().execute("SELECT 1 FROM users WHERE id = ?", [user_id])
+            found = bool(result.rows)
+        except Exception as e:
+            logger.error(f"Seen user lookup failed: {e}")
+            # Trust the filter rather than greet a returning user again
+            return True
+
+        with self._lock:
+            if found:
+                self._remember(user_id)
+            else:
+                self.false_positives += 1
+        return found
+
+    def add(self, user_id):
+        """Record a new user; in file mode this also appends to the log"""
+        with self._lock:
+            if user_id in self._recent:
+                return
+            self.bloom.add(user_id)
+            self._remember(user_id)
+        if self.log is not None:
+            try:
+                self.log.append(user_id)
+            except OSError as e:
+                logger.error(f"Error saving user: {e}")
+                return
+            with self._lock:
+                self._appended += 1
+                if self._appended < self.compact_every or self._compactor is not None:
+                    return
+                self._appended = 0
+                compactor = self._compactor = threading.Thread(
+                    target=self.compact, name='seen-users-compact', daemon=True
+                )
+            compactor.start()
+
+    def compact(self):
+        """Drop duplicate lines from the file-mode log"""
+        try:
+            saved = self.log.compact()
+            if saved:
+                self.compactions += 1
+                logger.info(f"Compacted seen users log, {saved} bytes saved")
+        except Exception as e:
+            logger.error(f"Seen users log compaction failed: {e}")
+        finally:
+            with self._lock:
+                self._compactor = None
+
+    def __len__(self):
+        """Users added to the filter; approximate if the log held duplicates"""
+        return self.bloom.count
+
+    def snapshot_items(self):
+        with self._lock:
+            bloom = self.bloom.to_bytes()
+            state = {'dumped_at': time.time()}
+            if self.log is not None:
+                state['log_inode'], state['log_offset'] = self.log.identity()
+        return {'bloom': bloom, 'state': json.dumps(state).encode('utf-8')}
+
+    def stats(self):
+        with self._lock:
+            return {
+                'users': self.bloom.count,
+                'capacity': self.capacity,
+                'filter_bytes': len(self.bloom.bits),
+                'recent': len(self._recent),
+                'cache_hits': self.cache_hits,
+                'definite_misses': self.definite_misses,
+                'db_lookups': self.db_lookups,
+                'false_positives': self.false_positives,
+                'compactions': self.compactions,
+                'restored_from': self.restored_from
+            }
@@ -6,43 +6,59 @@ Free voice cloning using Coqui TTS
 
 import os
 import io
+import tempfile
 import wave
 import logging
+import threading
 from typing import Dict, Optional
 import numpy as np
+from speech_cache import default_speech_cache, make_key, file_digest
 
 logger = logging.getLogger(__name__)
 
 class VoiceCloner:
     def __init__(self):
-        self.tts = None
+        self._tts = None
+        self._tts_loaded = False
+        self._tts_lock = threading.Lock()
         self.voice_models = {}
         self.current_voice = 'default'
-        self.setup_tts()
+        self.model_name = "tts_models/en/ljspeech/tacotron2-DDC"
+        self.speech_cache = default_speech_cache()
+        
+        # Available models
+        self.available_models = {
+            'english': 'tts_models/en/ljspeech/tacotron2-DDC',
+            'multilingual': 'tts_models/multilingual/multi-dataset/your_tts',
+            'fast': 'tts_models/en/ljspeech/fast_pitch'
+        }
+    
+    @property
+    def tts(self):
+        """Default model, loaded on first use instead of at construction"""
+        if not self._tts_loaded:
+            with self._tts_lock:
+                if not self._tts_loaded:
+                    self.setup_tts()
+        return self._tts
     
     def setup_tts(self):
         """Initialize TTS models"""
+        self._tts_loaded = True
         try:
             from TTS.api import TTS
             
             # Load default English model
-            self.tts = TTS("tts_models/en/ljspeech/tacotron2-DDC")
-            
-            # Available models
-            self.available_models = {
-                'english': 'tts_models/en/ljspeech/tacotron2-DDC',
-                'multilingual': 'tts_models/multilingual/multi-dataset/your_tts',
-                'fast': 'tts_models/en/ljspeech/fast_pitch'
-            }
+            self._tts = TTS(self.model_name)
             
             logger.info("Voice cloning initialized successfully")
             
         except ImportError:
             logger.error("Coqui TTS not installed. Run: pip install coqui-tts")
-            self.tts = None
+            self._tts = None
         except Exception as e:
             logger.error(f"TTS setup error: {e}")
-            self.tts = None
+            self._tts = None
     
     def clone_voice_from_sample(self, audio_file_path: str, user_id: str) -> Dict:
         """Clone voice from audio sample"""
@@ -68,10 +84,12 @@ class VoiceCloner:
             reference_path = f'{voice_dir}/reference.wav'
             self._convert_to_wav(audio_file_path, reference_path)
             
-            # Store voice reference
+            # Store voice reference; re-cloning changes the fingerprint and so the cache keys
             self.voice_models[user_id] = {
                 'reference_path': reference_path,
-                'model': self.voice_models['multilingual']
+                'model': self.voice_models['multilingual'],
+                'model_name': self.available_models['multilingual'],
+                'fingerprint': file_digest(reference_path)
             }
             
             return {
@@ -92,26 +110,53 @@ class VoiceCloner:
                        output_path: str = None) -> Dict:
         """Generate speech with cloned voice"""
         try:
-            if not self.tts:
+            if voice_id == 'default' or voice_id not in self.voice_models:
+                voice_data = None
+                key = make_key(self.model_name, 'default', None, text)
+            else:
+                voice_data = self.voice_models[voice_id]
+                key = make_key(voice_data['model_name'], voice_data['fingerprint'], None, text)
+            
+            # The caller owns the returned file, so cache eviction can't delete it
+            created = not output_path
+            if created:
+                fd, output_path = tempfile.mkstemp(prefix=f'speech_{voice_id}_', suffix='.wav')
+                os.close(fd)
+            
+            if self.speech_cache.export(key, output_path):
                 return {
-                    'success': False,
-                    'error': 'TTS not initialized'
+                    'success': True,
+                    'audio_path': output_path,
+                    'text': text,
+                    'voice_id': voice_id,
+                    'cached': True,
+                    'message': 'Speech generated successfully'
                 }
             
-            if not output_path:
-                output_path = f'/tmp/speech_{voice_id}_{hash(text)}.wav'
+            try:
+                # Only a cache miss on the default voice needs the model loaded
+                if voice_data is None and not self.tts:
+                    raise RuntimeError('TTS not initialized')
+                
+                if voice_data is None:
+                    # Use default voice
+                    self.tts.tts_to_file(text=text, file_path=output_path)
+                else:
+                    # Use cloned voice
+                    voice_data['model'].tts_to_file(
+                        text=text,
+                        file_path=output_path,
+                        speaker_wav=voice_data['reference_path']
+                    )
+            except Exception:
+                if created and os.path.exists(output_path):
+                    os.unlink(output_path)
+                raise
             
-            if voice_id == 'default' or voice_id not in self.voice_models:
-                # Use default voice
-                self.tts.tts_to_file(text=text, file_path=output_path)
-            else:
-                # Use cloned voice
-                voice_data = self.voice_models[voice_id]
-                voice_data['model'].tts_to_file(
-                    text=text,
-                    file_path=output_path,
-                    speaker_wav=voice_data['reference_path']
-                )
+            try:
+                self.speech_cache.put_file(key, output_path)
+            except OSError as e:
+                logger.warning(f"Speech cache write failed: {e}")
             
             return {
                 'success': True,
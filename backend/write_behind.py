@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+LUA Assistant - Write-Behind Queue
+Request threads enqueue rows; a background writer flushes them in batches
+"""
+
+import atexit
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindQueue:
+    """Bounded queue drained by one writer thread with group commit"""
+
+    OVERFLOW_POLICIES = ('drop_oldest', 'drop_newest', 'block')
+
+    def __init__(self, flush, max_size=None, batch_size=None, flush_interval_ms=None,
+                 overflow=None, block_timeout=0.5, name='write-behind', on_drop=None):
+        # flush(rows) must write the whole batch in one transaction
+        self.flush = flush
+        # on_drop(row) is called for every row shed by the overflow policy or after close
+        self.on_drop = on_drop
+        self.max_size = max_size or int(os.getenv('LUA_LOG_QUEUE_SIZE', 10000))
+        self.batch_size = batch_size or int(os.getenv('LUA_LOG_BATCH_SIZE', 200))
+        self.flush_interval = (flush_interval_ms or int(os.getenv('LUA_LOG_FLUSH_MS', 50))) / 1000.0
+        self.overflow = overflow or os.getenv('LUA_LOG_OVERFLOW', 'drop_oldest')
+        self.block_timeout = block_timeout
+
+        if self.overflow not in self.OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {self.overflow}")
+
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.batches = 0
+
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def put(self, row):
+        """Enqueue one row; returns False if it was dropped"""
+        dropped = None
+        try:
+            with self._cond:
+                if self._closed:
+                    self.dropped += 1
+                    dropped = row
+                    return False
+
+                if len(self._queue) >= self.max_size:
+                    if self.overflow == 'block':
+                        # Backpressure: wait briefly for the writer, then shed load
+                        deadline = time.monotonic() + self.block_timeout
+                        while len(self._queue) >= self.max_size and not self._closed:
+                            remaining = deadline - time.monotonic()
+                            if remaining <= 0:
+                                break
+                            self._cond.wait(remaining)
+                        if len(self._queue) >= self.max_size or self._closed:
+                            self.dropped += 1
+                            dropped = row
+                            return False
+                    elif self.overflow == 'drop_newest':
+                        self.dropped += 1
+                        dropped = row
+                        return False
+                    else:
+                        dropped = self._queue.popleft()
+                        self.dropped += 1
+
+                self._queue.append(row)
+                self.enqueued += 1
+                if len(self._queue) == 1 or len(self._queue) >= self.batch_size:
+                    self._cond.notify_all()
+                return True
+        finally:
+            # Outside the lock, so the callback may take locks of its own
+            if dropped is not None and self.on_drop is not None:
+                self.on_drop(dropped)
+
+    def put_many(self, rows):
+        """Enqueue several rows; returns how many were accepted"""
+        return sum(1 for row in rows if self.put(row))
+
+    def _next_batch(self):
+        """Wait for a full batch or the flush interval; None once closed and drained"""
+        with self._cond:
+            while not self._queue and not self._closed:
+                self._cond.wait()
+
+            if not self._queue:
+                return None
+
+            deadline = time.monotonic() + self.flush_interval
+            while len(self._queue) < self.batch_size and not self._closed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            count = min(self.batch_size, len(self._queue))
+            batch = [self._queue.popleft() for _ in range(count)]
+            # Wake producers blocked on a full queue
+            self._cond.notify_all()
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+
+            try:
+                self.flush(batch)
+                self.written += len(batch)
+                self.batches += 1
+            except Exception as e:
+                self.failed += len(batch)
+                logger.error(f"Write-behind flush error ({len(batch)} rows lost): {e}")
+
+    def close(self, timeout=10.0):
+        """Stop accepting rows and wait for the writer to drain the queue"""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+
+    def stats(self):
+        """Return queue depth and writer counters"""
+        with self._cond:
+            return {
+                'pending': len(self._queue),
+                'enqueued': self.enqueued,
+                'written': self.written,
+                'dropped': self.dropped,
+                'failed': self.failed,
+                'batches': self.batches
+            }
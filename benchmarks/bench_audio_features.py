@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+LUA Assistant - Audio Feature Benchmark
+Emotion feature extraction: separate librosa calls versus the shared-STFT tiers
+
+The baseline is the previous extractor (five librosa feature calls, each
+computing its own spectrogram, tempo from beat_track). Clips are synthetic
+voiced tones with an amplitude envelope and noise.
+
+    python benchmarks/bench_audio_features.py --seconds 3 --clips 20
+"""
+
+import statistics
+import sys
+import time
+
+import numpy as np
+
+import harness  # puts backend/ and the repository on sys.path
+from audio_features import extract_features
+
+
+def separate_calls(y, sample_rate):
+    """The previous extractor, with the tempo array unwrapped for librosa >= 0.10"""
+    import librosa
+
+    mfccs = librosa.feature.mfcc(y=y, sr=sample_rate, n_mfcc=13)
+    centroid = librosa.feature.spectral_centroid(y=y, sr=sample_rate)
+    zcr = librosa.feature.zero_crossing_rate(y)
+    chroma = librosa.feature.chroma_stft(y=y, sr=sample_rate)
+    tempo, _ = librosa.beat.beat_track(y=y, sr=sample_rate)
+    return np.concatenate([
+        np.mean(mfccs, axis=1),
+        [np.mean(centroid), np.mean(zcr), float(np.atleast_1d(tempo)[0])],
+        np.mean(chroma, axis=1)
+    ])
+
+
+def make_clip(rng, seconds, sample_rate):
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    pitch = rng.uniform(100, 300)
+    envelope = 1 + np.sin(2 * np.pi * rng.uniform(1, 4) * t)
+    voice = sum(np.sin(2 * np.pi * pitch * k * t) / k for k in range(1, 6))
+    return (0.2 * envelope * voice + 0.02 * rng.standard_normal(len(t))).astype(np.float32)
+
+
+def run(label, clips, extract):
+    extract(clips[0])  # warm caches and numba
+    samples = []
+    results = []
+    for clip in clips:
+        started = time.perf_counter()
+        results.append(extract(clip))
+        samples.append(time.perf_counter() - started)
+    print(f"{label:<16} median {statistics.median(samples) * 1000:7.2f} ms")
+    return statistics.median(samples), np.array(results)
+
+
+def add_arguments(parser):
+    parser.add_argument('--seconds', type=float, default=3.0)
+    parser.add_argument('--clips', type=int, default=20)
+    parser.add_argument('--sample-rate', type=int, default=22050)
+
+
+def main(args):
+    rng = np.random.default_rng(0)
+    clips = [make_clip(rng, args.seconds, args.sample_rate) for _ in range(args.clips)]
+
+    baseline, expected = run('separate calls', clips, lambda y: separate_calls(y, args.sample_rate))
+    full, full_features = run('shared, full', clips, lambda y: extract_features(y, args.sample_rate, 'full'))
+    fast, fast_features = run('shared, fast', clips, lambda y: extract_features(y, args.sample_rate, 'fast'))
+
+    scale = np.abs(expected) + 1e-6
+    print(f"full: {baseline / full:.1f}x, max relative difference {np.max(np.abs(full_features - expected) / scale):.1e}")
+    chroma = slice(16, 28)
+    print(f"fast: {baseline / fast:.1f}x, max relative difference outside tempo/chroma "
+          f"{np.max((np.abs(fast_features - expected) / scale)[:, :15]):.1e}, "
+          f"max chroma difference {np.max(np.abs(fast_features - expected)[:, chroma]):.3f}")
+
+
+if __name__ == '__main__':
+    harness.run(sys.modules[__name__])
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+LUA Assistant - Database Throughput Benchmark
+Commands/sec for connect-per-call SQLite access versus the pooled LuaDatabase
+
+Each simulated command does what /api/process_voice does: update the learned
+pattern and log the command, from several Flask-like worker threads at once.
+
+    python benchmarks/bench_db_throughput.py --threads 8 --commands 500
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+import harness  # puts backend/ and the repository on sys.path
+from database.lua_db import LuaDatabase
+
+
+def naive_command(db_path, user_id, text):
+    """The previous app.py behaviour: a fresh connection per statement group"""
+    conn = sqlite3.connect(db_path, timeout=30)
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT id, confidence FROM learning_patterns
+        WHERE user_id = ? AND pattern = ? AND action = ?
+    ''', (user_id, text, 'open'))
+    existing = cursor.fetchone()
+    if existing:
+        cursor.execute('''
+            UPDATE learning_patterns
+            SET confidence = ?, last_used = CURRENT_TIMESTAMP
+            WHERE id = ?
+        ''', (min(existing[1] + 0.1, 1.0), existing[0]))
+    else:
+        cursor.execute('''
+            INSERT INTO learning_patterns (user_id, pattern, action, confidence)
+            VALUES (?, ?, ?, ?)
+        ''', (user_id, text, 'open', 0.6))
+    conn.commit()
+    conn.close()
+
+    conn = sqlite3.connect(db_path, timeout=30)
+    cursor = conn.cursor()
+    cursor.execute('''
+        INSERT INTO commands (user_id, command_text, intent, response, success)
+        VALUES (?, ?, ?, ?, ?)
+    ''', (user_id, text, 'open_app', 'Opening', True))
+    conn.commit()
+    conn.close()
+
+
+def pooled_command(db, user_id, text):
+    db.update_learning_pattern(user_id, text, 'open')
+    db.log_command(user_id, text, 'open_app', 'Opening', True)
+
+
+def run(label, threads, commands, worker):
+    def loop(thread_id):
+        for i in range(commands):
+            worker(f'user{thread_id}', f'open app {i % 50}')
+
+    workers = [threading.Thread(target=loop, args=(t,)) for t in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    total = threads * commands
+    print(f"{label:<28} {total:>7} commands  {elapsed:7.2f}s  {total / elapsed:9.1f} commands/sec")
+    return total / elapsed
+
+
+def add_arguments(parser):
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--commands', type=int, default=300, help='commands per thread')
+
+
+def main(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        # Baseline uses the old rollback-journal file, exactly as app.py did
+        before_path = os.path.join(tmp, 'before.db')
+        LuaDatabase(before_path).close()
+        conn = sqlite3.connect(before_path)
+        conn.execute("PRAGMA journal_mode=DELETE")
+        conn.close()
+        before = run('before (connect per call)', args.threads, args.commands,
+                     lambda user_id, text: naive_command(before_path, user_id, text))
+
+        db = LuaDatabase(os.path.join(tmp, 'after.db'))
+        after = run('after (pooled LuaDatabase)', args.threads, args.commands,
+                    lambda user_id, text: pooled_command(db, user_id, text))
+        db.close()
+
+    print(f"speedup: {after / before:.1f}x")
+
+
+if __name__ == '__main__':
+    harness.run(sys.modules[__name__])
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+LUA Assistant - Emotion Batch Benchmark
+Clips per second for a backlog of voice clips: one at a time versus the process pool
+
+    python benchmarks/bench_emotion_batch.py --clips 200 --workers 4
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+import harness  # puts backend/ and the repository on sys.path
+from emotion_batch import EmotionBatchProcessor
+from emotional_intelligence import EmotionalIntelligence
+
+
+def add_arguments(parser):
+    parser.add_argument('--clips', type=int, default=200)
+    parser.add_argument('--seconds', type=float, default=2.0, help='mean clip length')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--tier', choices=('fast', 'full'), default='full')
+    parser.add_argument('--sample-rate', type=int, default=22050)
+
+
+def main(args):
+    rng = np.random.default_rng(0)
+    clips = [
+        (0.1 * rng.standard_normal(int(rng.uniform(0.5, 1.5) * args.seconds * args.sample_rate))).astype(np.float32)
+        for _ in range(args.clips)
+    ]
+    texts = ['turn the volume up'] * args.clips
+    emotional_ai = EmotionalIntelligence()
+
+    serial = EmotionBatchProcessor(emotional_ai, workers=0, tier=args.tier)
+    serial.analyze(clips[:1], args.sample_rate)
+    started = time.perf_counter()
+    expected = [emotional_ai.classify_batch(
+        emotional_ai.extract_audio_features(clip, args.sample_rate, args.tier)[None], [text])[0]
+        for clip, text in zip(clips, texts)]
+    one_at_a_time = time.perf_counter() - started
+
+    pooled = EmotionBatchProcessor(emotional_ai, workers=args.workers, tier=args.tier)
+    pooled.warm()
+    started = time.perf_counter()
+    results = pooled.analyze(clips, args.sample_rate, texts)
+    batched = time.perf_counter() - started
+    pooled.close()
+
+    assert [result['emotion'] for result in results] == expected
+    print(f"one at a time        {args.clips / one_at_a_time:8.1f} clips/s")
+    print(f"pool, {args.workers:>2} workers     {args.clips / batched:8.1f} clips/s  "
+          f"({one_at_a_time / batched:.1f}x)")
+
+
+if __name__ == '__main__':
+    harness.run(sys.modules[__name__])
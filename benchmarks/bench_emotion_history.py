@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+LUA Assistant - Emotion History Benchmark
+Per-request cost and per-user size of emotion history: lists of dicts versus ring buffers
+
+One request records an emotion and reads the patterns, as /api/analyze_emotion does.
+
+    python benchmarks/bench_emotion_history.py --users 1000 --requests 200000
+"""
+
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import harness  # puts backend/ and the repository on sys.path
+from emotion_history import EmotionHistory
+from emotion_lexicon import EMOTIONS
+
+
+class ListHistory:
+    """The previous store_emotion_history / get_emotion_patterns"""
+
+    def __init__(self):
+        self.user_emotion_history = {}
+
+    def record(self, user_id, emotion):
+        if user_id not in self.user_emotion_history:
+            self.user_emotion_history[user_id] = []
+        self.user_emotion_history[user_id].append({'emotion': emotion, 'timestamp': datetime.now().isoformat()})
+        if len(self.user_emotion_history[user_id]) > 50:
+            self.user_emotion_history[user_id] = self.user_emotion_history[user_id][-50:]
+
+    def patterns(self, user_id):
+        emotions = [entry['emotion'] for entry in self.user_emotion_history[user_id]]
+        emotion_counts = {}
+        for emotion in emotions:
+            emotion_counts[emotion] = emotion_counts.get(emotion, 0) + 1
+        total = len(emotions)
+        return {
+            'emotion_distribution': {emotion: (count / total) * 100 for emotion, count in emotion_counts.items()},
+            'recent_trend': emotions[-1],
+            'total_interactions': total,
+            'dominant_emotion': max(emotion_counts.items(), key=lambda x: x[1])[0]
+        }
+
+
+def run(label, make_history, requests):
+    history = make_history()
+    started = time.perf_counter()
+    for user_id, emotion in requests:
+        history.record(user_id, emotion)
+        history.patterns(user_id)
+    elapsed = time.perf_counter() - started
+
+    # Measured separately; tracing slows the loop above
+    tracemalloc.start()
+    history = make_history()
+    for user_id, emotion in requests:
+        history.record(user_id, emotion)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return label, elapsed, size
+
+
+def add_arguments(parser):
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--requests', type=int, default=200000)
+
+
+def main(args):
+    random.seed(0)
+    requests = [(f'user{random.randrange(args.users)}', random.choice(EMOTIONS)) for _ in range(args.requests)]
+
+    for label, elapsed, size in (run('list of dicts', ListHistory, requests),
+                                 run('ring buffers', EmotionHistory, requests)):
+        print(f"{label:<14} {elapsed / args.requests * 1e6:6.2f} us/request  "
+              f"{size / args.users:8.0f} bytes/user in memory")
+
+
+if __name__ == '__main__':
+    harness.run(sys.modules[__name__])
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+LUA Assistant - Emotion Lexicon Benchmark
+Per-command cost of text emotion scoring: substring scans versus the token index
+
+    python benchmarks/bench_emotion_lexicon.py --texts 20000
+"""
+
+import random
+import sys
+import time
+
+import harness  # puts backend/ and the repository on sys.path
+from emotion_lexicon import EMOTION_LEXICON, emotion_lexicon
+
+COMMANDS = [
+    'open the camera', 'what is the weather like today', 'play some music please',
+    'call my sister', 'set a reminder for badminton at six', 'say goodbye to everyone',
+    "I'm so happy today", 'this is terrible and I hate it', "I'm worried about tomorrow's meeting",
+    'wow that is amazing', 'turn the volume down a bit', 'send a message to mum that I love her',
+]
+
+
+def substring_scores(text):
+    """The previous detect_emotion_from_text"""
+    text = text.lower()
+    emotion_scores = {}
+    for emotion, keywords in EMOTION_LEXICON:
+        score = sum(1 for keyword in keywords if keyword in text)
+        if score > 0:
+            emotion_scores[emotion] = score
+    if emotion_scores:
+        return max(emotion_scores.items(), key=lambda x: x[1])[0]
+    return 'neutral'
+
+
+def timed(label, texts, call):
+    started = time.perf_counter()
+    call(texts)
+    elapsed = time.perf_counter() - started
+    print(f"{label:<24} {elapsed / len(texts) * 1e6:6.2f} us/text")
+    return elapsed
+
+
+def add_arguments(parser):
+    parser.add_argument('--texts', type=int, default=20000)
+
+
+def main(args):
+    random.seed(0)
+    texts = [random.choice(COMMANDS) for _ in range(args.texts)]
+
+    timed('substring scans', texts, lambda batch: [substring_scores(text) for text in batch])
+    timed('token index', texts, lambda batch: [emotion_lexicon.detect(text) for text in batch])
+    timed('token index, batch', texts, lambda batch: emotion_lexicon.best(emotion_lexicon.score_batch(batch)))
+
+    changed = [(text, substring_scores(text), emotion_lexicon.detect(text))
+               for text in COMMANDS if substring_scores(text) != emotion_lexicon.detect(text)]
+    for text, before, after in changed:
+        print(f"  {text!r}: {before} -> {after}")
+
+
+if __name__ == '__main__':
+    harness.run(sys.modules[__name__])
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+LUA Assistant - Emotion Model Benchmark
+Holdout accuracy and inference latency of the NumPy emotion model against the keyword rules
+
+With --data, uses a labelled <emotion>/*.wav directory (see emotion_model.py).
+Without it, synthesizes clips whose pitch, loudness, modulation rate and
+noise vary by emotion, each with a short transcript that names the emotion
+only some of the time.
+
+    python benchmarks/bench_emotion_model.py --clips-per-emotion 60
+"""
+
+import statistics
+import sys
+import time
+
+import numpy as np
+
+import harness  # puts backend/ and the repository on sys.path
+import emotion_model
+from emotion_batch import EmotionBatchProcessor
+from emotional_intelligence import EmotionalIntelligence
+
+# emotion: (pitch Hz, loudness, syllables per second, noise)
+VOICES = {
+    'neutral': (140, 0.25, 3.0, 0.01),
+    'happy': (220, 0.35, 4.5, 0.01),
+    'sad': (110, 0.12, 2.0, 0.005),
+    'angry': (180, 0.6, 5.0, 0.05),
+    'fearful': (250, 0.2, 6.0, 0.02),
+    'disgusted': (130, 0.3, 2.5, 0.03),
+    'surprised': (280, 0.45, 3.5, 0.01),
+    'stressed': (200, 0.4, 6.5, 0.04),
+}
+PLAIN = ['open the camera', 'what is the weather', 'play some music', 'call my sister', 'set a reminder']
+
+
+def synthesize(rng, emotion, sample_rate, seconds=1.5):
+    pitch, loudness, rate, noise = VOICES[emotion]
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    pitch *= rng.uniform(0.85, 1.15)
+    syllables = np.clip(np.sin(2 * np.pi * rate * rng.uniform(0.9, 1.1) * t), 0, None)
+    voice = sum(np.sin(2 * np.pi * pitch * k * t) / k for k in range(1, 6))
+    clip = loudness * rng.uniform(0.8, 1.2) * syllables * voice + noise * rng.standard_normal(len(t))
+    return clip.astype(np.float32)
+
+
+def transcript(rng, emotion, keywords):
+    words = keywords.get(emotion)
+    # Most commands carry no emotional words at all
+    if words and rng.random() < 0.3:
+        return f"{rng.choice(PLAIN)} I feel {rng.choice(words)}"
+    return str(rng.choice(PLAIN))
+
+
+def latency(model, design, batch_size, repeats=200):
+    rows = design[np.arange(batch_size) % len(design)]
+    audio = rows[:, :28] if model.needs_audio else None
+    text = rows[:, 28:] if model.needs_text else None
+    samples = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        model.predict(audio=audio, text=text)
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) / batch_size * 1e6
+
+
+def add_arguments(parser):
+    parser.add_argument('--data', help='directory of <emotion>/*.wav instead of synthetic clips')
+    parser.add_argument('--clips-per-emotion', type=int, default=60)
+    parser.add_argument('--holdout', type=float, default=0.3)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--sample-rate', type=int, default=22050)
+
+
+def main(args):
+    emotional_ai = EmotionalIntelligence()
+    emotional_ai.model = None  # the rules baseline, whatever model is installed
+    labels = [emotional_ai.emotions[code] for code in sorted(emotional_ai.emotions)]
+
+    if args.data:
+        clips, texts, targets = emotion_model.load_dataset(args.data, labels, args.sample_rate)
+    else:
+        rng = np.random.default_rng(0)
+        clips, texts, targets = [], [], []
+        for target, label in enumerate(labels):
+            for _ in range(args.clips_per_emotion):
+                clips.append(synthesize(rng, label, args.sample_rate))
+                texts.append(transcript(rng, label, emotional_ai.lexicon.keywords))
+                targets.append(target)
+        targets = np.array(targets)
+
+    processor = EmotionBatchProcessor(emotional_ai, workers=args.workers, tier='full')
+    started = time.perf_counter()
+    audio, _ = processor.extract(clips, args.sample_rate)
+    processor.close()
+    print(f"features for {len(clips)} clips in {time.perf_counter() - started:.1f}s")
+
+    design = np.hstack([audio, emotional_ai.text_scores(texts)])
+    train, test = emotion_model.split(len(targets), args.holdout)
+
+    rules = [emotional_ai.detect_emotion_from_voice_patterns(texts[i]) for i in test]
+    print(f"{'keyword rules':<20} accuracy {np.mean([labels[targets[i]] == rules[j] for j, i in enumerate(test)]):.3f}")
+
+    for inputs in emotion_model.INPUTS:
+        columns = {'audio': slice(0, 28), 'text': slice(28, None), 'audio+text': slice(None)}[inputs]
+        model = emotion_model.fit(design[train][:, columns], targets[train], labels, inputs)
+        predicted = model.predict(audio=design[test][:, :28], text=design[test][:, 28:])
+        accuracy = np.mean([labels[targets[i]] == predicted[j] for j, i in enumerate(test)])
+        timings = '  '.join(f"batch {size:>4}: {latency(model, design, size):6.2f} us/clip" for size in (1, 64, 4096))
+        print(f"model, {inputs:<13} accuracy {accuracy:.3f}  {timings}")
+
+
+if __name__ == '__main__':
+    harness.run(sys.modules[__name__])
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+LUA Assistant - Recognition Latency Benchmark
+Sequential Google-then-Sphinx cascade versus the hedged RecognitionScheduler
+
+A local stub speaks the Google Web Speech API wire format, so no network or
+API key is needed; the offline engine is simulated with a fixed decode time.
+
+    python benchmarks/bench_recognition.py --google-ms 250 --sphinx-ms 900
+"""
+
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import harness  # puts backend/ and the repository on sys.path
+import speech_recognition as sr
+from recognition import RecognitionScheduler, GoogleSpeechEngine
+
+
+def make_stub_handler(delay):
+    class StubRecognizerHandler(BaseHTTPRequestHandler):
+        """Answers like www.google.com/speech-api/v2/recognize"""
+        protocol_version = 'HTTP/1.1'
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            time.sleep(delay)
+            body = '{"result":[]}\n' + json.dumps({
+                'result': [{'alternative': [{'transcript': 'open whatsapp', 'confidence': 0.93}], 'final': True}],
+                'result_index': 0
+            }) + '\n'
+            payload = body.encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    return StubRecognizerHandler
+
+
+class SimulatedSphinx:
+    """Stands in for PocketSphinx with a fixed decode time"""
+    name = 'sphinx'
+
+    def __init__(self, delay):
+        self.delay = delay
+
+    def recognize(self, audio, language='en-US'):
+        time.sleep(self.delay)
+        return {'engine': self.name, 'text': 'open whatsapp', 'confidence': 0.7}
+
+
+def add_arguments(parser):
+    parser.add_argument('--google-ms', type=int, default=250)
+    parser.add_argument('--sphinx-ms', type=int, default=900)
+    parser.add_argument('--runs', type=int, default=10)
+
+
+def main(args):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), make_stub_handler(args.google_ms / 1000.0))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f'http://127.0.0.1:{server.server_address[1]}/speech-api/v2/recognize'
+
+    audio = sr.AudioData(b'\x00\x00' * 16000, 16000, 2)
+    google = GoogleSpeechEngine(url=url, key='stub')
+    sphinx = SimulatedSphinx(args.sphinx_ms / 1000.0)
+    scheduler = RecognitionScheduler([google, sphinx])
+
+    def sequential(audio):
+        # The previous recognize_speech_from_audio: every engine, one after another
+        results = [google.recognize(audio), sphinx.recognize(audio)]
+        return max((r for r in results if r), key=lambda r: r['confidence'])
+
+    for label, recognize in (('sequential cascade', sequential), ('hedged scheduler', scheduler.recognize)):
+        recognize(audio)  # warm the connection pool
+        start = time.perf_counter()
+        for _ in range(args.runs):
+            result = recognize(audio)
+        elapsed = (time.perf_counter() - start) / args.runs * 1000
+        print(f"{label:<20} {elapsed:8.1f} ms/utterance  -> {result['engine']}: {result['text']}")
+
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    harness.run(sys.modules[__name__])
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+LUA Assistant - Embedded Replica Benchmark
+/api/user_stats reads against a simulated remote primary, direct versus through the embedded replica
+
+The primary is a SQLite file behind LocalClient with a fixed delay per call
+standing in for the Turso round trip.
+
+    python benchmarks/bench_replica.py --rtt-ms 40 --users 2000 --reads 300
+"""
+
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+import harness  # puts backend/ and the repository on sys.path
+from embedded_replica import EmbeddedReplica, LocalClient
+
+USER_QUERY = "SELECT total_commands, first_seen, last_active FROM users WHERE id = ?"
+RECENT_QUERY = ("SELECT command_text, action, success, timestamp FROM commands "
+                "WHERE user_id = ? ORDER BY timestamp DESC LIMIT 10")
+
+
+def seed(primary, users, commands_per_user):
+    primary.execute("""
+        CREATE TABLE users (
+            id TEXT PRIMARY KEY,
+            first_seen TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            last_active TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            total_commands INTEGER DEFAULT 0
+        )
+    """)
+    primary.execute("""
+        CREATE TABLE commands (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT,
+            command_text TEXT,
+            action TEXT,
+            success BOOLEAN,
+            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    primary.batch(
+        [("INSERT INTO users (id, total_commands) VALUES (?, ?)", [f'user{u}', commands_per_user])
+         for u in range(users)]
+        + [("INSERT INTO commands (user_id, command_text, action, success) VALUES (?, ?, ?, ?)",
+            [f'user{u}', f'open app {c}', 'open', True])
+           for u in range(users) for c in range(commands_per_user)]
+    )
+
+
+def user_stats(client, user_id, **options):
+    client.execute(USER_QUERY, [user_id], **options)
+    client.execute(RECENT_QUERY, [user_id], **options)
+
+
+def run(label, reads, users, call):
+    samples = []
+    for _ in range(reads):
+        user_id = f'user{random.randrange(users)}'
+        started = time.perf_counter()
+        call(user_id)
+        samples.append(time.perf_counter() - started)
+    print(f"{label:<32} median {statistics.median(samples) * 1000:7.2f} ms  "
+          f"p95 {sorted(samples)[int(len(samples) * 0.95)] * 1000:7.2f} ms")
+    return statistics.median(samples)
+
+
+def add_arguments(parser):
+    parser.add_argument('--rtt-ms', type=float, default=40.0)
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--commands', type=int, default=10, help='commands per user')
+    parser.add_argument('--reads', type=int, default=300)
+
+
+def main(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        primary = LocalClient(os.path.join(tmp, 'primary.db'))
+        seed(primary, args.users, args.commands)
+        primary.latency = args.rtt_ms / 1000
+
+        direct = run('direct to primary', args.reads, args.users,
+                     lambda user_id: user_stats(primary, user_id))
+
+        started = time.perf_counter()
+        replica = EmbeddedReplica(primary, path=os.path.join(tmp, 'replica.db'), sync_interval=3600)
+        print(f"initial sync: {(time.perf_counter() - started) * 1000:.0f} ms")
+
+        local = run('replica', args.reads, args.users,
+                    lambda user_id: user_stats(replica, user_id))
+
+        # Every read follows a write by the same user, the worst case for read-your-writes
+        def write_then_read(user_id):
+            replica.write([("UPDATE users SET last_active = CURRENT_TIMESTAMP WHERE id = ?", [user_id])],
+                          key=user_id)
+            user_stats(replica, user_id, read_your_writes=user_id)
+
+        run('replica, write then read', max(1, args.reads // 10), args.users, write_then_read)
+        replica.close()
+
+    print(f"read speedup: {direct / local:.0f}x")
+
+
+if __name__ == '__main__':
+    harness.run(sys.modules[__name__])
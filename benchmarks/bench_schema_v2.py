@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+LUA Assistant - Schema v2 Benchmark
+Per-user query latency on a large database before and after the v2 migration
+
+Builds a v1 database (no indexes) with --commands rows, times the hot
+lookups and the old SELECT-then-write counter, migrates it in place, then
+times the same lookups and the single-statement upsert.
+
+    python benchmarks/bench_schema_v2.py --commands 1000000 --users 5000
+"""
+
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+import harness  # puts backend/ and the repository on sys.path
+from database.lua_db import LuaDatabase
+
+QUERIES = {
+    'recent commands': '''
+        SELECT command_text, response, timestamp FROM commands
+        WHERE user_id = ? ORDER BY timestamp DESC LIMIT 10
+    ''',
+    'command count': "SELECT COUNT(*) FROM commands WHERE user_id = ?",
+    'pattern lookup': '''
+        SELECT id, usage_count, confidence FROM learning_patterns
+        WHERE user_id = ? AND pattern = 'open app 7' AND action = 'open'
+    ''',
+}
+
+
+class V1Database(LuaDatabase):
+    """The tables as they were before versioned migrations"""
+    SCHEMA_VERSION = 1
+
+
+def v1_update_learning_pattern(db, user_id, pattern, action):
+    """The previous counter: look the row up, then update or insert it"""
+    with db.transaction() as conn:
+        result = conn.execute('''
+            SELECT id, usage_count, confidence FROM learning_patterns
+            WHERE user_id = ? AND pattern = ? AND action = ?
+        ''', (user_id, pattern, action)).fetchone()
+        if result:
+            conn.execute('''
+                UPDATE learning_patterns
+                SET usage_count = ?, confidence = ?, last_used = CURRENT_TIMESTAMP
+                WHERE id = ?
+            ''', (result[1] + 1, min(result[2] + 0.1, 1.0), result[0]))
+        else:
+            conn.execute('''
+                INSERT INTO learning_patterns (user_id, pattern, action, confidence)
+                VALUES (?, ?, ?, 0.6)
+            ''', (user_id, pattern, action))
+
+
+def populate(db, commands, users, patterns_per_user):
+    with db.transaction() as conn:
+        conn.executemany(
+            "INSERT INTO commands (user_id, command_text, intent, response, success, timestamp) "
+            "VALUES (?, ?, 'open_app', 'Opening', 1, datetime('now', ?))",
+            ((f'user{i % users}', f'open app {i % 50}', f'-{commands - i} seconds') for i in range(commands))
+        )
+        conn.executemany(
+            "INSERT INTO learning_patterns (user_id, pattern, action, confidence) VALUES (?, ?, 'open', 0.6)",
+            ((f'user{u}', f'open app {p}') for u in range(users) for p in range(patterns_per_user))
+        )
+
+
+def measure(label, db, users, samples):
+    conn = db.connection()
+    for name, sql in QUERIES.items():
+        plan = conn.execute(f"EXPLAIN QUERY PLAN {sql}", ('user0',)).fetchall()
+        timings = []
+        for _ in range(samples):
+            user_id = f'user{random.randrange(users)}'
+            started = time.perf_counter()
+            conn.execute(sql, (user_id,)).fetchall()
+            timings.append(time.perf_counter() - started)
+        print(f"  {label:<7} {name:<16} median {statistics.median(timings) * 1000:9.3f} ms  "
+              f"[{'; '.join(row[-1] for row in plan)}]")
+
+
+def measure_counter(label, update, users, samples):
+    timings = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        update(f'user{random.randrange(users)}', f'open app {random.randrange(20)}', 'open')
+        timings.append(time.perf_counter() - started)
+    print(f"  {label:<7} {'pattern counter':<16} median {statistics.median(timings) * 1000:9.3f} ms")
+
+
+def add_arguments(parser):
+    parser.add_argument('--commands', type=int, default=1000000)
+    parser.add_argument('--users', type=int, default=5000)
+    parser.add_argument('--patterns', type=int, default=20, help='learned patterns per user')
+    parser.add_argument('--samples', type=int, default=50)
+
+
+def main(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'lua.db')
+
+        started = time.perf_counter()
+        before = V1Database(path)
+        populate(before, args.commands, args.users, args.patterns)
+        print(f"populated {args.commands} commands, {args.users * args.patterns} patterns "
+              f"in {time.perf_counter() - started:.1f}s")
+
+        measure('before', before, args.users, args.samples)
+        measure_counter('before', lambda *row: v1_update_learning_pattern(before, *row), args.users, args.samples)
+        before.close()
+
+        started = time.perf_counter()
+        after = LuaDatabase(path)
+        print(f"migrated to v{after.SCHEMA_VERSION} in {time.perf_counter() - started:.1f}s")
+
+        measure('after', after, args.users, args.samples)
+        measure_counter('after', after.update_learning_pattern, args.users, args.samples)
+        after.close()
+
+
+if __name__ == '__main__':
+    harness.run(sys.modules[__name__])
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+LUA Assistant - Sphinx Grammar Benchmark
+Decode CPU against the full language model versus the generated command grammar
+
+Pass recorded commands as WAV files to compare hypotheses as well; without
+files, a few seconds of synthetic voiced noise are decoded instead.
+
+    python benchmarks/bench_sphinx_grammar.py recordings/*.wav
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+import harness  # puts backend/ and the repository on sys.path
+import speech_recognition as sr
+from command_grammar import CommandGrammar
+from device_integration import DeviceIntegration
+from sphinx_pool import SphinxDecoderPool
+
+
+def synthetic_utterance(seconds=2.0, rate=16000, seed=0):
+    """Harmonic bursts over noise, so the decoder has to search rather than idle"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * rate)) / rate
+    pitch = 120 + 40 * np.sin(2 * np.pi * 1.5 * t)
+    voiced = sum(np.sin(2 * np.pi * k * np.cumsum(pitch) / rate) / k for k in range(1, 8))
+    envelope = (np.sin(2 * np.pi * 3 * t) > -0.2).astype(float)
+    signal = 3000 * voiced * envelope + 300 * rng.standard_normal(len(t))
+    return sr.AudioData(signal.astype('<i2').tobytes(), rate, 2)
+
+
+def load_utterances(paths):
+    recognizer = sr.Recognizer()
+    utterances = []
+    for path in paths:
+        with sr.AudioFile(path) as source:
+            utterances.append((os.path.basename(path), recognizer.record(source)))
+    return utterances
+
+
+def add_arguments(parser):
+    parser.add_argument('wavs', nargs='*')
+    parser.add_argument('--runs', type=int, default=5)
+
+
+def main(args):
+    utterances = load_utterances(args.wavs) or [(f'synthetic-{i}', synthetic_utterance(seed=i)) for i in range(3)]
+    devices = DeviceIntegration()
+    grammar = CommandGrammar([lambda: devices.android_packages])
+
+    pools = {}
+    os.environ['LUA_SPHINX_SEARCH'] = 'lm'
+    pools['language model'] = SphinxDecoderPool(size=1)
+    os.environ['LUA_SPHINX_SEARCH'] = 'grammar'
+    pools['command grammar'] = SphinxDecoderPool(size=1, grammar=grammar)
+
+    for label, pool in pools.items():
+        pool.warm()
+        wall = cpu = 0.0
+        for _ in range(args.runs):
+            for name, audio in utterances:
+                start_wall, start_cpu = time.perf_counter(), time.process_time()
+                hypothesis = pool.decode(audio)
+                wall += time.perf_counter() - start_wall
+                cpu += time.process_time() - start_cpu
+        decodes = args.runs * len(utterances)
+        print(f"{label:<16} {wall / decodes * 1000:8.1f} ms wall {cpu / decodes * 1000:8.1f} ms cpu  "
+              f"last: {hypothesis!r}")
+
+
+if __name__ == '__main__':
+    harness.run(sys.modules[__name__])
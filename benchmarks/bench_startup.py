@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+LUA Assistant - Startup Benchmark
+Import cost from `python -X importtime` and time until the server first answers a request
+
+Both run in a scratch directory, so the database and caches a fresh instance
+creates do not touch the working tree.
+
+    python benchmarks/bench_startup.py --server app --runs 5
+"""
+
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+import harness
+
+BACKEND = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend')
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)')
+
+
+def server_env(workdir):
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [os.path.abspath(BACKEND), env.get('PYTHONPATH')]))
+    env.pop('LUA_WARMUP', None)
+    env.pop('LUA_SPHINX_PRELOAD', None)
+    return env
+
+
+def import_profile(module, workdir):
+    """Return (total seconds, [(cumulative seconds, package)] for the module's direct imports)"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=workdir, env=server_env(workdir), capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+
+    total = 0
+    direct = []
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, package = match.groups()
+        total += int(self_us)
+        # Children are listed before their parent, indented two spaces per level
+        if len(indent) == 2:
+            direct.append((int(cumulative_us) / 1e6, package))
+
+    return total / 1e6, sorted(direct, reverse=True)
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def time_to_first_response(server, workdir, path='/ping', timeout=120.0):
+    """Seconds from process start until path returns 200"""
+    port = free_port()
+    env = server_env(workdir)
+    env['PORT'] = str(port)
+
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(os.path.abspath(BACKEND), f'{server}.py')],
+        cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            if process.poll() is not None:
+                raise RuntimeError(f"{server}.py exited with {process.returncode}")
+            try:
+                with urllib.request.urlopen(f'http://127.0.0.1:{port}{path}', timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - started
+            except OSError:
+                time.sleep(0.01)
+        raise RuntimeError(f"No response from {server}.py within {timeout}s")
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def add_arguments(parser):
+    parser.add_argument('--server', default='app', choices=('app', 'main'))
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=12)
+    parser.add_argument('--path', default='/ping', help='endpoint polled for the first response')
+
+
+def main(args):
+    with tempfile.TemporaryDirectory() as workdir:
+        total, direct = import_profile(args.server, workdir)
+        print(f"import {args.server}: {total * 1000:.0f} ms total")
+        for seconds, package in direct[:args.top]:
+            print(f"  {seconds * 1000:8.1f} ms  {package}")
+
+        samples = [time_to_first_response(args.server, workdir, args.path) for _ in range(args.runs)]
+        print(f"time to first {args.path} response: median {statistics.median(samples) * 1000:.0f} ms, "
+              f"min {min(samples) * 1000:.0f} ms over {args.runs} runs")
+
+
+if __name__ == '__main__':
+    harness.run(sys.modules[__name__])
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+LUA Assistant - Benchmark Harness
+One entry point for every benchmarks/bench_*.py
+
+Each benchmark defines add_arguments(parser) and main(args). The harness
+puts the repository and backend/ on sys.path, builds the parser from the
+benchmark's docstring and runs it, whether it is started by name here or
+directly as a script.
+
+    python benchmarks/harness.py                            # list benchmarks
+    python benchmarks/harness.py emotion_lexicon --texts 20000
+    python benchmarks/bench_emotion_lexicon.py --texts 20000
+"""
+
+import argparse
+import ast
+import importlib
+import os
+import sys
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCHMARK_DIR)
+
+for path in (ROOT, os.path.join(ROOT, 'backend'), BENCHMARK_DIR):
+    if path not in sys.path:
+        sys.path.append(path)
+
+
+def benchmarks():
+    """Names of the benchmarks, bench_<name>.py without the affixes"""
+    return sorted(
+        name[len('bench_'):-len('.py')] for name in os.listdir(BENCHMARK_DIR)
+        if name.startswith('bench_') and name.endswith('.py')
+    )
+
+
+def summary(name):
+    """Second docstring line of a benchmark, read without importing it"""
+    with open(os.path.join(BENCHMARK_DIR, f'bench_{name}.py'), encoding='utf-8') as f:
+        doc = ast.get_docstring(ast.parse(f.read())) or ''
+    lines = doc.splitlines()
+    return lines[1] if len(lines) > 1 else ''
+
+
+def run(module, argv=None):
+    """Parse argv with a benchmark's options and run it; module may be a name"""
+    if isinstance(module, str):
+        module = importlib.import_module(f'bench_{module}')
+    parser = argparse.ArgumentParser(
+        prog=os.path.basename(module.__file__),
+        description=module.__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    module.add_arguments(parser)
+    return module.main(parser.parse_args(argv))
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    names = benchmarks()
+    if not argv or argv[0] in ('-h', '--help'):
+        print(__doc__.strip())
+        print()
+        for name in names:
+            print(f"  {name:<18} {summary(name)}")
+        return
+    if argv[0] not in names:
+        sys.exit(f"Unknown benchmark {argv[0]!r}; choose from {', '.join(names)}")
+    run(argv[0], argv[1:])
+
+
+if __name__ == '__main__':
+    main()
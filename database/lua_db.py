@@ -1,165 +1,423 @@
 import sqlite3
 import os
+import threading
+from contextlib import contextmanager
 from datetime import datetime
 import json
 
+# A user's five most used apps as a JSON array, read in order from idx_app_usage_top
+TOP_APPS_SQL = '''
+    SELECT json_group_array(json_object('name', app_name, 'count', usage_count))
+    FROM (
+        SELECT app_name, usage_count FROM app_usage
+        WHERE user_id = {user}
+        ORDER BY usage_count DESC
+        LIMIT 5
+    )
+'''
+
+# The per-user stats rollup both backends keep. Triggers on commands maintain
+# the totals and triggers on app_usage the top apps, so a stats read is one
+# primary key lookup. updated_at is the watermark embedded replicas sync on.
+STATS_ROLLUP_SCHEMA = (
+    '''
+    CREATE TABLE IF NOT EXISTS user_stats_rollup (
+        user_id TEXT PRIMARY KEY,
+        total_commands INTEGER NOT NULL DEFAULT 0,
+        successful_commands INTEGER NOT NULL DEFAULT 0,
+        last_active TIMESTAMP,
+        top_apps TEXT NOT NULL DEFAULT '[]',
+        updated_at TIMESTAMP
+    )
+    ''',
+    '''
+    CREATE INDEX IF NOT EXISTS idx_app_usage_top
+    ON app_usage (user_id, usage_count DESC)
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_commands_rollup_insert
+    AFTER INSERT ON commands WHEN NEW.user_id IS NOT NULL
+    BEGIN
+        INSERT INTO user_stats_rollup (user_id, total_commands, successful_commands, last_active, updated_at)
+        VALUES (NEW.user_id, 1, CASE WHEN NEW.success THEN 1 ELSE 0 END, NEW.timestamp, CURRENT_TIMESTAMP)
+        ON CONFLICT (user_id) DO UPDATE SET
+            total_commands = total_commands + 1,
+            successful_commands = successful_commands + excluded.successful_commands,
+            last_active = MAX(COALESCE(last_active, ''), excluded.last_active),
+            updated_at = excluded.updated_at;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_commands_rollup_delete
+    AFTER DELETE ON commands WHEN OLD.user_id IS NOT NULL
+    BEGIN
+        UPDATE user_stats_rollup SET
+            total_commands = total_commands - 1,
+            successful_commands = successful_commands - (CASE WHEN OLD.success THEN 1 ELSE 0 END),
+            updated_at = CURRENT_TIMESTAMP
+        WHERE user_id = OLD.user_id;
+    END
+    ''',
+) + tuple(
+    f'''
+    CREATE TRIGGER IF NOT EXISTS trg_app_usage_rollup_{event}
+    AFTER {event.upper()}{columns} ON app_usage WHEN NEW.user_id IS NOT NULL
+    BEGIN
+        INSERT INTO user_stats_rollup (user_id, top_apps, updated_at)
+        VALUES (NEW.user_id, ({TOP_APPS_SQL.format(user='NEW.user_id')}), CURRENT_TIMESTAMP)
+        ON CONFLICT (user_id) DO UPDATE SET
+            top_apps = excluded.top_apps,
+            updated_at = excluded.updated_at;
+    END
+    '''
+    for event, columns in (('insert', ''), ('update', ' OF usage_count, app_name'))
+)
+
+# Recomputes every rollup row from commands and app_usage
+STATS_ROLLUP_REBUILD = (
+    "DELETE FROM user_stats_rollup",
+    '''
+    INSERT INTO user_stats_rollup (user_id, total_commands, successful_commands, last_active, updated_at)
+    SELECT user_id, COUNT(*), SUM(CASE WHEN success THEN 1 ELSE 0 END), MAX(timestamp), CURRENT_TIMESTAMP
+    FROM commands
+    WHERE user_id IS NOT NULL
+    GROUP BY user_id
+    ''',
+    f'''
+    INSERT INTO user_stats_rollup (user_id, top_apps, updated_at)
+    SELECT apps.user_id, ({TOP_APPS_SQL.format(user='apps.user_id')}), CURRENT_TIMESTAMP
+    FROM (SELECT DISTINCT user_id FROM app_usage WHERE user_id IS NOT NULL) AS apps
+    WHERE true
+    ON CONFLICT (user_id) DO UPDATE SET top_apps = excluded.top_apps
+    ''',
+)
+
+# One counter per user, bumped by triggers on every learning_patterns write,
+# so checking whether a cached copy of a user's patterns is current is one
+# primary key lookup instead of an aggregate over the user's rows
+PATTERN_VERSION_SCHEMA = (
+    '''
+    CREATE TABLE IF NOT EXISTS learning_pattern_versions (
+        user_id TEXT PRIMARY KEY,
+        version INTEGER NOT NULL DEFAULT 0
+    )
+    ''',
+) + tuple(
+    f'''
+    CREATE TRIGGER IF NOT EXISTS trg_learning_patterns_version_{event}
+    AFTER {event.upper()} ON learning_patterns WHEN {row}.user_id IS NOT NULL
+    BEGIN
+        INSERT INTO learning_pattern_versions (user_id, version) VALUES ({row}.user_id, 1)
+        ON CONFLICT (user_id) DO UPDATE SET version = version + 1;
+    END
+    '''
+    for event, row in (('insert', 'NEW'), ('update', 'NEW'), ('delete', 'OLD'))
+)
+
+
 class LuaDatabase:
-    def __init__(self, db_path="lua_assistant.db"):
+    # Applied to every new connection; WAL lets readers run alongside the writer
+    PRAGMAS = (
+        "PRAGMA journal_mode=WAL",
+        "PRAGMA synchronous=NORMAL",
+        "PRAGMA temp_store=MEMORY",
+        "PRAGMA cache_size=-16000",
+        "PRAGMA mmap_size=134217728"
+    )
+
+    # PRAGMA user_version once init_database() is done; _migrate_v<n> takes a database from n-1 to n
+    SCHEMA_VERSION = 4
+
+    def __init__(self, db_path="lua_assistant.db", busy_timeout=5.0, statement_cache_size=128):
         self.db_path = db_path
+        self.busy_timeout = busy_timeout
+        self.statement_cache_size = statement_cache_size
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
         self.init_database()
-    
+
+    def connection(self):
+        """Return this thread's persistent connection, opening it on first use"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # Autocommit mode; writes are grouped with transaction()
+            conn = sqlite3.connect(
+                self.db_path,
+                timeout=self.busy_timeout,
+                isolation_level=None,
+                check_same_thread=False,
+                cached_statements=self.statement_cache_size
+            )
+            for pragma in self.PRAGMAS:
+                conn.execute(pragma)
+            self._local.conn = conn
+            self._local.depth = 0
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    @contextmanager
+    def transaction(self):
+        """Run a block as one write transaction; nested blocks join the outer one"""
+        conn = self.connection()
+        if self._local.depth:
+            self._local.depth += 1
+            try:
+                yield conn
+            finally:
+                self._local.depth -= 1
+            return
+
+        # IMMEDIATE takes the write lock up front instead of failing on upgrade
+        conn.execute("BEGIN IMMEDIATE")
+        self._local.depth = 1
+        try:
+            yield conn
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            self._local.depth = 0
+
+    def close(self):
+        """Close every connection opened by this instance"""
+        with self._connections_lock:
+            for conn in self._connections:
+                try:
+                    conn.close()
+                except sqlite3.Error:
+                    pass
+            self._connections = []
+        self._local = threading.local()
+
     def init_database(self):
         """Initialize database with required tables"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Users table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id TEXT UNIQUE NOT NULL,
-                name TEXT,
-                preferences TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
+        with self.transaction() as conn:
+            # Users table
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS users (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id TEXT UNIQUE NOT NULL,
+                    name TEXT,
+                    preferences TEXT,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+
+            # Commands table
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS commands (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id TEXT,
+                    command_text TEXT NOT NULL,
+                    intent TEXT,
+                    response TEXT,
+                    success BOOLEAN,
+                    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY (user_id) REFERENCES users (user_id)
+                )
+            ''')
+
+            # Learning patterns table
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS learning_patterns (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id TEXT,
+                    pattern TEXT NOT NULL,
+                    action TEXT NOT NULL,
+                    confidence REAL DEFAULT 0.5,
+                    usage_count INTEGER DEFAULT 1,
+                    last_used TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY (user_id) REFERENCES users (user_id)
+                )
+            ''')
+
+            # User preferences table
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS user_preferences (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id TEXT,
+                    preference_key TEXT NOT NULL,
+                    preference_value TEXT NOT NULL,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY (user_id) REFERENCES users (user_id)
+                )
+            ''')
+
+            # App usage statistics
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS app_usage (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id TEXT,
+                    app_name TEXT NOT NULL,
+                    package_name TEXT,
+                    usage_count INTEGER DEFAULT 1,
+                    last_opened TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY (user_id) REFERENCES users (user_id)
+                )
+            ''')
+
+            self.migrate(conn)
+
+    def migrate(self, conn):
+        """Apply pending schema migrations inside the caller's transaction"""
+        # 0 is a database from before versioning, with just the tables created above (v1)
+        version = max(conn.execute("PRAGMA user_version").fetchone()[0], 1)
+        for target in range(version + 1, self.SCHEMA_VERSION + 1):
+            getattr(self, f'_migrate_v{target}')(conn)
+            conn.execute(f"PRAGMA user_version = {target}")
+
+    def _migrate_v2(self, conn):
+        """Unique keys for the upserted counters and a seek index for per-user history"""
+        # Fold rows duplicated by racing SELECT-then-INSERT calls into the oldest one
+        conn.execute('''
+            CREATE TEMP TABLE merged_patterns AS
+            SELECT MIN(id) AS id, SUM(usage_count) AS usage_count,
+                   MAX(confidence) AS confidence, MAX(last_used) AS last_used
+            FROM learning_patterns
+            GROUP BY user_id, pattern, action
+            HAVING COUNT(*) > 1
         ''')
-        
-        # Commands table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS commands (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id TEXT,
-                command_text TEXT NOT NULL,
-                intent TEXT,
-                response TEXT,
-                success BOOLEAN,
-                timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users (user_id)
-            )
+        conn.execute('''
+            DELETE FROM learning_patterns
+            WHERE id NOT IN (SELECT MIN(id) FROM learning_patterns GROUP BY user_id, pattern, action)
         ''')
-        
-        # Learning patterns table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS learning_patterns (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id TEXT,
-                pattern TEXT NOT NULL,
-                action TEXT NOT NULL,
-                confidence REAL DEFAULT 0.5,
-                usage_count INTEGER DEFAULT 1,
-                last_used TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users (user_id)
+        conn.execute('''
+            UPDATE learning_patterns
+            SET (usage_count, confidence, last_used) = (
+                SELECT usage_count, confidence, last_used FROM merged_patterns
+                WHERE merged_patterns.id = learning_patterns.id
             )
+            WHERE id IN (SELECT id FROM merged_patterns)
         ''')
-        
-        # User preferences table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS user_preferences (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id TEXT,
-                preference_key TEXT NOT NULL,
-                preference_value TEXT NOT NULL,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users (user_id)
-            )
+        conn.execute("DROP TABLE merged_patterns")
+
+        conn.execute('''
+            CREATE TEMP TABLE merged_apps AS
+            SELECT MIN(id) AS id, SUM(usage_count) AS usage_count, MAX(last_opened) AS last_opened
+            FROM app_usage
+            GROUP BY user_id, package_name
+            HAVING COUNT(*) > 1
         ''')
-        
-        # App usage statistics
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS app_usage (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id TEXT,
-                app_name TEXT NOT NULL,
-                package_name TEXT,
-                usage_count INTEGER DEFAULT 1,
-                last_opened TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users (user_id)
+        conn.execute('''
+            DELETE FROM app_usage
+            WHERE id NOT IN (SELECT MIN(id) FROM app_usage GROUP BY user_id, package_name)
+        ''')
+        conn.execute('''
+            UPDATE app_usage
+            SET (usage_count, last_opened) = (
+                SELECT usage_count, last_opened FROM merged_apps
+                WHERE merged_apps.id = app_usage.id
             )
+            WHERE id IN (SELECT id FROM merged_apps)
+        ''')
+        conn.execute("DROP TABLE merged_apps")
+
+        conn.execute('''
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_learning_patterns_key
+            ON learning_patterns (user_id, pattern, action)
         ''')
-        
-        conn.commit()
-        conn.close()
-    
+        conn.execute('''
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_app_usage_key
+            ON app_usage (user_id, package_name)
+        ''')
+        conn.execute('''
+            CREATE INDEX IF NOT EXISTS idx_commands_user_time
+            ON commands (user_id, timestamp)
+        ''')
+
+    def _migrate_v3(self, conn):
+        """Per-user stats kept current by triggers, in the schema shared with the Turso backend"""
+        for statement in STATS_ROLLUP_SCHEMA:
+            conn.execute(statement)
+        # Joins the migration's transaction
+        self.rebuild_user_stats()
+
+    def _migrate_v4(self, conn):
+        """Per-user learning pattern versions kept by triggers"""
+        for statement in PATTERN_VERSION_SCHEMA:
+            conn.execute(statement)
+        conn.execute('''
+            INSERT INTO learning_pattern_versions (user_id, version)
+            SELECT DISTINCT user_id, 1 FROM learning_patterns WHERE user_id IS NOT NULL
+        ''')
+
+    def rebuild_user_stats(self):
+        """Recompute user_stats_rollup from commands and app_usage, for backfill or repair"""
+        with self.transaction() as conn:
+            for statement in STATS_ROLLUP_REBUILD:
+                conn.execute(statement)
+            return conn.execute("SELECT COUNT(*) FROM user_stats_rollup").fetchone()[0]
+
     def create_user(self, user_id, name=None):
         """Create a new user"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
         try:
-            cursor.execute(
-                "INSERT INTO users (user_id, name) VALUES (?, ?)",
-                (user_id, name)
-            )
-            conn.commit()
+            with self.transaction() as conn:
+                conn.execute(
+                    "INSERT INTO users (user_id, name) VALUES (?, ?)",
+                    (user_id, name)
+                )
             return True
         except sqlite3.IntegrityError:
             return False  # User already exists
-        finally:
-            conn.close()
-    
+
     def log_command(self, user_id, command_text, intent, response, success):
         """Log a command execution"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT INTO commands (user_id, command_text, intent, response, success)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (user_id, command_text, intent, response, success))
-        
-        conn.commit()
-        conn.close()
-    
+        with self.transaction() as conn:
+            conn.execute('''
+                INSERT INTO commands (user_id, command_text, intent, response, success)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (user_id, command_text, intent, response, success))
+
+    def log_commands(self, rows):
+        """Log many (user_id, command_text, intent, response, success) rows in one transaction"""
+        with self.transaction() as conn:
+            conn.executemany('''
+                INSERT INTO commands (user_id, command_text, intent, response, success)
+                VALUES (?, ?, ?, ?, ?)
+            ''', rows)
+
     def update_learning_pattern(self, user_id, pattern, action):
-        """Update or create learning pattern"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Check if pattern exists
-        cursor.execute('''
-            SELECT id, usage_count, confidence FROM learning_patterns
-            WHERE user_id = ? AND pattern = ? AND action = ?
-        ''', (user_id, pattern, action))
-        
-        result = cursor.fetchone()
-        
-        if result:
-            # Update existing pattern
-            pattern_id, usage_count, confidence = result
-            new_usage_count = usage_count + 1
-            new_confidence = min(confidence + 0.1, 1.0)  # Increase confidence
-            
-            cursor.execute('''
-                UPDATE learning_patterns
-                SET usage_count = ?, confidence = ?, last_used = CURRENT_TIMESTAMP
-                WHERE id = ?
-            ''', (new_usage_count, new_confidence, pattern_id))
-        else:
-            # Create new pattern
-            cursor.execute('''
+        """Update or create learning pattern, returning its new confidence"""
+        with self.transaction() as conn:
+            # New patterns start at 0.6; each repeat adds 0.1 up to 1.0
+            return conn.execute('''
                 INSERT INTO learning_patterns (user_id, pattern, action, confidence)
-                VALUES (?, ?, ?, ?)
-            ''', (user_id, pattern, action, 0.6))
-        
-        conn.commit()
-        conn.close()
-    
+                VALUES (?, ?, ?, 0.6)
+                ON CONFLICT (user_id, pattern, action) DO UPDATE SET
+                    usage_count = usage_count + 1,
+                    confidence = MIN(confidence + 0.1, 1.0),
+                    last_used = CURRENT_TIMESTAMP
+                RETURNING confidence
+            ''', (user_id, pattern, action)).fetchall()[0][0]
+
+    def get_learning_patterns(self, user_id, min_confidence=0.5):
+        """Get all of a user's patterns above a confidence floor"""
+        return self.connection().execute('''
+            SELECT pattern, action, confidence
+            FROM learning_patterns
+            WHERE user_id = ? AND confidence > ?
+        ''', (user_id, min_confidence)).fetchall()
+
+    def get_learning_pattern_version(self, user_id):
+        """Version of a user's pattern rows; every insert, update or delete changes it"""
+        row = self.connection().execute(
+            "SELECT version FROM learning_pattern_versions WHERE user_id = ?", (user_id,)
+        ).fetchone()
+        return f"v{row[0] if row else 0}"
+
     def get_user_patterns(self, user_id, limit=10):
         """Get user's most used patterns"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
+        patterns = self.connection().execute('''
             SELECT pattern, action, confidence, usage_count
             FROM learning_patterns
             WHERE user_id = ?
             ORDER BY confidence DESC, usage_count DESC
             LIMIT ?
-        ''', (user_id, limit))
-        
-        patterns = cursor.fetchall()
-        conn.close()
-        
+        ''', (user_id, limit)).fetchall()
+
         return [
             {
                 'pattern': p[0],
@@ -169,73 +427,65 @@ class LuaDatabase:
             }
             for p in patterns
         ]
-    
+
     def update_app_usage(self, user_id, app_name, package_name):
         """Track app usage statistics"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT id, usage_count FROM app_usage
-            WHERE user_id = ? AND package_name = ?
-        ''', (user_id, package_name))
-        
-        result = cursor.fetchone()
-        
-        if result:
-            app_id, usage_count = result
-            cursor.execute('''
-                UPDATE app_usage
-                SET usage_count = ?, last_opened = CURRENT_TIMESTAMP
-                WHERE id = ?
-            ''', (usage_count + 1, app_id))
-        else:
-            cursor.execute('''
+        with self.transaction() as conn:
+            conn.execute('''
                 INSERT INTO app_usage (user_id, app_name, package_name)
                 VALUES (?, ?, ?)
+                ON CONFLICT (user_id, package_name) DO UPDATE SET
+                    usage_count = usage_count + 1,
+                    last_opened = CURRENT_TIMESTAMP
             ''', (user_id, app_name, package_name))
-        
-        conn.commit()
-        conn.close()
-    
+
+    def get_recent_commands(self, user_id, limit=10):
+        """Get a user's most recent commands"""
+        recent_commands = self.connection().execute('''
+            SELECT command_text, response, timestamp
+            FROM commands
+            WHERE user_id = ?
+            ORDER BY timestamp DESC
+            LIMIT ?
+        ''', (user_id, limit)).fetchall()
+
+        return [
+            {
+                'command': cmd[0],
+                'response': cmd[1],
+                'timestamp': cmd[2]
+            }
+            for cmd in recent_commands
+        ]
+
     def get_user_stats(self, user_id):
-        """Get user statistics"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Total commands
-        cursor.execute(
-            "SELECT COUNT(*) FROM commands WHERE user_id = ?",
-            (user_id,)
-        )
-        total_commands = cursor.fetchone()[0]
-        
-        # Successful commands
-        cursor.execute(
-            "SELECT COUNT(*) FROM commands WHERE user_id = ? AND success = 1",
-            (user_id,)
-        )
-        successful_commands = cursor.fetchone()[0]
-        
-        # Most used apps
-        cursor.execute('''
-            SELECT app_name, usage_count FROM app_usage
+        """Get user statistics from the rollup; one row however long the history"""
+        rollup = self.connection().execute('''
+            SELECT total_commands, successful_commands, last_active, top_apps
+            FROM user_stats_rollup
             WHERE user_id = ?
-            ORDER BY usage_count DESC
-            LIMIT 5
-        ''', (user_id,))
-        top_apps = cursor.fetchall()
-        
-        conn.close()
-        
+        ''', (user_id,)).fetchone()
+        total_commands, successful_commands, last_active, top_apps = rollup or (0, 0, None, '[]')
+
         return {
             'total_commands': total_commands,
             'successful_commands': successful_commands,
             'success_rate': (successful_commands / total_commands * 100) if total_commands > 0 else 0,
-            'top_apps': [{'name': app[0], 'count': app[1]} for app in top_apps]
+            'last_active': last_active,
+            'top_apps': json.loads(top_apps)
         }
 
 # Initialize database
 if __name__ == "__main__":
-    db = LuaDatabase()
-    print("Database initialized successfully!")
\ No newline at end of file
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Create or migrate the LUA Assistant database")
+    parser.add_argument('--db', default='lua_assistant.db')
+    parser.add_argument('--rebuild-stats', action='store_true',
+                        help='recompute user_stats_rollup from the commands and app_usage tables')
+    args = parser.parse_args()
+
+    db = LuaDatabase(args.db)
+    print("Database initialized successfully!")
+    if args.rebuild_stats:
+        print(f"Rebuilt stats for {db.rebuild_user_stats()} users")
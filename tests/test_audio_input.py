@@ -0,0 +1,83 @@
+import io
+import struct
+import wave
+
+import numpy as np
+import pytest
+
+from audio_input import (AudioTooLarge, decode_audio, pcm_frames, pcm_rms, pcm_samples, read_limited)
+
+
+def wav_bytes(frames, channels=1, sample_width=2, rate=16000):
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wav:
+        wav.setnchannels(channels)
+        wav.setsampwidth(sample_width)
+        wav.setframerate(rate)
+        wav.writeframes(frames)
+    return buffer.getvalue()
+
+
+def test_read_limited_stops_at_the_limit():
+    assert read_limited(io.BytesIO(b'x' * 100), limit=100) == b'x' * 100
+    with pytest.raises(AudioTooLarge):
+        read_limited(io.BytesIO(b'x' * 101), limit=100)
+    # A declared length over the limit fails before anything is read
+    with pytest.raises(AudioTooLarge):
+        read_limited(io.BytesIO(b''), limit=100, content_length=101)
+
+
+@pytest.mark.parametrize('sample_width', [2, 3, 4])
+def test_pcm_samples_round_trip(sample_width):
+    top = 2 ** (8 * sample_width - 1)
+    samples = np.array([0, 1, -1, top - 1, -top, 12345, -12345], dtype=np.int32)
+    frames = pcm_frames(samples, sample_width)
+
+    assert len(frames) == len(samples) * sample_width
+    np.testing.assert_array_equal(pcm_samples(frames, sample_width), samples)
+    # A trailing partial sample is ignored
+    assert len(pcm_samples(frames + b'\x01', sample_width)) == len(samples)
+
+
+def test_pcm_rms():
+    assert pcm_rms(b'') == 0
+    assert pcm_rms(struct.pack('<4h', 3, -3, 3, -3)) == 3
+    assert pcm_rms(struct.pack('<2h', 300, 400)) == int(np.sqrt((300 ** 2 + 400 ** 2) / 2))
+
+
+def test_raw_pcm_skips_container_parsing():
+    audio = decode_audio(bytearray(struct.pack('<3h', 1, -2, 3)), 'audio/pcm', {'rate': '8000'})
+    assert (audio.sample_rate, audio.sample_width) == (8000, 2)
+    assert audio.get_raw_data() == struct.pack('<3h', 1, -2, 3)
+
+    # audio/L16 is big-endian
+    audio = decode_audio(struct.pack('>3h', 1, -2, 3), 'audio/L16')
+    assert audio.sample_rate == 16000
+    assert audio.get_raw_data() == struct.pack('<3h', 1, -2, 3)
+
+
+def test_mono_wav_frames_are_used_as_is():
+    frames = struct.pack('<4h', 1, 2, 3, 4)
+    audio = decode_audio(wav_bytes(frames, rate=22050), 'audio/wav')
+    assert (audio.sample_rate, audio.sample_width) == (22050, 2)
+    assert audio.get_raw_data() == frames
+
+
+@pytest.mark.parametrize('sample_width', [2, 3])
+def test_stereo_wav_is_averaged_to_mono(sample_width):
+    stereo = np.array([[100, 300], [-100, -201], [7, 8]], dtype=np.int32)
+    audio = decode_audio(wav_bytes(pcm_frames(stereo.reshape(-1), sample_width), 2, sample_width), 'audio/wav')
+
+    assert audio.sample_width == sample_width
+    np.testing.assert_array_equal(pcm_samples(audio.get_raw_data(), sample_width), [200, -151, 7])
+
+
+def test_unusual_wav_goes_through_speech_recognition():
+    # 8-bit WAV is unsigned and left to the library
+    audio = decode_audio(wav_bytes(bytes([128, 129, 127]), sample_width=1), 'audio/wav')
+    assert audio.sample_rate == 16000
+
+
+def test_empty_upload_is_rejected():
+    with pytest.raises(ValueError):
+        decode_audio(b'', 'audio/wav')
@@ -0,0 +1,28 @@
+import pytest
+
+from batch_items import parse_batch_item
+
+
+def test_valid_item_with_defaults():
+    assert parse_batch_item({'text': 'open maps'}) == ('default', 'open maps', {})
+    assert parse_batch_item({'user_id': 'u', 'text': 'open maps', 'context': {'app_state': 'active'}}) == (
+        'u', 'open maps', {'app_state': 'active'}
+    )
+    assert parse_batch_item({'text': 'open maps', 'context': None})[2] == {}
+
+
+@pytest.mark.parametrize('item, error', [
+    ('open maps', 'Item must be an object'),
+    (['open maps'], 'Item must be an object'),
+    ({}, 'No command text provided'),
+    ({'text': '   '}, 'No command text provided'),
+    ({'text': 5}, 'text must be a string'),
+    ({'text': 'open maps', 'user_id': ['u']}, 'user_id must be a non-empty string'),
+    ({'text': 'open maps', 'user_id': {'id': 'u'}}, 'user_id must be a non-empty string'),
+    ({'text': 'open maps', 'user_id': 7}, 'user_id must be a non-empty string'),
+    ({'text': 'open maps', 'user_id': ''}, 'user_id must be a non-empty string'),
+    ({'text': 'open maps', 'context': 'active'}, 'context must be an object'),
+])
+def test_bad_items_are_described(item, error):
+    with pytest.raises(ValueError, match=error):
+        parse_batch_item(item)
@@ -0,0 +1,127 @@
+import pytest
+import speech_recognition as sr
+
+from command_grammar import CommandGrammar, PronunciationDictionary
+
+DICTIONARY = '''\
+open OW P AH N
+call K AO L
+play P L EY
+please P L IY Z
+maps M AE P S
+mail M EY L
+g JH IY
+mom M AA M
+one W AH N
+two T UW
+three TH R IY
+nine N AY N
+at AE T
+in IH N
+five F AY V
+minutes M IH N AH T S
+'''
+
+
+@pytest.fixture
+def dictionary_path(tmp_path):
+    path = tmp_path / 'test.dict'
+    path.write_text(DICTIONARY + 'open(2) OW P IH N\n')
+    return str(path)
+
+
+def test_unknown_words_are_spelled_from_known_pieces(dictionary_path):
+    dictionary = PronunciationDictionary.load(dictionary_path)
+    assert 'open' in dictionary
+    assert dictionary.entries['open'] == 'OW P AH N'
+    assert dictionary.compound('gmail') == 'JH IY M EY L'
+    assert dictionary.compound('maps') is None
+    assert dictionary.compound('spotify') is None
+
+
+def test_grammar_covers_intents_and_catalog_apps(dictionary_path):
+    grammar = CommandGrammar([lambda: ['Maps', 'Gmail', 'Spotify', 'Mom']])
+    compiled = grammar.compile(dictionary_path)
+
+    assert compiled.jsgf.startswith('#JSGF V1.0;\ngrammar commands;\n')
+    assert '<app> = gmail | maps | mom;' in compiled.jsgf
+    assert '<open> = (open) [the] <app> [app];' in compiled.jsgf
+    assert '<call> = (call) [to] (<digit>+ | <slot>);' in compiled.jsgf
+    assert compiled.pronunciations == {'gmail': 'JH IY M EY L'}
+    assert 'spotify' in compiled.skipped
+    # Intents with no speakable trigger are left out
+    assert '<weather>' not in compiled.jsgf
+
+
+def test_compiled_grammar_is_reused_until_invalidated(dictionary_path):
+    apps = ['Maps']
+    grammar = CommandGrammar([lambda: apps])
+    first = grammar.compile(dictionary_path)
+    apps.append('Gmail')
+    assert grammar.compile(dictionary_path) is first
+
+    grammar.invalidate()
+    rebuilt = grammar.compile(dictionary_path)
+    assert rebuilt.version == first.version + 1
+    assert 'gmail' in rebuilt.jsgf
+
+
+def test_failing_catalog_is_skipped():
+    def broken():
+        raise RuntimeError('device offline')
+
+    assert CommandGrammar([broken, lambda: ['Maps']]).app_names() == ['maps']
+
+
+@pytest.mark.parametrize('spoken, expected', [
+    ('call nine eight seven six five', 'call 98765'),
+    ('call one two', 'call one two'),
+    ('remind me at five pm', 'remind me at 5 pm'),
+    ('remind me in forty five minutes', 'remind me in 45 minutes'),
+    ('remind me in twenty minutes', 'remind me in 20 minutes'),
+    ('open maps', 'open maps'),
+])
+def test_normalize_turns_spoken_numbers_into_digits(spoken, expected):
+    assert CommandGrammar().normalize(spoken) == expected
+
+
+@pytest.mark.parametrize('hypothesis, needed', [
+    (None, True),
+    ('', True),
+    ('open maps', False),
+    ('weather', False),
+    ('call 98765', False),
+    ('call mom', True),
+    ('play music', True),
+    ('send message to mom', True),
+    ('remind me in 5 minutes', True),
+])
+def test_free_text_commands_need_the_language_model(hypothesis, needed):
+    assert CommandGrammar().needs_language_model(hypothesis) is needed
+
+
+def test_decoder_pool_falls_back_to_the_language_model(monkeypatch):
+    pytest.importorskip('pocketsphinx')
+    from sphinx_pool import SphinxDecoderPool
+
+    monkeypatch.setenv('LUA_SPHINX_SEARCH', 'grammar')
+    grammar = CommandGrammar([lambda: ['Maps', 'Gmail']])
+    pool = SphinxDecoderPool(size=1, grammar=grammar)
+    try:
+        pool.warm()
+    except sr.RequestError as e:
+        pytest.skip(str(e))
+
+    # Silence matches nothing in the grammar, so the language model decodes it again
+    pool.decode(sr.AudioData(b'\x00\x00' * 16000, 16000, 2))
+    stats = pool.stats()
+    assert (stats['search'], stats['language_model_fallbacks']) == ('grammar', 1)
+    with pool.lease() as decoder:
+        assert decoder.current_search() == grammar.name
+
+
+def test_decoder_pool_uses_the_language_model_by_default(monkeypatch):
+    from sphinx_pool import SphinxDecoderPool
+
+    monkeypatch.delenv('LUA_SPHINX_SEARCH', raising=False)
+    assert SphinxDecoderPool(size=1, grammar=CommandGrammar()).stats()['search'] == 'lm'
@@ -0,0 +1,131 @@
+import threading
+import time
+
+import pytest
+
+from embedded_replica import EmbeddedReplica, LocalClient
+
+SCHEMA = (
+    "CREATE TABLE users (id TEXT PRIMARY KEY, last_active TIMESTAMP DEFAULT CURRENT_TIMESTAMP)",
+    "CREATE TABLE commands (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id TEXT, command_text TEXT)",
+)
+TABLES = (('users', 'last_active'), ('commands', 'id'))
+COMMAND = "INSERT INTO commands (user_id, command_text) VALUES (?, ?)"
+COUNT = "SELECT COUNT(*) FROM commands WHERE user_id = ?"
+
+
+@pytest.fixture
+def primary(tmp_path):
+    client = LocalClient(str(tmp_path / 'primary.db'))
+    client.batch([(statement, []) for statement in SCHEMA])
+    yield client
+    client.close()
+
+
+@pytest.fixture
+def replica(primary, tmp_path):
+    replicas = []
+
+    def make(**kwargs):
+        kwargs.setdefault('tables', TABLES)
+        kwargs.setdefault('sync_interval', 60)
+        kwargs.setdefault('wait_timeout', 2.0)
+        replicas.append(EmbeddedReplica(primary, path=str(tmp_path / f'replica{len(replicas)}.db'), **kwargs))
+        return replicas[-1]
+
+    yield make
+    for r in replicas:
+        r.close()
+
+
+def count(replica, user_id, **kwargs):
+    return replica.execute(COUNT, [user_id], **kwargs).rows[0][0]
+
+
+def test_initial_sync_copies_schema_and_rows(primary, replica):
+    primary.execute(COMMAND, ['u', 'open maps'])
+    r = replica()
+
+    assert count(r, 'u') == 1
+    assert (r.local_reads, r.primary_reads) == (1, 0)
+    assert r.local.execute("SELECT name FROM sqlite_master WHERE name = 'commands'").rows
+
+
+def test_sync_upserts_rows_past_the_watermark(primary, replica):
+    r = replica()
+    primary.execute(COMMAND, ['u', 'open maps'])
+    assert count(r, 'u') == 0
+
+    r.sync()
+    primary.execute(COMMAND, ['u', 'call mum'])
+    r.sync()
+    # The row at the watermark is pulled again and upserted, not duplicated
+    assert count(r, 'u') == 2
+
+
+def test_queued_write_is_visible_to_read_your_writes(replica):
+    r = replica()
+    r.write([(COMMAND, ['u', 'open maps'])], key='u')
+    assert count(r, 'u', read_your_writes='u') == 1
+    assert r.primary_reads == 0
+
+
+def test_reserved_write_holds_reads_until_it_is_sent(replica):
+    r = replica()
+    # Reserved when the command is queued, sent by a later write-behind flush
+    seq = r.reserve('u')
+
+    def flush():
+        time.sleep(0.2)
+        r.batch([(COMMAND, ['u', 'open maps'])], seqs=[seq])
+
+    writer = threading.Thread(target=flush)
+    writer.start()
+    started = time.monotonic()
+    assert count(r, 'u', read_your_writes='u') == 1
+    assert time.monotonic() - started >= 0.15
+    writer.join()
+
+    # Other users never waited on it
+    assert count(r, 'v', read_your_writes='v') == 0
+    assert r.primary_reads == 0
+
+
+def test_unsent_reservation_falls_through_to_the_primary(primary, replica):
+    r = replica(wait_timeout=0.1)
+    r.reserve('u')
+    primary.execute(COMMAND, ['u', 'open maps'])
+
+    assert count(r, 'u', read_your_writes='u') == 1
+    assert r.primary_reads == 1
+
+
+def test_released_reservation_stops_holding_reads(replica):
+    r = replica(wait_timeout=0.1)
+    seq = r.reserve('u')
+    r.release([seq])
+
+    assert count(r, 'u', read_your_writes='u') == 0
+    assert (r.local_reads, r.primary_reads) == (1, 0)
+
+
+def test_table_missing_on_the_primary_is_pulled_once_created(primary, replica):
+    r = replica(tables=TABLES + (('user_stats_rollup', 'updated_at'),))
+    primary.execute(COMMAND, ['u', 'open maps'])
+    r.sync()
+    assert count(r, 'u') == 1
+
+    primary.execute("CREATE TABLE user_stats_rollup (user_id TEXT PRIMARY KEY, updated_at TIMESTAMP)")
+    primary.execute("INSERT INTO user_stats_rollup VALUES ('u', CURRENT_TIMESTAMP)")
+    r.sync()
+    assert r.execute("SELECT user_id FROM user_stats_rollup").rows == [('u',)]
+
+
+def test_stale_replica_reads_from_the_primary(primary, replica):
+    r = replica(max_staleness=0.05)
+    primary.execute(COMMAND, ['u', 'open maps'])
+    time.sleep(0.1)
+
+    assert count(r, 'u') == 1
+    assert count(r, 'u', fresh=True) == 1
+    assert r.primary_reads == 2
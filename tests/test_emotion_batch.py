@@ -0,0 +1,135 @@
+import io
+import os
+import subprocess
+import sys
+import textwrap
+import wave
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from flask import Flask, Request
+
+import audio_features
+import emotion_endpoints
+from emotion_batch import EmotionBatchProcessor
+from emotion_endpoints import register_emotion_routes
+
+BACKEND = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend')
+SAMPLE_RATE = 16000
+
+
+class FakeEmotionalAI:
+    feature_tier = 'fast'
+
+    def classify_batch(self, features, texts=None):
+        return ['happy' if row.any() else 'neutral' for row in features]
+
+
+def clips(count, seconds=0.25):
+    rng = np.random.default_rng(0)
+    return [(0.1 * rng.standard_normal(int(seconds * (index + 1) * SAMPLE_RATE))).astype(np.float32)
+            for index in range(count)]
+
+
+def wav_bytes(samples):
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(SAMPLE_RATE)
+        wav.writeframes((samples * 32767).astype('<i2').tobytes())
+    return buffer.getvalue()
+
+
+def test_pool_matches_inline_extraction():
+    batch = clips(5)
+    inline, inline_errors = EmotionBatchProcessor(FakeEmotionalAI(), workers=0).extract(batch, SAMPLE_RATE)
+
+    pooled = EmotionBatchProcessor(FakeEmotionalAI(), workers=2)
+    try:
+        pooled.warm()
+        assert pooled.stats()['started']
+        features, errors = pooled.extract(batch, SAMPLE_RATE)
+    finally:
+        pooled.close()
+
+    assert features.shape == (5, audio_features.FEATURE_DIM)
+    np.testing.assert_allclose(features, inline, rtol=1e-5, atol=1e-6)
+    assert errors == inline_errors == {}
+
+
+def test_failed_clip_is_reported_in_place():
+    batch = clips(3)
+    batch[1] = np.zeros(0, dtype=np.float32)
+    results = EmotionBatchProcessor(FakeEmotionalAI(), workers=0).analyze(batch, SAMPLE_RATE)
+
+    assert [result['index'] for result in results] == [0, 1, 2]
+    assert results[1]['error'] and results[1]['emotion'] == 'neutral'
+    assert results[0]['error'] is None and results[2]['error'] is None
+
+
+def test_workers_do_not_rerun_the_server_script(tmp_path):
+    marker = tmp_path / 'started'
+    script = tmp_path / 'server.py'
+    script.write_text(textwrap.dedent(f'''
+        import sys
+        from types import SimpleNamespace
+        sys.path.insert(0, {BACKEND!r})
+        # Module-level setup like app.py's; a worker re-running it would append again
+        with open({str(marker)!r}, 'a') as f:
+            f.write('x')
+
+        import numpy as np
+        from emotion_batch import EmotionBatchProcessor
+
+        if __name__ == '__main__':
+            batch = EmotionBatchProcessor(SimpleNamespace(feature_tier='fast'), workers=2)
+            batch.warm()
+            features, errors = batch.extract([np.ones(4000, dtype=np.float32)] * 3, 16000)
+            batch.close()
+            print(features.shape, errors)
+    '''))
+
+    result = subprocess.run([sys.executable, str(script)], capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == '(3, 28) {}'
+    assert marker.read_text() == 'x'
+
+
+@pytest.fixture
+def client():
+    class LimitedRequest(Request):
+        endpoint_limits = {}
+
+        @property
+        def max_content_length(self):
+            return self.endpoint_limits.get(self.endpoint, super().max_content_length)
+
+    app = Flask(__name__)
+    app.request_class = LimitedRequest
+    app.config['MAX_CONTENT_LENGTH'] = 64 * 1024
+    batch = EmotionBatchProcessor(FakeEmotionalAI(), workers=0)
+    LimitedRequest.endpoint_limits.update(register_emotion_routes(app, FakeEmotionalAI(), batch))
+    return app.test_client()
+
+
+def upload(client, count, seconds=0.25):
+    files = [(io.BytesIO(wav_bytes(clip)), f'clip{index}.wav', 'audio/wav')
+             for index, clip in enumerate(clips(count, seconds))]
+    return client.post('/api/analyze_emotion_batch', data={'audio': files}, content_type='multipart/form-data')
+
+
+def test_batch_upload_limit_scales_with_clip_count(client):
+    # Three clips of over 30 KB each exceed the single-clip default but not the batch limit
+    response = upload(client, 3, seconds=1.0)
+    assert response.status_code == 200
+    assert [result['index'] for result in response.get_json()['results']] == [0, 1, 2]
+    assert emotion_endpoints.MAX_BATCH_BYTES >= emotion_endpoints.MAX_BATCH_CLIPS * emotion_endpoints.MAX_AUDIO_BYTES
+
+
+def test_batch_rejects_too_many_clips(client, monkeypatch):
+    monkeypatch.setattr(emotion_endpoints, 'MAX_BATCH_CLIPS', 2)
+    response = upload(client, 3, seconds=0.05)
+    assert response.status_code == 400
+    assert 'limited to 2' in response.get_json()['error']
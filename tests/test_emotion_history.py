@@ -0,0 +1,62 @@
+import pytest
+
+from emotion_history import RING_HEADER, EmotionHistory, EmotionRing
+from state_snapshot import SnapshotManager
+
+
+def test_ring_keeps_the_last_entries_and_counts():
+    ring = EmotionRing(3, emotions=4)
+    for timestamp, code in enumerate([1, 2, 2, 3, 1]):
+        ring.append(code, timestamp)
+
+    assert ring.entries() == [(2, 2), (3, 3), (1, 4)]
+    assert ring.counts == [0, 1, 1, 1]
+    assert ring.latest() == 1
+    # All tied; the most recent wins
+    assert ring.dominant() == 1
+
+
+def test_ring_round_trips_into_a_smaller_capacity():
+    ring = EmotionRing(5, emotions=4)
+    for timestamp, code in enumerate([1, 1, 2, 3]):
+        ring.append(code, 1000 + timestamp)
+
+    data = ring.to_bytes()
+    assert len(data) == RING_HEADER.size + 5 * 4
+    restored = EmotionRing.from_bytes(data, capacity=2, emotions=4)
+    assert restored.entries() == [(2, 1002), (3, 1003)]
+    assert restored.counts == [0, 0, 1, 1]
+
+
+def test_unknown_ring_version_is_rejected():
+    with pytest.raises(ValueError):
+        EmotionRing.from_bytes(b'[{"emotion": "happy"}]')
+
+
+def test_patterns_summarize_the_history():
+    history = EmotionHistory(capacity=4)
+    assert history.patterns('u') == {}
+    for emotion in ['sad', 'happy', 'happy', 'sad', 'angry']:
+        history.record('u', emotion, timestamp=0)
+
+    patterns = history.patterns('u')
+    assert patterns['emotion_distribution'] == {'happy': 50.0, 'sad': 25.0, 'angry': 25.0}
+    assert patterns['recent_trend'] == 'angry'
+    assert patterns['dominant_emotion'] == 'happy'
+    assert patterns['total_interactions'] == 4
+    assert [entry['emotion'] for entry in history.recent('u', limit=2)] == ['sad', 'angry']
+    assert history.recent('u', limit=0) == []
+
+
+def test_history_survives_a_snapshot_restart(tmp_path):
+    path = str(tmp_path / 'state.snap')
+    snapshot = SnapshotManager(path=path)
+    history = EmotionHistory(snapshot, capacity=10)
+    history.record('u', 'happy', timestamp=100)
+    history.record('u', 'sad', timestamp=200)
+    snapshot.write()
+
+    restored = EmotionHistory(SnapshotManager(path=path), capacity=10)
+    assert 'u' in restored and 'v' not in restored
+    assert restored.recent('u') == history.recent('u')
+    assert restored.patterns('u') == history.patterns('u')
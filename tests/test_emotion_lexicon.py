@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from emotion_lexicon import EMOTIONS, EmotionLexicon, emotion_lexicon
+
+
+@pytest.mark.parametrize('text, emotion', [
+    ("I'm so happy today", 'happy'),
+    ('she smiled happily', 'happy'),
+    ('pure happiness', 'happy'),
+    ('this went terribly', 'sad'),
+    ('I loved it', 'happy'),
+    ('I hate this stupid phone', 'angry'),
+    ("I'm worried about tomorrow", 'stressed'),
+    ('set a reminder for badminton', 'neutral'),
+    ('say goodbye to everyone', 'neutral'),
+    ('', 'neutral'),
+    (None, 'neutral'),
+])
+def test_detect(text, emotion):
+    assert emotion_lexicon.detect(text) == emotion
+
+
+def test_inflections_of_one_keyword_count_once():
+    assert emotion_lexicon.score('love loved loving lovely') == {'happy': 1}
+    assert emotion_lexicon.score('happy and happily') == {'happy': 1}
+
+
+def test_ties_go_to_the_earlier_emotion():
+    # "worried" is listed under stressed before fearful
+    assert emotion_lexicon.score('worried') == {'stressed': 1, 'fearful': 1}
+    assert emotion_lexicon.detect('worried') == 'stressed'
+    assert emotion_lexicon.detect('sad but happy') == 'happy'
+
+
+def test_batch_scores_match_single_scores():
+    texts = ['so happy and great', 'terribly sad', 'open maps', 'wow amazing']
+    scores = emotion_lexicon.score_batch(texts)
+
+    assert scores.shape == (4, len(EMOTIONS)) and scores.dtype == np.int32
+    for row, text in zip(scores, texts):
+        assert {EMOTIONS[column]: int(count) for column, count in enumerate(row) if count} == emotion_lexicon.score(text)
+    assert emotion_lexicon.best(scores) == [emotion_lexicon.detect(text) for text in texts]
+
+
+def test_custom_lexicon():
+    lexicon = EmotionLexicon([('happy', ['Sunny'])])
+    assert lexicon.detect('sunnily') == 'happy'
+    assert lexicon.best(lexicon.score_batch(['cloudy'])) == ['neutral']
@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+
+from emotion_lexicon import EMOTIONS
+from emotion_model import EmotionModel, fit, load_model, split
+from emotional_intelligence import EmotionalIntelligence
+
+LABELS = ['neutral', 'happy', 'sad']
+
+
+def clusters(rng, per_class=40, width=4):
+    centers = np.eye(len(LABELS), width) * 10 + 100
+    design = np.vstack([center + rng.standard_normal((per_class, width)) for center in centers])
+    targets = np.repeat(np.arange(len(LABELS)), per_class)
+    return design, targets
+
+
+def test_fit_folds_standardization_into_the_weights():
+    rng = np.random.default_rng(0)
+    design, targets = clusters(rng)
+    model = fit(design, targets, LABELS, epochs=300)
+
+    # Raw, unstandardized inputs go straight into one matrix product
+    assert model.weights.dtype == np.float32 and model.weights.shape == (4, 3)
+    assert model.predict(design) == [LABELS[target] for target in targets]
+    probabilities = model.predict_proba(design)
+    np.testing.assert_allclose(probabilities.sum(axis=1), 1.0, rtol=1e-5)
+
+
+def test_save_and_load_round_trip_without_pickle(tmp_path):
+    model = EmotionModel(np.arange(6).reshape(2, 3), [0.5, 0, 0], LABELS, inputs='text')
+    path = str(tmp_path / 'model.npz')
+    model.save(path)
+
+    loaded = load_model(path)
+    assert loaded.labels == LABELS and loaded.inputs == 'text'
+    np.testing.assert_array_equal(loaded.weights, model.weights)
+    with np.load(path, allow_pickle=False) as data:
+        assert sorted(data.files) == ['bias', 'inputs', 'labels', 'weights']
+
+
+def test_missing_or_broken_model_falls_back_to_none(tmp_path):
+    assert load_model(str(tmp_path / 'missing.npz')) is None
+    broken = tmp_path / 'broken.npz'
+    broken.write_bytes(b'not a model')
+    assert load_model(str(broken)) is None
+
+
+def test_design_requires_the_trained_inputs():
+    model = EmotionModel(np.zeros((2 + len(EMOTIONS), 3)), np.zeros(3), LABELS, inputs='audio+text')
+    assert model.needs_audio and model.needs_text
+    assert model.design(np.ones((1, 2)), np.ones((1, len(EMOTIONS)))).shape == (1, 2 + len(EMOTIONS))
+    with pytest.raises(ValueError):
+        model.design(audio=np.ones((1, 2)))
+    with pytest.raises(ValueError):
+        EmotionModel(np.zeros((2, 3)), np.zeros(3), LABELS, inputs='video')
+
+
+def test_split_is_a_seeded_partition():
+    train, test = split(10, 0.3)
+    assert len(train) == 7 and len(test) == 3
+    assert sorted(np.concatenate([train, test])) == list(range(10))
+    np.testing.assert_array_equal(split(10, 0.3)[0], train)
+
+
+def test_text_model_drives_classification():
+    # Each keyword column votes for its own emotion
+    weights = np.eye(len(EMOTIONS))
+    model = EmotionModel(weights, np.zeros(len(EMOTIONS)), EMOTIONS, inputs='text')
+    ai = EmotionalIntelligence(model=model)
+
+    features = np.zeros((2, 28), dtype=np.float32)
+    assert ai.classify_batch(features, ['I am so happy', 'this is terrible']) == ['happy', 'sad']
+    assert ai.detect_emotion_from_voice_patterns('I hate this stupid phone') == 'angry'
+
+
+def test_audio_model_without_audio_uses_the_keyword_rules():
+    model = EmotionModel(np.zeros((28, 3)), [0, 0, 1], LABELS, inputs='audio')
+    ai = EmotionalIntelligence(model=model)
+
+    assert ai.classify_batch(np.zeros((1, 28))) == ['sad']
+    # No audio for a text-only request; the rules answer instead
+    assert ai.detect_emotion_from_voice_patterns('what a wonderful and awesome sunny day it has been today') == 'happy'
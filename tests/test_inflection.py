@@ -0,0 +1,37 @@
+import pytest
+
+from inflection import inflections
+
+
+@pytest.mark.parametrize('word, expected', [
+    ('call', {'calls', 'called', 'calling'}),
+    ('text', {'texts', 'texted', 'texting'}),
+    ('photo', {'photos'}),
+    ('launch', {'launches'}),
+    ('skip', {'skips', 'skipped', 'skipping'}),
+    ('stop', {'stopping'}),
+    ('hate', {'hates', 'hated', 'hating'}),
+    ('notify', {'notifies', 'notified', 'notifying'}),
+    ('play', {'plays', 'played', 'playing'}),
+])
+def test_plural_and_verb_forms(word, expected):
+    forms = inflections(word)
+    assert expected <= forms
+    assert word not in forms
+    assert not any(form.endswith('ness') for form in forms)
+
+
+@pytest.mark.parametrize('word, expected, wrong', [
+    ('happy', {'happily', 'happiness'}, {'happyly', 'happyness'}),
+    ('angry', {'angrily'}, {'angryly'}),
+    ('sad', {'sadly', 'sadness'}, set()),
+    ('terrible', {'terribly'}, {'terriblely'}),
+    ('incredible', {'incredibly'}, set()),
+    ('awful', {'awfully'}, set()),
+    ('nervous', {'nervously', 'nervousness'}, set()),
+])
+def test_derived_forms_change_y_to_i(word, expected, wrong):
+    forms = inflections(word, derived=True)
+    assert expected <= forms
+    assert not forms & wrong
+    assert not inflections(word) & expected
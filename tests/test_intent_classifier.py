@@ -0,0 +1,48 @@
+import pytest
+
+from intent_classifier import IntentClassifier, IntentMatch, command_intents
+
+
+@pytest.mark.parametrize('text, intent', [
+    ('open whatsapp', 'open'),
+    ('please launch the camera', 'open'),
+    ('calling mom', 'call'),
+    ('texted my sister', 'message'),
+    ('remind me to call mom', 'reminder'),
+    ("what's the weather forecast", 'weather'),
+    ('take a selfie', 'camera'),
+    ('show my photos', 'gallery'),
+    ('skipping this song', 'music'),
+    ('what can you do', 'help'),
+    ('blorp', None),
+    ('', None),
+])
+def test_classify(text, intent):
+    assert command_intents.classify(text).intent == intent
+
+
+def test_priority_decides_between_intents_and_score_is_the_share_of_hits():
+    match = command_intents.classify('play the song and open spotify')
+    assert match == IntentMatch('open', 0.333, ('open',))
+
+
+def test_listed_keyword_beats_an_inflection():
+    # "photos" is listed under gallery and also an inflection of camera's "photo"
+    assert command_intents.find_hits('photos') == {'gallery': ['photos']}
+    assert command_intents.classify('photos', intents={'camera'}).intent == 'camera'
+
+
+def test_multi_word_keywords_match_in_sequence():
+    assert command_intents.find_hits('so what can you do') == {'help': ['what can you do']}
+    assert command_intents.find_hits('what you can do') == {}
+
+
+def test_intents_restricts_the_candidates():
+    assert command_intents.classify('call and open maps', intents={'call'}) == IntentMatch('call', 1.0, ('call',))
+    assert command_intents.classify('open maps', intents=set()).intent is None
+
+
+def test_custom_table():
+    classifier = IntentClassifier([('lights', 10, ['light', 'lamp']), ('timer', 5, ['timer'])])
+    assert classifier.classify('turn on the lights').intent == 'lights'
+    assert classifier.classify('set two timers').hits == ('timers',)
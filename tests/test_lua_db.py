@@ -0,0 +1,186 @@
+import sqlite3
+
+import pytest
+
+from database.lua_db import LuaDatabase
+
+
+class V1Database(LuaDatabase):
+    """The tables as they were before versioned migrations"""
+    SCHEMA_VERSION = 1
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / 'lua.db')
+
+
+@pytest.fixture
+def db(db_path):
+    db = LuaDatabase(db_path)
+    yield db
+    db.close()
+
+
+def user_version(db):
+    return db.connection().execute("PRAGMA user_version").fetchone()[0]
+
+
+def insert_commands(db, rows):
+    """(user_id, success, timestamp) rows, written as raw INSERTs"""
+    with db.transaction() as conn:
+        conn.executemany(
+            "INSERT INTO commands (user_id, command_text, success, timestamp) VALUES (?, 'cmd', ?, ?)",
+            rows
+        )
+
+
+def test_new_database_is_at_current_version(db):
+    assert user_version(db) == LuaDatabase.SCHEMA_VERSION
+
+
+def test_v2_folds_duplicate_counters(db_path):
+    old = V1Database(db_path)
+    with old.transaction() as conn:
+        conn.executemany(
+            "INSERT INTO learning_patterns (user_id, pattern, action, confidence, usage_count, last_used) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            [('u', 'open maps', 'open', 0.6, 2, '2024-01-01 10:00:00'),
+             ('u', 'open maps', 'open', 0.9, 3, '2024-01-02 10:00:00'),
+             ('u', 'call mum', 'call', 0.7, 1, '2024-01-01 10:00:00')]
+        )
+        conn.executemany(
+            "INSERT INTO app_usage (user_id, app_name, package_name, usage_count) VALUES (?, ?, ?, ?)",
+            [('u', 'Maps', 'com.maps', 4), ('u', 'Maps', 'com.maps', 1)]
+        )
+    assert user_version(old) == 0
+    old.close()
+
+    db = LuaDatabase(db_path)
+    conn = db.connection()
+    assert conn.execute(
+        "SELECT usage_count, confidence, last_used FROM learning_patterns WHERE pattern = 'open maps'"
+    ).fetchall() == [(5, 0.9, '2024-01-02 10:00:00')]
+    assert conn.execute("SELECT COUNT(*) FROM learning_patterns").fetchone()[0] == 2
+    assert conn.execute("SELECT usage_count FROM app_usage").fetchall() == [(5,)]
+
+    # The unique keys the upserts rely on are in place
+    assert db.update_learning_pattern('u', 'open maps', 'open') == 1.0
+    with pytest.raises(sqlite3.IntegrityError):
+        with db.transaction() as conn:
+            conn.execute("INSERT INTO app_usage (user_id, app_name, package_name) VALUES ('u', 'Maps', 'com.maps')")
+    db.close()
+
+
+def test_upserts_count_in_one_row(db):
+    assert db.update_learning_pattern('u', 'open maps', 'open') == 0.6
+    assert db.update_learning_pattern('u', 'open maps', 'open') == 0.7
+    for _ in range(3):
+        db.update_app_usage('u', 'Maps', 'com.maps')
+
+    conn = db.connection()
+    assert conn.execute("SELECT usage_count FROM learning_patterns").fetchall() == [(2,)]
+    assert conn.execute("SELECT usage_count FROM app_usage").fetchall() == [(3,)]
+
+
+def test_migration_backfills_rollup_from_history(db_path):
+    old = V1Database(db_path)
+    insert_commands(old, [
+        ('u', True, '2024-01-01 10:00:00'),
+        ('u', False, '2024-01-03 10:00:00'),
+        ('u', True, '2024-01-02 10:00:00'),
+        ('v', False, '2024-01-01 09:00:00'),
+    ])
+    with old.transaction() as conn:
+        conn.execute("INSERT INTO app_usage (user_id, app_name, package_name) VALUES ('u', 'Maps', 'com.maps')")
+    old.close()
+
+    db = LuaDatabase(db_path)
+    stats = db.get_user_stats('u')
+    assert stats['total_commands'] == 3
+    assert stats['successful_commands'] == 2
+    assert stats['last_active'] == '2024-01-03 10:00:00'
+    assert stats['top_apps'] == [{'name': 'Maps', 'count': 1}]
+    assert db.get_user_stats('v')['success_rate'] == 0
+    db.close()
+
+
+def test_rollup_follows_inserts_and_deletes(db):
+    db.log_commands([('u', 'a', 'open', 'ok', True), ('u', 'b', 'call', 'ok', False)])
+    db.log_command('u', 'c', 'open', 'ok', True)
+    assert db.get_user_stats('u')['total_commands'] == 3
+    assert db.get_user_stats('u')['successful_commands'] == 2
+
+    with db.transaction() as conn:
+        conn.execute("DELETE FROM commands WHERE command_text = 'a'")
+    stats = db.get_user_stats('u')
+    assert (stats['total_commands'], stats['successful_commands']) == (2, 1)
+    assert stats['success_rate'] == 50.0
+
+
+def test_top_apps_rollup_keeps_the_five_most_used(db):
+    for count, package in enumerate(['a', 'b', 'c', 'd', 'e', 'f'], start=1):
+        for _ in range(count):
+            db.update_app_usage('u', package.upper(), f'com.{package}')
+
+    top_apps = db.get_user_stats('u')['top_apps']
+    assert [app['name'] for app in top_apps] == ['F', 'E', 'D', 'C', 'B']
+    assert top_apps[0]['count'] == 6
+
+
+def test_unknown_user_has_empty_stats(db):
+    assert db.get_user_stats('nobody') == {
+        'total_commands': 0,
+        'successful_commands': 0,
+        'success_rate': 0,
+        'last_active': None,
+        'top_apps': []
+    }
+
+
+def test_rebuild_user_stats_repairs_the_rollup(db):
+    insert_commands(db, [('u', True, '2024-01-01 10:00:00'), ('w', False, '2024-01-01 10:00:00')])
+    db.update_app_usage('u', 'Maps', 'com.maps')
+    db.update_app_usage('x', 'Clock', 'com.clock')
+    expected = {user_id: db.get_user_stats(user_id) for user_id in ('u', 'w', 'x')}
+
+    with db.transaction() as conn:
+        conn.execute("UPDATE user_stats_rollup SET total_commands = 99, top_apps = '[]'")
+        conn.execute("DELETE FROM user_stats_rollup WHERE user_id = 'w'")
+
+    assert db.rebuild_user_stats() == 3
+    assert {user_id: db.get_user_stats(user_id) for user_id in ('u', 'w', 'x')} == expected
+
+
+def test_pattern_version_changes_on_every_write(db):
+    assert db.get_learning_pattern_version('u') == 'v0'
+    db.update_learning_pattern('u', 'open maps', 'open')
+    first = db.get_learning_pattern_version('u')
+    db.update_learning_pattern('u', 'open maps', 'open')
+    second = db.get_learning_pattern_version('u')
+    with db.transaction() as conn:
+        conn.execute("DELETE FROM learning_patterns WHERE user_id = 'u'")
+
+    assert len({'v0', first, second, db.get_learning_pattern_version('u')}) == 4
+    # Other users keep their version
+    assert db.get_learning_pattern_version('v') == 'v0'
+
+
+def test_pattern_version_is_a_key_lookup(db):
+    plan = db.connection().execute(
+        "EXPLAIN QUERY PLAN SELECT version FROM learning_pattern_versions WHERE user_id = ?", ('u',)
+    ).fetchall()
+    assert [row[-1] for row in plan] == [
+        'SEARCH learning_pattern_versions USING INDEX sqlite_autoindex_learning_pattern_versions_1 (user_id=?)'
+    ]
+
+
+def test_migration_starts_versions_for_existing_patterns(db_path):
+    old = V1Database(db_path)
+    with old.transaction() as conn:
+        conn.execute("INSERT INTO learning_patterns (user_id, pattern, action) VALUES ('u', 'open maps', 'open')")
+    old.close()
+
+    db = LuaDatabase(db_path)
+    assert db.get_learning_pattern_version('u') != 'v0'
+    db.close()
@@ -0,0 +1,146 @@
+import pytest
+
+from database.lua_db import LuaDatabase
+from pattern_cache import PATTERN_SECTION, LearnedPatternCache, decode_entry
+from state_snapshot import Snapshot, write_snapshot
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = LuaDatabase(str(tmp_path / 'lua.db'))
+    yield db
+    db.close()
+
+
+class Loader:
+    """Reads a user's patterns from the database and counts the reads"""
+
+    def __init__(self, db):
+        self.db = db
+        self.calls = 0
+
+    def __call__(self, user_id):
+        self.calls += 1
+        return self.db.get_learning_patterns(user_id)
+
+
+def make_cache(db, snapshot=None, **kwargs):
+    loader = Loader(db)
+    cache = LearnedPatternCache(loader, snapshot=snapshot, version=db.get_learning_pattern_version, **kwargs)
+    return cache, loader
+
+
+def snapshot_of(cache, tmp_path):
+    path = str(tmp_path / 'patterns.snap')
+    write_snapshot(path, {PATTERN_SECTION: cache.snapshot_items()})
+    return Snapshot(path).section(PATTERN_SECTION)
+
+
+def patterns(index):
+    return sorted((entry['pattern'], entry['action']) for entry in index.entries)
+
+
+def test_recorded_writes_reach_the_resident_index(db):
+    cache, loader = make_cache(db)
+    cache.get('u')
+    confidence = db.update_learning_pattern('u', 'open maps', 'open')
+    cache.record('u', 'open maps', 'open', confidence)
+
+    assert patterns(cache.get('u')) == [('open maps', 'open')]
+    assert loader.calls == 1
+    assert cache.stats()['hits'] == 1
+
+
+def test_writes_for_users_not_resident_are_read_on_the_next_get(db):
+    cache, loader = make_cache(db)
+    cache.record('u', 'open maps', 'open', 0.6)
+    db.update_learning_pattern('u', 'open maps', 'open')
+
+    assert patterns(cache.get('u')) == [('open maps', 'open')]
+    assert loader.calls == 1
+
+
+def test_snapshot_round_trip_restores_without_reading_the_table(db, tmp_path):
+    db.update_learning_pattern('u', 'open maps', 'open')
+    db.update_learning_pattern('u', 'call mum', 'call')
+    cache, _ = make_cache(db)
+    cache.get('u')
+
+    restored, loader = make_cache(db, snapshot_of(cache, tmp_path))
+    assert patterns(restored.get('u')) == [('call mum', 'call'), ('open maps', 'open')]
+    assert loader.calls == 0
+    assert restored.stats()['snapshot_restores'] == 1
+
+
+def test_snapshot_entry_is_rejected_after_a_later_write(db, tmp_path):
+    db.update_learning_pattern('u', 'open maps', 'open')
+    cache, _ = make_cache(db)
+    cache.get('u')
+    section = snapshot_of(cache, tmp_path)
+
+    # Committed after the dump, e.g. by another process
+    db.update_learning_pattern('u', 'play jazz', 'music')
+
+    restored, loader = make_cache(db, section)
+    assert patterns(restored.get('u')) == [('open maps', 'open'), ('play jazz', 'music')]
+    assert loader.calls == 1
+    assert restored.stats()['snapshot_rejects'] == 1
+
+
+def test_snapshot_is_ignored_without_a_version(db, tmp_path):
+    db.update_learning_pattern('u', 'open maps', 'open')
+    cache, _ = make_cache(db)
+    cache.get('u')
+
+    loader = Loader(db)
+    unversioned = LearnedPatternCache(loader, snapshot=snapshot_of(cache, tmp_path))
+    unversioned.get('u')
+    assert loader.calls == 1
+
+
+def test_recorded_writes_are_dumped_with_a_fresh_version(db, tmp_path):
+    cache, _ = make_cache(db)
+    cache.get('u')
+    confidence = db.update_learning_pattern('u', 'open maps', 'open')
+    cache.record('u', 'open maps', 'open', confidence)
+
+    version, rows = decode_entry(cache.snapshot_items()['u'])
+    assert version == db.get_learning_pattern_version('u')
+    assert [(pattern, action) for pattern, action, _ in rows] == [('open maps', 'open')]
+
+
+def test_untouched_snapshot_entries_are_carried_over(db, tmp_path):
+    db.update_learning_pattern('cold', 'open maps', 'open')
+    cache, _ = make_cache(db)
+    cache.get('cold')
+    section = snapshot_of(cache, tmp_path)
+
+    restored, _ = make_cache(db, section)
+    assert bytes(restored.snapshot_items()['cold']) == bytes(section.get('cold'))
+
+
+def test_least_recently_used_users_are_evicted(db):
+    cache, loader = make_cache(db, max_users=2)
+    cache.get('a')
+    cache.get('b')
+    cache.get('a')
+    cache.get('c')
+
+    stats = cache.stats()
+    assert (stats['users'], stats['evictions']) == (2, 1)
+    cache.get('a')
+    assert loader.calls == 3
+    cache.get('b')
+    assert loader.calls == 4
+
+
+def test_pattern_budget_evicts_cold_users(db):
+    for n in range(3):
+        db.update_learning_pattern('big', f'open app {n}', 'open')
+    db.update_learning_pattern('small', 'call mum', 'call')
+    cache, _ = make_cache(db, max_patterns=3)
+
+    cache.get('big')
+    cache.get('small')
+    stats = cache.stats()
+    assert (stats['users'], stats['patterns']) == (1, 1)
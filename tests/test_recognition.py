@@ -0,0 +1,155 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import speech_recognition as sr
+
+from recognition import NO_RESULT, GoogleSpeechEngine, RecognitionScheduler
+
+AUDIO = sr.AudioData(b'\x00\x00' * 1600, 16000, 2)
+
+
+class StubGoogle(BaseHTTPRequestHandler):
+    """Answers like www.google.com/speech-api/v2/recognize after server.delay"""
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.server.requests += 1
+        time.sleep(self.server.delay)
+        if self.server.status != 200:
+            self.send_response(self.server.status)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        body = '{"result":[]}\n' + json.dumps({
+            'result': [{'alternative': [
+                {'transcript': 'open whatsapp', 'confidence': self.server.confidence},
+                {'transcript': 'open what sap'}
+            ], 'final': True}],
+            'result_index': 0
+        }) + '\n'
+        payload = body.encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def google():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubGoogle)
+    server.delay, server.status, server.confidence, server.requests = 0.0, 200, 0.93, 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    engine = GoogleSpeechEngine(url=f'http://127.0.0.1:{server.server_address[1]}/recognize', key='stub')
+    engine.server = server
+    yield engine
+    server.shutdown()
+    server.server_close()
+
+
+class Offline:
+    """Stands in for Sphinx: a fixed decode time and confidence"""
+    name = 'sphinx'
+
+    def __init__(self, delay=0.0, confidence=0.7):
+        self.delay = delay
+        self.confidence = confidence
+        self.calls = 0
+
+    def recognize(self, audio, language='en-US'):
+        self.calls += 1
+        time.sleep(self.delay)
+        return {'engine': self.name, 'text': 'open whatsapp', 'confidence': self.confidence}
+
+
+@pytest.fixture
+def scheduler():
+    schedulers = []
+
+    def make(engines, **kwargs):
+        kwargs.setdefault('hedge_delay_ms', 100)
+        kwargs.setdefault('deadline_ms', 2000)
+        schedulers.append(RecognitionScheduler(engines, **kwargs))
+        return schedulers[-1]
+
+    yield make
+    for s in schedulers:
+        s.close()
+
+
+def test_google_engine_picks_the_most_confident_alternative(google):
+    result = google.recognize(AUDIO)
+    assert (result['engine'], result['text'], result['confidence']) == ('google', 'open whatsapp', 0.93)
+
+
+def test_fast_primary_wins_before_the_fallback_starts(google, scheduler):
+    offline = Offline()
+    result = scheduler([google, offline]).recognize(AUDIO)
+
+    assert result['engine'] == 'google'
+    assert 'latency_ms' in result
+    assert offline.calls == 0
+
+
+def test_slow_primary_is_hedged_by_the_fallback(google, scheduler):
+    google.server.delay = 1.0
+    started = time.monotonic()
+    result = scheduler([google, Offline()]).recognize(AUDIO)
+
+    assert result['engine'] == 'sphinx'
+    assert time.monotonic() - started < 0.8
+
+
+def test_failed_primary_hands_over_at_once(google, scheduler):
+    google.server.status = 500
+    started = time.monotonic()
+    result = scheduler([google, Offline()], hedge_delay_ms=1000).recognize(AUDIO)
+
+    assert result['engine'] == 'sphinx'
+    assert time.monotonic() - started < 0.8
+
+
+def test_weak_results_fall_back_to_the_best_seen(google, scheduler):
+    google.server.confidence = 0.4
+    result = scheduler([google, Offline(confidence=0.5)]).recognize(AUDIO)
+    assert (result['engine'], result['confidence']) == ('sphinx', 0.5)
+
+
+def test_deadline_bounds_the_call(google, scheduler):
+    google.server.delay = 1.0
+    started = time.monotonic()
+    result = scheduler([google, Offline(delay=1.0)], deadline_ms=300).recognize(AUDIO)
+
+    assert result == NO_RESULT
+    assert time.monotonic() - started < 0.6
+
+
+class LibraryRecognizer:
+    """Records recognize_google calls made without a key of our own"""
+
+    def __init__(self, result):
+        self.result = result
+        self.calls = []
+
+    def recognize_google(self, audio, language='en-US', show_all=False):
+        self.calls.append((language, show_all))
+        return self.result
+
+
+def test_without_a_key_the_library_default_key_is_used(monkeypatch):
+    monkeypatch.delenv('LUA_GOOGLE_SPEECH_KEY', raising=False)
+    recognizer = LibraryRecognizer({'alternative': [{'transcript': 'call mum', 'confidence': 0.8}], 'final': True})
+    engine = GoogleSpeechEngine(recognizer=recognizer)
+
+    assert engine.recognize(AUDIO, 'en-GB') == {'engine': 'google', 'text': 'call mum', 'confidence': 0.8}
+    assert recognizer.calls == [('en-GB', True)]
+    # show_all answers [] when nothing was recognized
+    recognizer.result = []
+    assert engine.recognize(AUDIO) is None
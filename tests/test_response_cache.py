@@ -0,0 +1,67 @@
+import pytest
+
+import response_cache
+from response_cache import ResponseCache, cacheable
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(response_cache.time, 'monotonic', clock)
+    return clock
+
+
+def test_response_key_normalizes_text_and_adds_context():
+    cache = ResponseCache(max_entries=4, ttl=60)
+    assert cache.make_key('  Open   Maps ') == ('open maps',)
+    assert cache.make_key('open maps', {'lang': 'en', 'other': 1}, ('lang',)) == ('open maps', 'en')
+
+
+def test_response_cache_evicts_least_recently_used(clock):
+    cache = ResponseCache(max_entries=2, ttl=60)
+    cache.put(('a',), {'n': 1})
+    cache.put(('b',), {'n': 2})
+    assert cache.get(('a',)) == {'n': 1}
+    cache.put(('c',), {'n': 3})
+
+    assert cache.get(('b',)) is None
+    assert cache.get(('a',)) == {'n': 1}
+    assert cache.stats()['evictions'] == 1
+
+
+def test_response_cache_entries_expire(clock):
+    cache = ResponseCache(max_entries=2, ttl=60)
+    cache.put(('a',), {'n': 1})
+    clock.now += 59
+    assert cache.get(('a',)) == {'n': 1}
+    clock.now += 2
+    assert cache.get(('a',)) is None
+
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['expirations'], stats['size']) == (1, 1, 1, 0)
+
+
+def test_response_cache_hands_out_deep_copies():
+    cache = ResponseCache(max_entries=2, ttl=60)
+    result = {'weather_data': {'temperature': '25°C'}}
+    cache.put(('w',), result)
+    result['weather_data']['temperature'] = 'changed'
+    cache.get(('w',))['weather_data']['temperature'] = 'changed'
+
+    assert cache.get(('w',)) == {'weather_data': {'temperature': '25°C'}}
+
+
+def test_cacheable_marks_the_handler():
+    @cacheable
+    def handler(text):
+        return {}
+
+    assert handler.cacheable is True
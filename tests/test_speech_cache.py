@@ -0,0 +1,96 @@
+import os
+
+from speech_cache import SpeechCache
+
+
+def test_speech_cache_evicts_by_bytes(tmp_path):
+    cache = SpeechCache(str(tmp_path), max_bytes=10)
+    cache.put('aa01', b'12345')
+    cache.put('bb02', b'12345')
+    assert cache.get('aa01') == b'12345'
+    cache.put('cc03', b'123')
+
+    assert cache.get('bb02') is None
+    assert not os.path.exists(cache.path('bb02'))
+    assert cache.stats()['bytes'] == 8
+
+
+def test_speech_cache_index_survives_a_restart(tmp_path):
+    cache = SpeechCache(str(tmp_path), max_bytes=10)
+    cache.put('aa01', b'12345')
+    cache.put('bb02', b'12345')
+    os.utime(cache.path('aa01'), (1, 1))
+    stale = os.path.join(str(tmp_path), 'bb', '.tmp-crash')
+    open(stale, 'wb').close()
+    os.utime(stale, (1, 1))
+    # Possibly still being written by another process
+    fresh = os.path.join(str(tmp_path), 'bb', '.tmp-rendering')
+    open(fresh, 'wb').close()
+
+    restored = SpeechCache(str(tmp_path), max_bytes=10)
+    # Nothing is read until the cache is first used
+    assert not restored.stats()['loaded']
+    assert os.path.exists(stale)
+
+    restored.load()
+    assert not os.path.exists(stale)
+    assert os.path.exists(fresh)
+    assert restored.stats()['entries'] == 2
+    # Oldest mtime is least recently used
+    restored.put('cc03', b'1')
+    assert restored.get('aa01') is None
+    assert restored.get('bb02') == b'12345'
+
+
+def test_first_lookup_loads_the_index(tmp_path):
+    SpeechCache(str(tmp_path)).put('aa01', b'12345')
+
+    restored = SpeechCache(str(tmp_path))
+    assert restored.get('aa01') == b'12345'
+    assert restored.stats()['loaded']
+
+
+def test_exported_file_outlives_eviction(tmp_path):
+    cache = SpeechCache(str(tmp_path / 'cache'), max_bytes=10)
+    cache.put('aa01', b'12345')
+    destination = str(tmp_path / 'reply.wav')
+    open(destination, 'wb').close()
+
+    assert cache.export('aa01', destination)
+    cache.put('bb02', b'1234567890')
+    assert cache.get('aa01') is None
+    with open(destination, 'rb') as f:
+        assert f.read() == b'12345'
+    assert not cache.export('aa01', str(tmp_path / 'missing.wav'))
+    assert sorted(os.listdir(str(tmp_path))) == ['cache', 'reply.wav']
+
+
+class FakeTTS:
+    def __init__(self):
+        self.renders = 0
+
+    def tts_to_file(self, text, file_path):
+        self.renders += 1
+        with open(file_path, 'wb') as f:
+            f.write(text.encode('utf-8'))
+
+
+def test_generated_speech_is_the_callers_own_file(tmp_path):
+    from voice_cloner import VoiceCloner
+
+    cloner = VoiceCloner()
+    cloner.speech_cache = SpeechCache(str(tmp_path / 'cache'), max_bytes=13)
+    cloner._tts, cloner._tts_loaded = FakeTTS(), True
+
+    first = cloner.generate_speech('Opening maps')
+    second = cloner.generate_speech('Opening maps')
+    assert second['cached'] and cloner.tts.renders == 1
+    assert first['audio_path'] != second['audio_path']
+
+    # Evicting the entry leaves both replies readable
+    os.unlink(cloner.generate_speech('Pausing music')['audio_path'])
+    assert cloner.speech_cache.stats()['evictions'] == 1
+    for result in (first, second):
+        with open(result['audio_path'], 'rb') as f:
+            assert f.read() == b'Opening maps'
+        os.unlink(result['audio_path'])
@@ -0,0 +1,74 @@
+import time
+
+from state_snapshot import Snapshot, SnapshotBackedDict, SnapshotManager, encode_json, write_snapshot
+
+
+def test_round_trip_by_section_and_key(tmp_path):
+    path = str(tmp_path / 'state.snap')
+    write_snapshot(path, {
+        'users': {'bob': b'2', 'alice': b'1', 'café': b'3'},
+        'empty': {},
+    })
+
+    snapshot = Snapshot(path)
+    assert sorted(snapshot.sections()) == ['empty', 'users']
+    users = snapshot.section('users')
+    assert len(users) == 3
+    assert bytes(users.get('alice')) == b'1'
+    assert bytes(users.get('café')) == b'3'
+    assert users.get('zed') is None
+    assert 'bob' in users and 'zed' not in users
+    assert list(users.keys()) == ['alice', 'bob', 'café']
+    assert len(snapshot.section('empty')) == 0
+    assert snapshot.section('missing') is None
+
+
+def test_manager_writes_registered_sections_and_reloads_them(tmp_path):
+    path = str(tmp_path / 'state.snap')
+    manager = SnapshotManager(path=path)
+    assert manager.section('counts') is None
+
+    manager.register('counts', lambda: {'u': encode_json({'n': 1})})
+    manager.register('broken', lambda: 1 / 0)
+    manager.write()
+
+    restored = SnapshotManager(path=path)
+    assert bytes(restored.section('counts').get('u')) == b'{"n":1}'
+    # A failing provider is left out rather than failing the write
+    assert restored.section('broken') is None
+
+
+def test_manager_ignores_old_or_unreadable_snapshots(tmp_path):
+    path = str(tmp_path / 'state.snap')
+    write_snapshot(path, {'counts': {'u': b'1'}})
+    assert SnapshotManager(path=path, max_age=3600).section('counts') is not None
+    # Age comes from the header's written_at
+    time.sleep(0.01)
+    assert SnapshotManager(path=path, max_age=0.005).snapshot is None
+
+    with open(path, 'wb') as f:
+        f.write(b'not a snapshot')
+    assert SnapshotManager(path=path).snapshot is None
+
+
+def test_backed_dict_faults_in_and_carries_untouched_keys_over(tmp_path):
+    path = str(tmp_path / 'state.snap')
+    write_snapshot(path, {'h': {
+        'kept': encode_json([1]),
+        'read': encode_json([2]),
+        'dropped': encode_json([3]),
+    }})
+    values = SnapshotBackedDict(Snapshot(path).section('h'))
+
+    assert dict.__len__(values) == 0
+    assert values['read'] == [2]
+    values['read'].append(20)
+    values['new'] = [4]
+    del values['dropped']
+    assert 'dropped' not in values
+    assert values.get('missing') is None
+
+    items = values.snapshot_items()
+    assert sorted(items) == ['kept', 'new', 'read']
+    assert items['kept'] == encode_json([1])
+    assert items['read'] == encode_json([2, 20])
@@ -0,0 +1,100 @@
+import math
+
+import numpy as np
+
+from text_index import AppNameIndex, LearnedPatternIndex
+
+ACTIONS = {'open': None, 'call': None}
+
+
+def cosine(a, b):
+    counts_a, counts_b = {}, {}
+    for token in a:
+        counts_a[token] = counts_a.get(token, 0) + 1
+    for token in b:
+        counts_b[token] = counts_b.get(token, 0) + 1
+    dot = sum(count * counts_b.get(token, 0) for token, count in counts_a.items())
+    norm = math.sqrt(sum(c * c for c in counts_a.values())) * math.sqrt(sum(c * c for c in counts_b.values()))
+    return dot / norm if norm else 0.0
+
+
+def test_scores_are_exact_cosine_over_unstopped_tokens():
+    index = LearnedPatternIndex(initial_capacity=1)
+    patterns = ['open the maps app', 'call mom on her phone', 'open maps maps', 'play some jazz music']
+    for pattern in patterns:
+        index.upsert(pattern, 'open', 0.9)
+
+    query = 'please open maps'
+    expected = [cosine(index.features(query), index.features(pattern)) for pattern in patterns]
+    np.testing.assert_allclose(index.score(query), expected, rtol=1e-6)
+    # Stop words are left out, and a word the index never saw still counts in the norm
+    assert index.features('open the maps') == ['open', 'maps']
+    assert 0 < index.score('open maps tomorrow')[0] < 1
+
+
+def test_batch_scores_match_single_scores():
+    index = LearnedPatternIndex()
+    for pattern in ['open maps', 'call mom', 'open camera']:
+        index.upsert(pattern, 'open', 0.9)
+
+    texts = ['open maps', 'call my mom', 'nothing known', '']
+    batch = index.score_batch(texts)
+    assert batch.shape == (4, 3)
+    for row, text in zip(batch, texts):
+        np.testing.assert_allclose(row, index.score(text), rtol=1e-6)
+
+
+def test_best_match_respects_threshold_confidence_and_actions():
+    index = LearnedPatternIndex()
+    index.upsert('open maps', 'open', 0.9)
+    index.upsert('open maps app', 'call', 0.9)
+    index.upsert('call mom', 'call', 0.4)
+
+    assert index.best_match('open maps')['action'] == 'open'
+    assert index.best_match('open maps', actions={'call'})['pattern'] == 'open maps app'
+    # Below min_confidence until it is learned again
+    assert index.best_match('call mom', actions=ACTIONS) is None
+    index.upsert('call mom', 'call', 0.7)
+    assert len(index) == 3
+    assert index.best_match('call mom')['confidence'] == 0.7
+    assert index.best_match('weather today') is None
+    assert index.best_matches(['open maps', 'call mom', 'jazz']) == [
+        index.entries[0], index.entries[2], None
+    ]
+
+
+def test_empty_index_matches_nothing():
+    index = LearnedPatternIndex()
+    assert index.best_matches(['open maps', 'call mom']) == [None, None]
+    assert index.score('open maps').shape == (0,)
+
+
+APPS = {'whatsapp': 'com.whatsapp', 'instagram': 'com.instagram.android', 'youtube': 'com.google.android.youtube',
+        'google maps': 'com.google.android.apps.maps', 'spotify': 'com.spotify.music'}
+
+
+def test_app_names_tolerate_typos_and_spacing():
+    index = AppNameIndex(APPS)
+    assert index.best_match('open whatsap') == 'whatsapp'
+    assert index.best_match('launch insta gram') == 'instagram'
+    assert index.best_match('play something on you tube') == 'youtube'
+    assert index.best_match('open google maps') == 'google maps'
+    assert index.best_match('set an alarm') is None
+
+
+def test_match_ranks_candidates():
+    index = AppNameIndex(APPS)
+    candidates = index.match('spotifi', threshold=0.1)
+    assert candidates[0][0] == 'spotify'
+    assert [score for _, score in candidates] == sorted((score for _, score in candidates), reverse=True)
+    assert AppNameIndex().match('spotify') == []
+
+
+def test_apps_registered_at_runtime_are_matched():
+    index = AppNameIndex(APPS)
+    index.add('Zomato', 'com.application.zomato')
+    index.add('spotify', 'com.spotify.lite')
+
+    assert index.best_match('order from zomatoo') == 'zomato'
+    assert index.packages['spotify'] == 'com.spotify.lite'
+    assert index.names.count('spotify') == 1
@@ -0,0 +1,109 @@
+import threading
+import time
+from collections import namedtuple
+
+import pytest
+
+from speech_cache import SpeechCache
+from tts_worker import TTSBusy, TTSWorker
+
+Voice = namedtuple('Voice', ['id', 'name'])
+
+
+class FakeEngine:
+    def __init__(self, gate=None):
+        self.properties = {'voices': [Voice('v1', 'David Male'), Voice('v2', 'Zira Female')]}
+        self.threads = set()
+        self.gate = gate
+        self.pending = []
+
+    def getProperty(self, name):
+        self.threads.add(threading.get_ident())
+        return self.properties.get(name)
+
+    def setProperty(self, name, value):
+        self.threads.add(threading.get_ident())
+        self.properties[name] = value
+
+    def save_to_file(self, text, path):
+        self.pending.append((text, path))
+
+    def runAndWait(self):
+        self.threads.add(threading.get_ident())
+        if self.gate is not None:
+            self.gate.wait(5)
+        for text, path in self.pending:
+            with open(path, 'wb') as f:
+                f.write(text.encode('utf-8'))
+        self.pending = []
+
+
+def make_worker(tmp_path, monkeypatch, engine, **kwargs):
+    monkeypatch.setenv('LUA_TTS_TMPDIR', str(tmp_path))
+    return TTSWorker(engine_factory=lambda: engine, **kwargs)
+
+
+def test_worker_renders_on_its_own_thread(tmp_path, monkeypatch):
+    engine = FakeEngine()
+    worker = make_worker(tmp_path, monkeypatch, engine, rate=180)
+
+    assert worker.synthesize('Opening maps', timeout=5) == b'Opening maps'
+    assert worker.voice == 'v2'
+    assert engine.properties['voice'] == 'v2' and engine.properties['rate'] == 180
+    assert engine.threads == {worker._thread.ident}
+    # Render files are removed once read
+    assert list(tmp_path.iterdir()) == []
+    worker.close()
+    assert worker.stats()['rendered'] == 1
+
+
+def test_cached_reply_skips_the_engine(tmp_path, monkeypatch):
+    engine = FakeEngine()
+    cache = SpeechCache(str(tmp_path / 'cache'))
+    (tmp_path / 'render').mkdir()
+    worker = make_worker(tmp_path / 'render', monkeypatch, engine, cache=cache)
+
+    assert worker.synthesize('Pausing music', timeout=5) == b'Pausing music'
+    assert worker.synthesize('Pausing music', timeout=5) == b'Pausing music'
+    worker.close()
+
+    assert worker.stats()['rendered'] == 1
+    assert worker.stats()['cache']['entries'] == 1
+
+
+def test_full_queue_rejects_new_text(tmp_path, monkeypatch):
+    gate = threading.Event()
+    worker = make_worker(tmp_path, monkeypatch, FakeEngine(gate), max_queue=1)
+
+    first = worker.submit('one')
+    # Wait for the worker to take the first job, leaving the queue empty
+    while worker._jobs.qsize():
+        time.sleep(0.01)
+    worker.submit('two')
+    with pytest.raises(TTSBusy):
+        worker.submit('three')
+    assert worker.stats()['rejected'] == 1
+
+    gate.set()
+    assert first.result(5) == b'one'
+    worker.close()
+
+
+def test_missing_engine_fails_each_request(tmp_path, monkeypatch):
+    def broken():
+        raise ImportError('no driver')
+
+    monkeypatch.setenv('LUA_TTS_TMPDIR', str(tmp_path))
+    worker = TTSWorker(engine_factory=broken)
+
+    with pytest.raises(RuntimeError, match='unavailable'):
+        worker.synthesize('hello', timeout=5)
+    worker.close()
+    assert worker.stats()['failed'] == 1
+
+
+def test_closed_worker_refuses_work(tmp_path, monkeypatch):
+    worker = make_worker(tmp_path, monkeypatch, FakeEngine())
+    worker.close()
+    with pytest.raises(RuntimeError, match='closed'):
+        worker.submit('hello')
@@ -0,0 +1,120 @@
+import json
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from state_snapshot import SnapshotManager
+from user_registry import BloomFilter, UserLog, UserRegistry
+
+
+class FakeClient:
+    """users table as a set, answering the registry's two queries"""
+
+    def __init__(self, users=(), primary=None):
+        self.users = set(users)
+        if primary is not None:
+            self.primary = primary
+        self.queries = 0
+
+    def execute(self, sql, args=()):
+        self.queries += 1
+        if sql.startswith("SELECT 1"):
+            return SimpleNamespace(rows=[(1,)] if args[0] in self.users else [])
+        return SimpleNamespace(rows=[(user_id,) for user_id in self.users])
+
+
+@pytest.fixture
+def log_path(tmp_path):
+    return str(tmp_path / 'users.log')
+
+
+def log_lines(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_bloom_filter_has_no_false_negatives_and_round_trips():
+    bloom = BloomFilter(1000)
+    for index in range(1000):
+        bloom.add(f'user-{index}')
+
+    restored = BloomFilter.from_bytes(bloom.to_bytes(), 1000)
+    assert all(f'user-{index}' in restored for index in range(1000))
+    assert restored.count == 1000
+    false_positives = sum(f'other-{index}' in restored for index in range(10000))
+    assert false_positives < 300
+
+    with pytest.raises(ValueError):
+        BloomFilter.from_bytes(bloom.to_bytes()[:-1], 1000)
+
+
+def test_log_mode_remembers_users_across_restarts(log_path):
+    registry = UserRegistry(log_path=log_path)
+    assert 'u' not in registry
+    registry.add('u')
+    assert 'u' in registry
+
+    restarted = UserRegistry(log_path=log_path)
+    assert 'u' in restarted and 'v' not in restarted
+    assert restarted.stats()['restored_from'] == 'log'
+
+
+def test_snapshot_restore_reads_only_the_log_tail(log_path, tmp_path):
+    snapshot_path = str(tmp_path / 'state.snap')
+    snapshot = SnapshotManager(path=snapshot_path)
+    registry = UserRegistry(log_path=log_path, snapshot=snapshot)
+    registry.add('before')
+    snapshot.write()
+    registry.add('after')
+
+    restarted = UserRegistry(log_path=log_path, snapshot=SnapshotManager(path=snapshot_path))
+    assert restarted.stats()['restored_from'] == 'snapshot'
+    assert 'before' in restarted and 'after' in restarted
+
+
+def test_log_is_compacted_after_enough_appends(log_path):
+    registry = UserRegistry(log_path=log_path, compact_every=3)
+    # Duplicates left by racing first requests, and a torn line from a crash
+    with open(log_path, 'a') as f:
+        f.write('"a"\n"a"\n"a"\n"b\n')
+    for user_id in ('x', 'y', 'z'):
+        registry.add(user_id)
+
+    deadline = time.monotonic() + 5
+    while registry.stats()['compactions'] == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert registry.stats()['compactions'] == 1
+    assert log_lines(log_path) == ['a', 'x', 'y', 'z']
+
+
+def test_compacting_a_clean_log_leaves_it_alone(log_path):
+    log = UserLog(log_path)
+    log.append('a')
+    log.append('b')
+    inode, _ = log.identity()
+
+    assert log.compact() == 0
+    assert log.identity()[0] == inode
+
+
+def test_filter_hits_are_confirmed_on_the_primary():
+    primary = FakeClient({'old'})
+    # The replica hasn't caught up with 'old' yet
+    replica = FakeClient(primary=primary)
+    registry = UserRegistry(replica)
+
+    assert 'old' in registry
+    assert 'new' not in registry
+    assert replica.queries == 0
+    # Confirmed once, then answered from the recent-user cache
+    assert 'old' in registry
+    assert registry.stats()['cache_hits'] == 1
+
+
+def test_false_positive_is_counted():
+    registry = UserRegistry(FakeClient({'old'}), capacity=10)
+    registry.bloom.add('ghost')
+
+    assert 'ghost' not in registry
+    assert registry.stats()['false_positives'] == 1
@@ -0,0 +1,139 @@
+import threading
+
+import pytest
+
+from write_behind import WriteBehindQueue
+
+
+class Recorder:
+    """flush() target that keeps every batch; can be held until released"""
+
+    def __init__(self, hold=False):
+        self.batches = []
+        self.started = threading.Event()
+        self.release = threading.Event()
+        if not hold:
+            self.release.set()
+
+    def __call__(self, rows):
+        self.started.set()
+        self.release.wait(5)
+        self.batches.append(list(rows))
+
+    @property
+    def rows(self):
+        return [row for batch in self.batches for row in batch]
+
+
+def test_rejects_unknown_overflow_policy():
+    with pytest.raises(ValueError):
+        WriteBehindQueue(Recorder(), overflow='spill')
+
+
+def test_batches_preserve_order_and_size_limit():
+    flush = Recorder()
+    log = WriteBehindQueue(flush, batch_size=10, flush_interval_ms=10000)
+    assert log.put_many(range(25)) == 25
+    log.close()
+
+    assert flush.rows == list(range(25))
+    assert all(len(batch) <= 10 for batch in flush.batches)
+    assert log.stats()['written'] == 25
+    assert log.stats()['batches'] == len(flush.batches)
+
+
+def test_partial_batch_is_flushed_after_the_interval():
+    flush = Recorder()
+    log = WriteBehindQueue(flush, batch_size=100, flush_interval_ms=20)
+    log.put_many(['a', 'b', 'c'])
+
+    assert flush.started.wait(2)
+    log.close()
+    assert flush.batches == [['a', 'b', 'c']]
+
+
+def test_close_drains_and_then_drops():
+    flush = Recorder(hold=True)
+    log = WriteBehindQueue(flush, batch_size=2, flush_interval_ms=10000)
+    log.put_many(range(5))
+    assert flush.started.wait(2)
+
+    flush.release.set()
+    log.close()
+    assert flush.rows == list(range(5))
+    assert log.stats()['pending'] == 0
+
+    assert log.put(5) is False
+    assert log.stats()['dropped'] == 1
+    # A second close is a no-op
+    log.close()
+
+
+def filled_queue(overflow, **kwargs):
+    """A queue of max_size 2 whose writer is stuck flushing row 0, holding rows 1 and 2"""
+    flush = Recorder(hold=True)
+    log = WriteBehindQueue(flush, max_size=2, batch_size=1, flush_interval_ms=1,
+                           overflow=overflow, **kwargs)
+    log.put(0)
+    assert flush.started.wait(2)
+    log.put_many([1, 2])
+    return flush, log
+
+
+def test_drop_oldest_keeps_the_newest_rows():
+    flush, log = filled_queue('drop_oldest')
+    assert log.put(3) is True
+    flush.release.set()
+    log.close()
+    assert flush.rows == [0, 2, 3]
+    assert log.stats()['dropped'] == 1
+
+
+def test_drop_newest_refuses_the_new_row():
+    flush, log = filled_queue('drop_newest')
+    assert log.put(3) is False
+    flush.release.set()
+    log.close()
+    assert flush.rows == [0, 1, 2]
+    assert log.stats()['dropped'] == 1
+
+
+def test_block_waits_then_sheds_load():
+    flush, log = filled_queue('block', block_timeout=0.05)
+    assert log.put(3) is False
+    assert log.stats()['dropped'] == 1
+
+    flush.release.set()
+    # With the writer running again there is room within the timeout
+    log.block_timeout = 2
+    assert log.put(4) is True
+    log.close()
+    assert flush.rows == [0, 1, 2, 4]
+
+
+@pytest.mark.parametrize('overflow, shed', [('drop_oldest', 1), ('drop_newest', 3), ('block', 3)])
+def test_shed_rows_are_reported(overflow, shed):
+    dropped = []
+    flush, log = filled_queue(overflow, block_timeout=0.05, on_drop=dropped.append)
+    log.put(3)
+    flush.release.set()
+    log.close()
+    log.put(4)
+    assert dropped == [shed, 4]
+
+
+def test_failed_flush_is_counted_and_the_writer_carries_on():
+    seen = []
+
+    def flush(rows):
+        seen.extend(rows)
+        if 'bad' in rows:
+            raise RuntimeError('disk full')
+
+    log = WriteBehindQueue(flush, batch_size=1, flush_interval_ms=1)
+    log.put_many(['bad', 'good'])
+    log.close()
+
+    assert seen == ['bad', 'good']
+    stats = log.stats()
+    assert (stats['failed'], stats['written']) == (1, 1)